@@ -0,0 +1,426 @@
+"""
+Headless benchmark suite for EducationPeople (no Streamlit server needed).
+
+Covers the three hot paths of the app on seeded synthetic data from
+``src/sample_data.py``:
+
+ - mapping:   ``map_indicator_to_org`` per text, the difflib batch scorer
+              with and without near-duplicate clustering of the texts, and
+              the batch TF-IDF scorer on the generated data (a handful of
+              distinct texts) and on varied texts (one distinct text per
+              ``VARIED_ROWS_PER_TEXT`` rows), for catalogs of 6 / 100 /
+              1,000 indicators,
+ - ingestion: reading CSV and Parquet uploads, and the Logframe mapping
+              page's upload loop (chunked read + batch mapping),
+ - dashboard: the aggregates behind ``run_dashboard_with_gender``, the
+              aggregation cube build, cube roll-ups, the filter index and
+              cross-project duplicate detection,
+
+at 1k / 100k / 1M rows. Each stage reports throughput, p50/p95 latency and
+peak traced memory (Python and numpy allocations via ``tracemalloc``; Arrow
+buffers are allocated outside it and not counted). Results are written as
+JSON, together with the commit and library versions, so runs can be compared.
+
+Usage (from the repository root):
+
+    python -m benchmarks.run_benchmarks
+    python -m benchmarks.run_benchmarks --quick
+    python -m benchmarks.run_benchmarks --stages dashboard --rows 1000000
+    python -m benchmarks.run_benchmarks --compare benchmarks/results/<earlier>.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from dataclasses import asdict, dataclass
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+from src.dashboard_utils import FilterIndex, build_aggregation_cube, compute_dashboard_aggregates
+from src.duplicates import find_duplicate_clusters
+from src.etl_utils import iter_logframe_chunks, read_upload
+from src.indicator_catalog import EDUCATIONPEOPLE_INDICATORS
+from src.mapping_engine import map_indicator_to_org, score_indicators_batch, score_indicators_parallel
+from src.sample_data import generate_random_catalog, generate_random_projects_data, write_random_projects_file
+from src.text_clusters import NEAR_DUPLICATE_THRESHOLD
+
+
+DEFAULT_ROWS = [1_000, 100_000, 1_000_000]
+DEFAULT_CATALOGS = [6, 100, 1_000]
+QUICK_ROWS = [1_000, 100_000]
+QUICK_CATALOGS = [6, 100]
+STAGES = ["mapping", "ingestion", "dashboard"]
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+
+SEED = 42
+SINGLE_TEXT_SAMPLES = 200
+FILTER_SAMPLES = 50
+FILTER_COLUMNS = ["Country", "Region", "District", "School_Name", "Project"]
+VARIED_ROWS_PER_TEXT = 10
+# Words spliced into catalog names to make varied indicator texts
+VARIED_TOKENS = [
+    "No. of",
+    "total",
+    "cumulative",
+    "new",
+    "girls",
+    "boys",
+    "rural",
+    "urban",
+    "primary",
+    "secondary",
+    "per term",
+    "(Q1)",
+    "(Q2)",
+    "(Q3)",
+    "(Q4)",
+    "annual",
+    "targeted",
+    "supported",
+]
+
+
+@dataclass
+class BenchResult:
+    """One stage at one dataset size / catalog size."""
+
+    stage: str
+    rows: int
+    catalog_size: Optional[int]
+    iterations: int
+    total_seconds: float
+    throughput_per_s: float
+    p50_ms: float
+    p95_ms: float
+    peak_mb: Optional[float]
+
+    @property
+    def key(self) -> tuple:
+        return self.stage, self.rows, self.catalog_size
+
+
+def measure(
+    stage: str,
+    calls: Sequence[Callable[[], object]],
+    units_per_call: int,
+    rows: int,
+    catalog_size: Optional[int] = None,
+    track_memory: bool = True,
+) -> BenchResult:
+    """
+    Time each of ``calls`` (latency samples), then re-run the first one under
+    ``tracemalloc`` for the peak. Throughput is units per second at the
+    median latency.
+    """
+    latencies = []
+    start = time.perf_counter()
+    for call in calls:
+        t0 = time.perf_counter()
+        call()
+        latencies.append(time.perf_counter() - t0)
+    total = time.perf_counter() - start
+
+    peak_mb = None
+    if track_memory:
+        tracemalloc.start()
+        calls[0]()
+        peak_mb = round(tracemalloc.get_traced_memory()[1] / 1e6, 2)
+        tracemalloc.stop()
+
+    p50, p95 = np.percentile(latencies, [50, 95])
+    result = BenchResult(
+        stage=stage,
+        rows=rows,
+        catalog_size=catalog_size,
+        iterations=len(latencies),
+        total_seconds=round(total, 4),
+        throughput_per_s=round(units_per_call / p50, 1) if p50 else float("inf"),
+        p50_ms=round(p50 * 1000, 3),
+        p95_ms=round(p95 * 1000, 3),
+        peak_mb=peak_mb,
+    )
+    print(
+        f"{stage:<22} rows={rows:>9,} catalog={catalog_size or '-':>5} "
+        f"p50={result.p50_ms:>10.2f}ms p95={result.p95_ms:>10.2f}ms "
+        f"{result.throughput_per_s:>14,.0f}/s peak={peak_mb if peak_mb is not None else '-'}MB",
+        flush=True,
+    )
+    return result
+
+
+def _random_filters(df: pd.DataFrame, rng: np.random.Generator) -> Dict[str, List]:
+    """A random sidebar selection: a few values of one or two filter columns."""
+    filters = {}
+    for column in rng.choice(FILTER_COLUMNS, size=rng.integers(1, 3), replace=False):
+        values = df[column].dropna().unique()
+        filters[column] = list(rng.choice(values, size=min(len(values), int(rng.integers(1, 4))), replace=False))
+    return filters
+
+
+def _varied_texts(catalog: List[Dict], rows: int, rng: np.random.Generator) -> pd.Series:
+    """
+    ``rows`` indicator texts with one distinct text per ``VARIED_ROWS_PER_TEXT``
+    rows on average: catalog names with a word dropped, a token from
+    ``VARIED_TOKENS`` spliced in and a random reference number appended.
+    """
+    names = [indicator["name"] for indicator in catalog]
+    distinct = []
+    for _ in range(max(1, rows // VARIED_ROWS_PER_TEXT)):
+        words = names[rng.integers(len(names))].split()
+        if len(words) > 2:
+            del words[rng.integers(len(words))]
+        words.insert(int(rng.integers(len(words) + 1)), VARIED_TOKENS[rng.integers(len(VARIED_TOKENS))])
+        words.append(f"#{rng.integers(1, 100_000)}")
+        distinct.append(" ".join(words))
+    return pd.Series(np.asarray(distinct, dtype=object)[rng.integers(0, len(distinct), rows)])
+
+
+def bench_mapping(datasets: Dict[int, pd.DataFrame], catalogs: Dict[int, List[Dict]], repeat: int, memory: bool):
+    results = []
+    rng = np.random.default_rng(SEED)
+    smallest = datasets[min(datasets)]
+    # Distinct texts so every single-text call really scores (no caching involved)
+    base_texts = smallest["Project_Indicator_Name"].astype(str).to_numpy()
+    regions = smallest["Region"].astype(str).to_numpy()
+    picks = rng.integers(0, len(base_texts), SINGLE_TEXT_SAMPLES)
+    texts = [f"{base_texts[i]} in {regions[i]} ({n})" for n, i in enumerate(picks)]
+
+    for size, catalog in catalogs.items():
+        results.append(
+            measure(
+                "map_single_difflib",
+                [lambda text=text: map_indicator_to_org(text, catalog) for text in texts],
+                1,
+                rows=len(texts),
+                catalog_size=size,
+                track_memory=memory,
+            )
+        )
+        # Every text is a distinct spelling, so only near-duplicate clustering saves scoring work
+        for name, near_duplicates in [
+            ("map_difflib_variants", None),
+            ("map_difflib_variants_clustered", NEAR_DUPLICATE_THRESHOLD),
+        ]:
+            results.append(
+                measure(
+                    name,
+                    [
+                        lambda nd=near_duplicates: score_indicators_parallel(
+                            texts, catalog, max_workers=1, near_duplicates=nd
+                        )
+                    ],
+                    len(texts),
+                    rows=len(texts),
+                    catalog_size=size,
+                    track_memory=memory,
+                )
+            )
+        for rows, df in datasets.items():
+            # The generated data repeats ~10 texts, so most rows are served from the per-text scores
+            varied = _varied_texts(catalog, rows, rng)
+            for name, series in [
+                ("map_batch_tfidf", df["Project_Indicator_Name"]),
+                ("map_batch_tfidf_varied", varied),
+            ]:
+                results.append(
+                    measure(
+                        name,
+                        [lambda series=series: score_indicators_batch(series, catalog)] * repeat,
+                        rows,
+                        rows=rows,
+                        catalog_size=size,
+                        track_memory=memory,
+                    )
+                )
+    return results
+
+
+def bench_ingestion(datasets: Dict[int, pd.DataFrame], repeat: int, memory: bool):
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for rows in datasets:
+            paths = {}
+            for extension in ("csv", "parquet"):
+                paths[extension] = write_random_projects_file(
+                    os.path.join(tmp, f"projects_{rows}.{extension}"), rows, seed=SEED
+                )
+                results.append(
+                    measure(
+                        f"ingest_{extension}",
+                        [lambda path=paths[extension]: read_upload(path)] * repeat,
+                        rows,
+                        rows=rows,
+                        track_memory=memory,
+                    )
+                )
+
+            def upload_loop(path=paths["csv"]):
+                # Same work as the mapping page: chunked read, then batch mapping per chunk
+                for chunk in iter_logframe_chunks([path], "Project"):
+                    score_indicators_batch(chunk["Project_Indicator_Name"], EDUCATIONPEOPLE_INDICATORS)
+
+            results.append(
+                measure("upload_loop_csv", [upload_loop] * repeat, rows, rows=rows, track_memory=memory)
+            )
+    return results
+
+
+def bench_dashboard(datasets: Dict[int, pd.DataFrame], repeat: int, memory: bool):
+    results = []
+    rng = np.random.default_rng(SEED)
+    for rows, df in datasets.items():
+        results.append(
+            measure(
+                "dashboard_aggregates",
+                [lambda: compute_dashboard_aggregates(df, EDUCATIONPEOPLE_INDICATORS)] * repeat,
+                rows,
+                rows=rows,
+                track_memory=memory,
+            )
+        )
+        results.append(
+            measure(
+                "cube_build",
+                [lambda: build_aggregation_cube(df, EDUCATIONPEOPLE_INDICATORS)] * repeat,
+                rows,
+                rows=rows,
+                track_memory=memory,
+            )
+        )
+        for fuzzy in (False, True):
+            results.append(
+                measure(
+                    "duplicates_fuzzy" if fuzzy else "duplicates",
+                    [lambda fuzzy=fuzzy: find_duplicate_clusters(df, fuzzy_schools=fuzzy)] * repeat,
+                    rows,
+                    rows=rows,
+                    track_memory=memory,
+                )
+            )
+        cube = build_aggregation_cube(df, EDUCATIONPEOPLE_INDICATORS)
+        selections = [_random_filters(df, rng) for _ in range(FILTER_SAMPLES)]
+        results.append(
+            measure(
+                "cube_rollup",
+                [lambda filters=filters: cube.rollup(filters) for filters in selections],
+                1,
+                rows=rows,
+                track_memory=memory,
+            )
+        )
+        index = FilterIndex(df, FILTER_COLUMNS)
+
+        def sidebar(filters):
+            # One dashboard rerun: every cascading filter's options plus the preview rows
+            for column in FILTER_COLUMNS:
+                index.options(column, filters)
+            return index.row_positions(filters)
+
+        results.append(
+            measure(
+                "filter_index",
+                [lambda filters=filters: sidebar(filters) for filters in selections],
+                1,
+                rows=rows,
+                track_memory=memory,
+            )
+        )
+    return results
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def environment() -> Dict[str, object]:
+    import pyarrow
+    import scipy
+
+    return {
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "git_commit": _git_commit(),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+        "pyarrow": pyarrow.__version__,
+        "scipy": scipy.__version__,
+        "seed": SEED,
+    }
+
+
+def compare(results: List[BenchResult], baseline_path: str) -> None:
+    """Print p50 latency of each stage against an earlier results file."""
+    with open(baseline_path, "r", encoding="utf-8") as fh:
+        baseline = {
+            (r["stage"], r["rows"], r["catalog_size"]): r for r in json.load(fh)["results"]
+        }
+    print(f"\nComparison with {baseline_path} (p50 latency, ratio < 1 is faster):")
+    for result in results:
+        old = baseline.get(result.key)
+        if old is None or not old["p50_ms"]:
+            continue
+        ratio = result.p50_ms / old["p50_ms"]
+        flag = "  <-- slower" if ratio > 1.1 else ""
+        print(
+            f"{result.stage:<22} rows={result.rows:>9,} catalog={result.catalog_size or '-':>5} "
+            f"{old['p50_ms']:>10.2f}ms -> {result.p50_ms:>10.2f}ms  x{ratio:.2f}{flag}"
+        )
+
+
+def main(argv: Optional[List[str]] = None) -> List[BenchResult]:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--rows", type=int, nargs="+", help=f"dataset sizes (default {DEFAULT_ROWS})")
+    parser.add_argument("--catalogs", type=int, nargs="+", help=f"catalog sizes (default {DEFAULT_CATALOGS})")
+    parser.add_argument("--stages", nargs="+", choices=STAGES, default=STAGES)
+    parser.add_argument("--repeat", type=int, default=3, help="timed runs per whole-dataset stage")
+    parser.add_argument("--quick", action="store_true", help=f"rows {QUICK_ROWS}, catalogs {QUICK_CATALOGS}")
+    parser.add_argument("--no-memory", action="store_true", help="skip the tracemalloc peak-memory pass")
+    parser.add_argument("--output", help="results JSON path (default benchmarks/results/<timestamp>.json)")
+    parser.add_argument("--compare", help="earlier results JSON to compare against")
+    args = parser.parse_args(argv)
+
+    row_sizes = args.rows or (QUICK_ROWS if args.quick else DEFAULT_ROWS)
+    catalog_sizes = args.catalogs or (QUICK_CATALOGS if args.quick else DEFAULT_CATALOGS)
+    memory = not args.no_memory
+
+    datasets = {rows: generate_random_projects_data(rows, seed=SEED) for rows in row_sizes}
+    catalogs = {size: generate_random_catalog(size, seed=SEED) for size in catalog_sizes}
+
+    results: List[BenchResult] = []
+    if "mapping" in args.stages:
+        results += bench_mapping(datasets, catalogs, args.repeat, memory)
+    if "ingestion" in args.stages:
+        results += bench_ingestion(datasets, args.repeat, memory)
+    if "dashboard" in args.stages:
+        results += bench_dashboard(datasets, args.repeat, memory)
+
+    env = environment()
+    output = args.output or os.path.join(RESULTS_DIR, f"{env['timestamp'].replace(':', '')}.json")
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    with open(output, "w", encoding="utf-8") as fh:
+        json.dump({"environment": env, "results": [asdict(r) for r in results]}, fh, indent=2)
+    print(f"\nWrote {len(results)} results to {output}")
+
+    if args.compare:
+        compare(results, args.compare)
+    return results
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+-- EducationPeople MEAL analytical store (SQLite).
+--
+-- Star-style layout: reported_values is the fact table; projects, locations,
+-- org_indicators and mappings are dimensions. Loaded by src/db_store.py.
+
+PRAGMA foreign_keys = ON;
+
+CREATE TABLE IF NOT EXISTS projects (
+    project_id   INTEGER PRIMARY KEY,
+    name         TEXT NOT NULL UNIQUE
+);
+
+CREATE TABLE IF NOT EXISTS locations (
+    location_id  INTEGER PRIMARY KEY,
+    country      TEXT NOT NULL DEFAULT '',
+    region       TEXT NOT NULL DEFAULT '',
+    district     TEXT NOT NULL DEFAULT '',
+    school       TEXT NOT NULL DEFAULT '',
+    UNIQUE (country, region, district, school)
+);
+
+CREATE TABLE IF NOT EXISTS org_indicators (
+    org_indicator_id  TEXT PRIMARY KEY,
+    name              TEXT NOT NULL,
+    description       TEXT,
+    level             TEXT,
+    unit              TEXT,
+    disaggregation    TEXT
+);
+
+-- One row per distinct (project indicator text, org indicator) pair.
+-- mapped_org_indicator_id is not a foreign key: uploads may carry IDs that
+-- are not (yet) in the catalog; aggregates join org_indicators to drop them.
+CREATE TABLE IF NOT EXISTS mappings (
+    mapping_id               INTEGER PRIMARY KEY,
+    project_indicator_name   TEXT NOT NULL,
+    mapped_org_indicator_id  TEXT NOT NULL,
+    similarity_score         REAL,
+    UNIQUE (project_indicator_name, mapped_org_indicator_id)
+);
+
+-- content_hash identifies the loaded dataset, so saving it again is a no-op
+-- (added by src/db_store.py to stores created before it existed).
+CREATE TABLE IF NOT EXISTS load_batches (
+    batch_id     INTEGER PRIMARY KEY,
+    source       TEXT NOT NULL,
+    loaded_at    TEXT NOT NULL,
+    row_count    INTEGER NOT NULL,
+    content_hash TEXT
+);
+
+CREATE TABLE IF NOT EXISTS reported_values (
+    value_id                 INTEGER PRIMARY KEY,
+    batch_id                 INTEGER NOT NULL REFERENCES load_batches (batch_id),
+    project_id               INTEGER NOT NULL REFERENCES projects (project_id),
+    location_id              INTEGER NOT NULL REFERENCES locations (location_id),
+    mapping_id               INTEGER NOT NULL REFERENCES mappings (mapping_id),
+    -- Denormalised from mappings so the most common aggregation needs no join.
+    mapped_org_indicator_id  TEXT NOT NULL,
+    source_file              TEXT,
+    reported_value           REAL,
+    female_value             REAL,
+    male_value               REAL
+);
+
+CREATE INDEX IF NOT EXISTS idx_values_org_indicator ON reported_values (mapped_org_indicator_id);
+CREATE INDEX IF NOT EXISTS idx_values_project ON reported_values (project_id, mapped_org_indicator_id);
+CREATE INDEX IF NOT EXISTS idx_values_location ON reported_values (location_id);
+CREATE INDEX IF NOT EXISTS idx_values_batch ON reported_values (batch_id);
+CREATE UNIQUE INDEX IF NOT EXISTS idx_batches_content ON load_batches (content_hash);
+
+CREATE INDEX IF NOT EXISTS idx_locations_region ON locations (region);
+CREATE INDEX IF NOT EXISTS idx_locations_district ON locations (district);
+CREATE INDEX IF NOT EXISTS idx_locations_school ON locations (school);
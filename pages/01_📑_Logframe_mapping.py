@@ -1,11 +1,177 @@
+import os
+from typing import Optional
+
 import streamlit as st
 import pandas as pd
 
+from src.dashboard_utils import export_table, instrumentation_session, paginated_table
+from src.data_models import compact_frame, to_name
 from src.indicator_catalog import EDUCATIONPEOPLE_INDICATORS
-from src.mapping_engine import map_indicator_to_org
+from src.mapping_engine import (
+    DEFAULT_DIFFLIB_THRESHOLD,
+    DEFAULT_TFIDF_THRESHOLD,
+    MappingCache,
+    apply_threshold,
+    catalog_fingerprint,
+    score_indicators_batch,
+    score_indicators_parallel,
+    top_k_matches,
+)
+from src.etl_utils import (
+    DEFAULT_CHUNK_ROWS,
+    SOURCE_FILE_COL,
+    UPLOAD_TYPES,
+    ParseCache,
+    iter_logframe_chunks,
+    normalize_chunk,
+    parse_report,
+    parse_uploads_parallel,
+)
+from src.instrumentation import INSTRUMENTS
 from src.sample_data import demo_logframe
+from src.text_clusters import NEAR_DUPLICATE_THRESHOLD
+
+
+MAPPING_CACHE_PATH = "data/cache/mapping_cache.json"
+
+
+@st.cache_resource
+def get_mapping_cache() -> MappingCache:
+    """One mapping cache per server process, persisted across restarts."""
+    cache = MappingCache(path=MAPPING_CACHE_PATH)
+    INSTRUMENTS.register_cache("Mapping results", cache.stats)
+    return cache
+
+
+@st.cache_resource
+def get_parse_cache() -> ParseCache:
+    """Parquet sidecars of parsed uploads, shared by all sessions."""
+    cache = ParseCache()
+    INSTRUMENTS.register_cache("Parsed uploads (mapping page)", cache.stats)
+    return cache
+
+
+def score_indicators(texts: pd.Series, engine: str, n_workers: int, near_duplicates: Optional[float]) -> pd.DataFrame:
+    """Raw best matches (no threshold) for one chunk of indicator texts."""
+    if engine.startswith("Vectorized"):
+        return score_indicators_batch(
+            texts,
+            EDUCATIONPEOPLE_INDICATORS,
+            cache=get_mapping_cache(),
+            near_duplicates=near_duplicates,
+        )
+    return score_indicators_parallel(
+        texts,
+        EDUCATIONPEOPLE_INDICATORS,
+        max_workers=n_workers,
+        # Only catalog entries sharing a token or keyword with the text are scored
+        use_index=True,
+        cache=get_mapping_cache(),
+        near_duplicates=near_duplicates,
+    )
 
 
+def mapping_rows(chunk: pd.DataFrame, texts: pd.Series, project_col: str, best_matches: pd.DataFrame) -> pd.DataFrame:
+    """Keep only the columns the mapping table needs from one normalised chunk."""
+
+    def _column(name, default=None):
+        if name in chunk.columns:
+            return chunk[name]
+        return pd.Series(default, index=chunk.index, dtype=object)
+
+    return pd.DataFrame(
+        {
+            "Project": _column(project_col, "Unknown project"),
+            "Source_File": _column(SOURCE_FILE_COL, ""),
+            "Project_Indicator_Name": texts,
+            "Best_Org_Indicator_ID": best_matches["Best_Org_Indicator_ID"],
+            "Similarity_Score": best_matches["Similarity_Score"],
+            "Reported_Value": _column("Reported_Value"),
+            "Female_Value": _column("Female_Value"),
+            "Male_Value": _column("Male_Value"),
+        }
+    )
+
+
+def parsed_chunks(results, chunk_rows: int = DEFAULT_CHUNK_ROWS):
+    """Slice frames parsed in parallel into mapper-sized chunks."""
+    for result in results:
+        if result.frame is None:
+            continue
+        for start in range(0, len(result.frame), chunk_rows):
+            yield result.frame.iloc[start : start + chunk_rows]
+
+
+@st.cache_data(show_spinner="Reading and mapping logframes…", max_entries=8)
+def map_logframes(
+    source_key: tuple,
+    _sources: list,
+    indicator_col: str,
+    project_col: str,
+    catalog_version: str,
+    engine: str,
+    n_workers: int,
+    parse_mode: str,
+    near_duplicates: Optional[float] = None,
+):
+    """
+    Feed the sources chunk by chunk into the mapper, computed once per
+    (sources, columns, catalog, engine, parse mode, near-duplicate threshold).
+
+    In streaming mode files are read one chunk at a time; in the parallel
+    modes each file is parsed whole in a thread/process pool first. Only a
+    20-row preview and the narrow mapping rows (raw best matches, no
+    threshold) are kept, as a compact frame (see ``src.data_models``).
+    Returns ``(preview, mapped, report)``; ``mapped`` is None when the
+    indicator column is missing and ``report`` (per-file timing and errors)
+    is None in streaming mode.
+    """
+    report = None
+    if source_key == ("demo",):
+        chunks = iter([normalize_chunk(demo_logframe(), "demo_logframe", project_col)])
+    elif parse_mode.startswith("Streaming"):
+        # Reading happens lazily, so only the time spent fetching chunks counts as parsing
+        chunks = INSTRUMENTS.timed_iter(
+            "mapping_page.parse", iter_logframe_chunks(_sources, project_col, cache=get_parse_cache())
+        )
+    else:
+        with INSTRUMENTS.span("mapping_page.parse"):
+            results = parse_uploads_parallel(
+                _sources,
+                project_col,
+                max_workers=n_workers,
+                use_processes=parse_mode.endswith("processes"),
+                cache=get_parse_cache(),
+            )
+        report = parse_report(results)
+        chunks = parsed_chunks(results)
+
+    preview, pieces = None, []
+    for chunk in chunks:
+        if preview is None:
+            preview = chunk.head(20)
+        if indicator_col not in chunk.columns:
+            return preview, None, report
+        texts = chunk[indicator_col].fillna("").astype(str)
+        best_matches = score_indicators(texts, engine, n_workers, near_duplicates)
+        with INSTRUMENTS.span("mapping_page.merge"):
+            pieces.append(mapping_rows(chunk, texts, project_col, best_matches))
+
+    if not pieces:
+        return preview, None, report
+    with INSTRUMENTS.span("mapping_page.merge"):
+        mapped = compact_frame(pd.concat(pieces, ignore_index=True))
+    return preview, mapped, report
+
+
+@st.cache_data(show_spinner="Finding runner-up matches…", max_entries=4)
+def runner_up_matches(texts: pd.Series, catalog_version: str, k: int):
+    """Top-K matches per row, kept as compact arrays until export."""
+    return top_k_matches(texts, EDUCATIONPEOPLE_INDICATORS, k=k)
+
+
+instrumentation_session()
+
 st.title("📑 Logframe Mapping – Project → EducationPeople")
 
 st.write(
@@ -19,7 +185,7 @@ organizational indicator each project indicator contributes to.
 # --- Controls ---
 uploaded_files = st.file_uploader(
     "Upload one or more logframe files (Excel/CSV):",
-    type=["xlsx", "xls", "csv"],
+    type=UPLOAD_TYPES,
     accept_multiple_files=True,
 )
 
@@ -30,73 +196,141 @@ use_demo = st.checkbox(
 
 indicator_col = st.text_input("Column containing indicator text:", value="Indicator_Name")
 project_col = st.text_input("Column containing project name:", value="Project")
-threshold = st.slider("Similarity threshold for mapping", 0.3, 0.9, 0.5, 0.05)
+# Filled in once the engine is known: each engine scores on its own scale
+threshold_slot = st.empty()
+
+with st.expander("Advanced mapping options"):
+    engine = st.radio(
+        "Mapping engine",
+        ["Vectorized (TF-IDF)", "Text similarity (difflib, multi-core)"],
+        help="The difflib engine reproduces single-indicator scores and spreads work over CPU cores.",
+    )
+    n_workers = st.number_input("Worker threads/processes", 1, 64, os.cpu_count() or 1)
+    parse_mode = st.radio(
+        "File parsing",
+        ["Streaming (lowest memory)", "Parallel threads", "Parallel processes"],
+        help="Parallel processes are fastest for many Excel files; streaming keeps memory lowest.",
+    )
+    group_near_duplicates = st.checkbox(
+        "Group near-duplicate indicator texts before mapping",
+        help=(
+            "Indicators spelled almost alike (MinHash/LSH on character 3-grams) are mapped once "
+            "and share the match of the most frequent spelling. Much faster on large uploads."
+        ),
+    )
+    near_duplicate_threshold = st.slider(
+        "Near-duplicate similarity",
+        0.5,
+        0.95,
+        NEAR_DUPLICATE_THRESHOLD,
+        0.05,
+        disabled=not group_near_duplicates,
+        help="Share of character 3-grams two texts must have in common (Jaccard similarity).",
+    )
+
+tfidf_engine = engine.startswith("Vectorized")
+threshold = threshold_slot.slider(
+    f"Similarity threshold for mapping ({'TF-IDF cosine' if tfidf_engine else 'difflib ratio'} scale)",
+    0.3,
+    0.9,
+    DEFAULT_TFIDF_THRESHOLD if tfidf_engine else DEFAULT_DIFFLIB_THRESHOLD,
+    0.05,
+    # One slider per engine, so switching engines restores that engine's default
+    key=f"threshold_{'tfidf' if tfidf_engine else 'difflib'}",
+    help=(
+        "TF-IDF cosine scores run lower than difflib ratios for the same texts: "
+        f"the defaults are {DEFAULT_TFIDF_THRESHOLD} (TF-IDF) and {DEFAULT_DIFFLIB_THRESHOLD} (difflib)."
+    ),
+)
 
-# --- Load data: demo or uploaded ---
+# --- Load & map data: demo or uploaded ---
 if use_demo:
-    logframes_df = demo_logframe()
-    logframes_df["__Source_File"] = "demo_logframe"
+    source_key, sources = ("demo",), []
     st.info("Using built-in demo logframe.")
 elif uploaded_files:
-    dfs = []
-    for f in uploaded_files:
-        if f.name.lower().endswith(".csv"):
-            df = pd.read_csv(f)
-        else:
-            df = pd.read_excel(f)
-
-        df["__Source_File"] = f.name
-        if project_col not in df.columns:
-            df[project_col] = f.name
-        dfs.append(df)
-
-    if dfs:
-        logframes_df = pd.concat(dfs, ignore_index=True)
-    else:
-        logframes_df = pd.DataFrame()
+    source_key = tuple((f.name, f.size, getattr(f, "file_id", None)) for f in uploaded_files)
+    sources = uploaded_files
 else:
-    logframes_df = pd.DataFrame()
+    source_key, sources = None, []
 
-# --- Show preview & run mapping ---
-if not logframes_df.empty:
+if source_key is not None:
+    preview_df, mapped_df, parse_report_df = map_logframes(
+        source_key,
+        sources,
+        indicator_col,
+        project_col,
+        catalog_fingerprint(EDUCATIONPEOPLE_INDICATORS),
+        engine,
+        int(n_workers),
+        parse_mode,
+        near_duplicate_threshold if group_near_duplicates else None,
+    )
+else:
+    preview_df, mapped_df, parse_report_df = None, None, None
+
+if parse_report_df is not None:
+    failed = parse_report_df[parse_report_df["Error"].notna()]
+    for _, row in failed.iterrows():
+        st.warning(f"Could not read `{row['File']}`: {row['Error']}")
+    with st.expander(f"File parsing report ({len(parse_report_df)} files, {len(failed)} failed)"):
+        st.dataframe(parse_report_df, use_container_width=True)
+
+# --- Show preview & mapping results ---
+if preview_df is not None and not preview_df.empty:
     st.subheader("Combined logframes (preview)")
-    st.dataframe(logframes_df.head(20), use_container_width=True)
+    st.dataframe(preview_df, use_container_width=True)
 
-    if indicator_col not in logframes_df.columns:
+    if mapped_df is None:
         st.error(f"Column `{indicator_col}` not found in data.")
     else:
-        mapping_records = []
-
-        for _, row in logframes_df.iterrows():
-            text = str(row[indicator_col])
-            org_id, score = map_indicator_to_org(
-                text,
-                EDUCATIONPEOPLE_INDICATORS,
-                threshold=threshold,
-            )
-            mapping_records.append(
-                {
-                    "Project": row.get(project_col, "Unknown project"),
-                    "Source_File": row.get("__Source_File", ""),
-                    "Project_Indicator_Name": text,
-                    "Mapped_Org_Indicator_ID": org_id,
-                    "Similarity_Score": score,
-                    "Reported_Value": row.get("Reported_Value", None),
-                    "Female_Value": row.get("Female_Value", None),
-                    "Male_Value": row.get("Male_Value", None),
-                }
-            )
+        mapping_cache = get_mapping_cache()
+        mapping_cache.save()
 
-        mapping_df = pd.DataFrame(mapping_records)
+        with INSTRUMENTS.span("mapping_page.threshold"):
+            mapping_df = mapped_df.rename(columns={"Best_Org_Indicator_ID": "Mapped_Org_Indicator_ID"})
+            mapping_df["Mapped_Org_Indicator_ID"] = to_name(
+                apply_threshold(mapped_df, threshold)["Mapped_Org_Indicator_ID"]
+            )
 
         st.subheader("🤖 AI mapping results")
-        st.dataframe(mapping_df, use_container_width=True)
+        cache_stats = mapping_cache.stats()
+        st.caption(
+            f"Mapping cache: {cache_stats['hits']:,} hits / {cache_stats['misses']:,} misses "
+            f"({cache_stats['size']:,} entries)"
+        )
+        paginated_table(mapping_df, key="mapping")
 
-        st.download_button(
-            "⬇️ Download mapping as CSV (for dashboard page)",
-            data=mapping_df.to_csv(index=False),
-            file_name="educationpeople_mapping.csv",
-            mime="text/csv",
+        export_table(
+            mapping_df,
+            "educationpeople_mapping",
+            "⬇️ Download mapping (for dashboard page)",
+            key="mapping_export",
         )
+
+        if st.checkbox("Show runner-up matches (top-K) for review"):
+            k = st.slider("Candidates per indicator (K)", 2, 5, 3)
+            top_k = runner_up_matches(
+                mapping_df["Project_Indicator_Name"],
+                catalog_fingerprint(EDUCATIONPEOPLE_INDICATORS),
+                k,
+            )
+            candidates_df = top_k.to_frame()
+            candidates_df.insert(1, "Project", mapping_df["Project"].to_numpy()[candidates_df["Row"]])
+            candidates_df.insert(
+                2,
+                "Project_Indicator_Name",
+                mapping_df["Project_Indicator_Name"].to_numpy()[candidates_df["Row"]],
+            )
+
+            # Ambiguous rows: runner-up within 0.05 of the best match
+            ambiguous = (top_k.scores[:, 0] - top_k.scores[:, 1]) < 0.05
+            st.caption(f"{int(ambiguous.sum()):,} of {len(mapping_df):,} indicators have a close runner-up.")
+            paginated_table(candidates_df, key="candidates")
+            export_table(
+                candidates_df,
+                "educationpeople_mapping_candidates",
+                "⬇️ Download top-K candidates",
+                key="candidates_export",
+            )
 else:
     st.info("Upload logframes or enable the demo logframe to see mappings.")
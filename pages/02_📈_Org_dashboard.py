@@ -1,11 +1,94 @@
+import sqlite3
+from typing import Tuple
+
 import streamlit as st
 import pandas as pd
 
 from src.indicator_catalog import EDUCATIONPEOPLE_INDICATORS
-from src.dashboard_utils import run_dashboard_with_gender
+from src.dashboard_utils import (
+    CHART_TOP_N_PROJECTS,
+    AggregationCube,
+    FilterIndex,
+    build_aggregation_cube,
+    instrumentation_session,
+    run_dashboard_with_gender,
+)
+from src.data_models import compact_frame
+from src.db_store import (
+    DEFAULT_DB_PATH,
+    connect,
+    dataset_hash,
+    distinct_values,
+    query_rows,
+    save_dataset,
+    sync_org_indicators,
+)
+from src.etl_utils import UPLOAD_TYPES, ParseCache, read_upload
+from src.instrumentation import INSTRUMENTS
+from src.mapping_engine import catalog_fingerprint
 from src.sample_data import demo_mapping
+from src.shared_cache import SHARED_CACHE
+
+
+# Columns the dashboard uses; anything else in an upload is skipped while reading.
+DASHBOARD_COLUMNS = [
+    "Project",
+    "Country",
+    "Region",
+    "District",
+    "School_Name",
+    "School",
+    "Source_File",
+    "Project_Indicator_Name",
+    "Mapped_Org_Indicator_ID",
+    "Similarity_Score",
+    "Reported_Value",
+    "Female_Value",
+    "Male_Value",
+]
+
+# Sidebar filters, in cascade order: (dashboard column, label).
+FILTER_COLUMNS = [
+    ("Country", "Country"),
+    ("Region", "Region"),
+    ("District", "District"),
+    ("School_Name", "School"),
+    ("Project", "Project"),
+]
+
+
+@st.cache_resource
+def get_parse_cache() -> ParseCache:
+    """Parquet sidecars of parsed uploads, shared by all sessions."""
+    cache = ParseCache()
+    INSTRUMENTS.register_cache("Parsed uploads (dashboard)", cache.stats)
+    return cache
 
 
+@st.cache_resource
+def get_store() -> sqlite3.Connection:
+    """One connection to the persistent store per server process, with the catalog synced."""
+    store = connect(DEFAULT_DB_PATH)
+    sync_org_indicators(store, EDUCATIONPEOPLE_INDICATORS)
+    return store
+
+
+def dashboard_model(data_key: str, df: pd.DataFrame) -> Tuple[AggregationCube, FilterIndex]:
+    """
+    Aggregation cube and row filter index of one dataset, built once per
+    dataset and catalog version and shared by all sessions (read-only).
+    """
+    return SHARED_CACHE.get_or_compute(
+        ("dashboard_model", data_key, catalog_fingerprint(EDUCATIONPEOPLE_INDICATORS)),
+        lambda: (
+            build_aggregation_cube(df, EDUCATIONPEOPLE_INDICATORS),
+            FilterIndex(df, [column for column, _ in FILTER_COLUMNS]),
+        ),
+    )
+
+
+instrumentation_session()
+
 st.title("📈 EducationPeople – Organizational Dashboard")
 
 st.write(
@@ -16,7 +99,8 @@ Upload a dataset that includes:
 - Mapped organizational indicator IDs  
 - Reported values and (optionally) gender-disaggregated values  
 
-Or use the built-in demo dataset to see how the dashboard works.
+Or use the built-in demo dataset to see how the dashboard works, or the
+persistent **EducationPeople store** that keeps previously saved datasets.
 
 You can also filter by **country, region, district, school, and project**
 to compare performance across locations and interventions.
@@ -25,114 +109,163 @@ to compare performance across locations and interventions.
 
 # -------- Data selection (demo vs upload) --------
 uploaded_file = st.file_uploader(
-    "Upload mapping + values data (CSV/Excel):",
-    type=["xlsx", "xls", "csv"],
+    "Upload mapping + values data (CSV/Excel, or Parquet/Arrow exported by the mapping page):",
+    type=UPLOAD_TYPES,
     accept_multiple_files=False,
 )
 
+use_store = st.checkbox(
+    "Use the persistent EducationPeople store (all saved datasets)",
+    value=False,
+)
+
 use_demo = st.checkbox(
     "Use built-in demo mapping dataset",
     value=not uploaded_file,
+    disabled=use_store,
 )
 
-if use_demo:
-    df = demo_mapping()
+# Datasets are shared across sessions by content key (see src.shared_cache)
+data_key = None
+if use_store:
+    df = pd.DataFrame()
+elif use_demo:
+    data_key = "demo_mapping"
+    df = SHARED_CACHE.get_or_compute(("dataset", data_key), lambda: compact_frame(demo_mapping()))
     st.info("Using built-in demo mapping dataset.")
 elif uploaded_file:
-    if uploaded_file.name.lower().endswith(".csv"):
-        df = pd.read_csv(uploaded_file)
-    else:
-        df = pd.read_excel(uploaded_file)
+    with INSTRUMENTS.span("dashboard_page.load"):
+        data_key = ParseCache.make_key(uploaded_file.getvalue(), usecols=DASHBOARD_COLUMNS)
+        df = SHARED_CACHE.get_or_compute(
+            ("dataset", data_key),
+            lambda: compact_frame(read_upload(uploaded_file, usecols=DASHBOARD_COLUMNS, cache=get_parse_cache())),
+        )
 else:
     df = pd.DataFrame()
 
+if not df.empty and st.button("💾 Save this dataset to the EducationPeople store"):
+    content_hash = SHARED_CACHE.get_or_compute(("dataset_hash", data_key), lambda: dataset_hash(df))
+    source = uploaded_file.name if uploaded_file and not use_demo else "demo_mapping"
+    # Written on a connection of its own; the shared reader only sees the committed batch
+    batch_id, created = save_dataset(df, source=source, content_hash=content_hash, path=DEFAULT_DB_PATH)
+    if created:
+        st.success(f"Saved {len(df):,} rows to the store (batch {batch_id}).")
+    else:
+        st.info(f"This dataset is already in the store (batch {batch_id}); nothing was added.")
+
+# -------- Chart options (bounded chart payload for large portfolios) --------
+with st.sidebar:
+    st.markdown("### 📊 Chart options")
+    top_n_projects = st.slider(
+        "Projects shown in the project chart",
+        5,
+        50,
+        CHART_TOP_N_PROJECTS,
+        help="Smaller projects are combined into an 'Other' bar.",
+    )
+    compact_charts = st.checkbox(
+        "Compact charts (single heatmap trace)",
+        value=False,
+        help="Draw project contributions as one heatmap; lightest for the browser.",
+    )
+
+    st.markdown("### 🔁 Duplicates")
+    deduplicate = st.checkbox(
+        "De-duplicate KPI totals across projects",
+        value=False,
+        help="Values reported by several projects for the same school and indicator are counted once.",
+    )
+    fuzzy_schools = st.checkbox(
+        "Match similar school names",
+        value=False,
+        disabled=not deduplicate,
+        help="Treat near-identical school names within a district (e.g. 'St. Mary's' / 'St Marys') as one school.",
+    )
+
+# -------- Persistent store: filters and aggregates run in SQL --------
+if use_store:
+    store = get_store()
+    filters = {}
+    with st.sidebar, INSTRUMENTS.span("dashboard_page.filters"):
+        st.markdown("### 🌍 Location & Project Filters")
+        for column, label in FILTER_COLUMNS:
+            # Options cascade: each list only shows values within the selections above it
+            options = distinct_values(store, column, filters)
+            selected = st.multiselect(label, options=options, default=options)
+            # Same rule as the uploaded-data filters below
+            if selected and len(selected) < len(options):
+                filters[column] = selected
+
+    st.subheader("Filtered data preview")
+    st.dataframe(query_rows(store, filters, limit=20), use_container_width=True)
+
+    run_dashboard_with_gender(
+        None,
+        org_indicators=EDUCATIONPEOPLE_INDICATORS,
+        store=store,
+        filters=filters,
+        cache=SHARED_CACHE,
+        top_n_projects=top_n_projects,
+        compact_charts=compact_charts,
+        deduplicate=deduplicate,
+        fuzzy_schools=fuzzy_schools,
+    )
+
 # -------- Subnational & project filters --------
-if not df.empty:
+if not df.empty and "Mapped_Org_Indicator_ID" not in df.columns:
+    st.error("Required column `Mapped_Org_Indicator_ID` not found in uploaded data.")
+elif not df.empty:
     st.subheader("Filters")
 
-    # Work on a copy so original df isn't destroyed
-    filt_df = df.copy()
+    # Built once per dataset: the filter index answers option lists and row
+    # selections from categorical codes, and every panel is a roll-up of the
+    # cube, so filter changes never copy or re-aggregate the rows.
+    cube, row_index = dashboard_model(data_key, df)
 
     # Sidebar or top filters? Let's use the sidebar to save space.
-    with st.sidebar:
+    filters = {}
+    with st.sidebar, INSTRUMENTS.span("dashboard_page.filters"):
         st.markdown("### 🌍 Location & Project Filters")
+        for column, label in FILTER_COLUMNS:
+            if column not in row_index.columns:
+                continue
+            # Options cascade: each list only shows values within the selections above it
+            options = row_index.options(column, filters)
+            selected = st.multiselect(label, options=options, default=options)
+            # A column only filters once the selection is narrowed: with every
+            # option selected, rows missing that value (not an option) stay in,
+            # as they do in the store's SQL filters
+            if selected and len(selected) < len(options):
+                filters[column] = selected
 
-        # Country filter
-        if "Country" in filt_df.columns:
-            countries = sorted(filt_df["Country"].dropna().unique())
-            selected_countries = st.multiselect(
-                "Country",
-                options=countries,
-                default=countries,
-            )
-            if selected_countries:
-                filt_df = filt_df[filt_df["Country"].isin(selected_countries)]
-
-        # Region filter
-        if "Region" in filt_df.columns:
-            regions = sorted(filt_df["Region"].dropna().unique())
-            selected_regions = st.multiselect(
-                "Region",
-                options=regions,
-                default=regions,
-            )
-            if selected_regions:
-                filt_df = filt_df[filt_df["Region"].isin(selected_regions)]
-
-        # District filter
-        if "District" in filt_df.columns:
-            districts = sorted(filt_df["District"].dropna().unique())
-            selected_districts = st.multiselect(
-                "District",
-                options=districts,
-                default=districts,
-            )
-            if selected_districts:
-                filt_df = filt_df[filt_df["District"].isin(selected_districts)]
-
-        # School filter
-        # (column may be School_Name or School; use whichever exists)
-        school_col = None
-        if "School_Name" in filt_df.columns:
-            school_col = "School_Name"
-        elif "School" in filt_df.columns:
-            school_col = "School"
-
-        if school_col is not None:
-            schools = sorted(filt_df[school_col].dropna().unique())
-            selected_schools = st.multiselect(
-                "School",
-                options=schools,
-                default=schools,
-            )
-            if selected_schools:
-                filt_df = filt_df[filt_df[school_col].isin(selected_schools)]
-
-        # Project filter
-        if "Project" in filt_df.columns:
-            projects = sorted(filt_df["Project"].dropna().unique())
-            selected_projects = st.multiselect(
-                "Project",
-                options=projects,
-                default=projects,
-            )
-            if selected_projects:
-                filt_df = filt_df[filt_df["Project"].isin(selected_projects)]
+    positions = row_index.row_positions(filters)
 
     # Show preview of filtered data
     st.subheader("Filtered data preview")
-    st.dataframe(filt_df.head(20), use_container_width=True)
+    st.dataframe(df.iloc[positions[:20]], use_container_width=True)
 
-    if filt_df.empty:
+    if not len(positions):
         st.warning("No data after applying filters. Try selecting more locations/projects.")
     else:
-        # Run the dashboard with filtered data
+        # Run the dashboard on the cube for the current filters
         run_dashboard_with_gender(
-            filt_df,
+            df,
             org_indicators=EDUCATIONPEOPLE_INDICATORS,
-            indicator_col="Project_Indicator_Name",
-            org_indicator_col="Mapped_Org_Indicator_ID",
-            project_col="Project",
+            cube=cube,
+            filters=filters,
+            cache=SHARED_CACHE,
+            dataset_key=data_key,
+            top_n_projects=top_n_projects,
+            compact_charts=compact_charts,
+            deduplicate=deduplicate,
+            fuzzy_schools=fuzzy_schools,
         )
-else:
+elif not use_store:
     st.info("Upload a file or enable the demo dataset to view the dashboard.")
+
+cache_stats = SHARED_CACHE.stats()
+st.caption(
+    f"Shared cache: {cache_stats['hits']:,} hits / {cache_stats['misses']:,} misses "
+    f"(hit rate {cache_stats['hit_rate']:.0%}, {cache_stats['entries']:,} entries, "
+    f"{cache_stats['bytes'] / 1e6:,.1f} MB)"
+)
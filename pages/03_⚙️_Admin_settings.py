@@ -1,7 +1,171 @@
+from typing import Callable, Iterable, Tuple
+
+import pandas as pd
+import plotly.express as px
 import streamlit as st
 
+from src.dashboard_utils import export_table, instrumentation_session, paginated_table
+from src.data_quality import RULES, QualityReport, check_quality_chunks, flagged_rows
+from src.etl_utils import UPLOAD_TYPES, ParseCache, iter_upload_chunks
+from src.instrumentation import INSTRUMENTS
+from src.sample_data import demo_mapping
+from src.shared_cache import SHARED_CACHE
+
+
+@st.cache_resource
+def get_parse_cache() -> ParseCache:
+    """Parquet sidecars of parsed uploads, shared by all sessions."""
+    cache = ParseCache()
+    INSTRUMENTS.register_cache("Parsed uploads (admin)", cache.stats)
+    return cache
+
+
+def quality_check(read_chunks: Callable[[], Iterable[pd.DataFrame]]) -> Tuple[QualityReport, pd.DataFrame]:
+    """DQ report of a dataset plus its first flagged rows (the data is read twice, chunk by chunk)."""
+    report = check_quality_chunks(read_chunks())
+    return report, flagged_rows(read_chunks(), report)
+
+
+session_id = instrumentation_session()
+
 st.title("⚙️ Admin & Configuration")
 
+# -------- Data quality checks --------
+st.subheader("✅ Data quality checks")
+st.write(
+    """
+Checks a mapping + values dataset for gender completeness (Female + Male =
+Total), missing, negative and outlier values, and duplicate rows. Large
+uploads are checked chunk by chunk.
+"""
+)
+
+dq_file = st.file_uploader(
+    "Dataset to check (same format as the dashboard upload):",
+    type=UPLOAD_TYPES,
+    key="dq_upload",
+)
+dq_use_demo = st.checkbox("Check the built-in demo mapping dataset", value=not dq_file)
+
+if dq_use_demo:
+    dq_source, dq_key, read_chunks = "demo_mapping", "demo_mapping", lambda: [demo_mapping()]
+elif dq_file:
+    dq_source, dq_key = dq_file.name, ParseCache.make_key(dq_file.getvalue())
+    read_chunks = lambda: iter_upload_chunks(dq_file, cache=get_parse_cache())
+else:
+    dq_key = None
+
+if dq_key is not None:
+    # Cached by content, so reruns and other sessions reuse the report
+    report, flagged = SHARED_CACHE.get_or_compute(("quality", dq_key), lambda: quality_check(read_chunks))
+    n_flagged = len(report.rows_with())
+    col_rows, col_flagged = st.columns(2)
+    col_rows.metric("Rows checked", f"{report.n_rows:,}")
+    col_flagged.metric(
+        "Rows with issues",
+        f"{n_flagged:,}",
+        f"{n_flagged / report.n_rows:.1%}" if report.n_rows else None,
+        delta_color="off",
+    )
+    st.dataframe(report.summary(), use_container_width=True)
+
+    if n_flagged:
+        st.markdown(f"**Rows with issues** (first {len(flagged):,})")
+        paginated_table(flagged, key="dq_rows")
+        export_table(
+            flagged,
+            f"data_quality_{dq_source.rsplit('.', 1)[0]}",
+            "⬇️ Download rows with issues",
+            key="dq_export",
+        )
+    else:
+        st.success("No data quality issues found.")
+    st.caption("Rules: " + "; ".join(f"**{name}**: {description}" for name, description in RULES.values()))
+
+# -------- Performance panel --------
+st.subheader("⏱️ Performance")
+st.write(
+    """
+Time spent in each stage of the app (parsing, mapping, merging, aggregation,
+melting, table and Plotly rendering), collected on this server since it
+started or since the last reset. Use it to see which step makes a page slow.
+"""
+)
+
+col_enabled, col_memory, col_reset = st.columns([2, 2, 1])
+# The switches are process-wide: show their current state on every rerun, and
+# change them only when this session flips a toggle (another admin may have
+# changed them since this page last ran)
+st.session_state["instrumentation_enabled"] = INSTRUMENTS.enabled
+st.session_state["instrumentation_memory"] = INSTRUMENTS.track_memory
+col_enabled.toggle(
+    "Collect timings",
+    key="instrumentation_enabled",
+    on_change=lambda: setattr(INSTRUMENTS, "enabled", st.session_state["instrumentation_enabled"]),
+    help="Applies to all sessions on this server.",
+)
+col_memory.toggle(
+    "Track memory peaks",
+    key="instrumentation_memory",
+    on_change=lambda: INSTRUMENTS.set_track_memory(st.session_state["instrumentation_memory"]),
+    disabled=not INSTRUMENTS.enabled,
+    help="Uses tracemalloc: slows the app down while on, and peaks of concurrent sessions overlap.",
+)
+if col_reset.button("Reset"):
+    INSTRUMENTS.reset()
+
+sessions = INSTRUMENTS.sessions()
+scopes = ["All sessions", *sessions]
+scope = st.selectbox(
+    "Scope",
+    scopes,
+    format_func=lambda s: f"{s} (this session)" if s == session_id else s,
+)
+selected_session = None if scope == "All sessions" else scope
+
+stages = INSTRUMENTS.stage_table(selected_session)
+if stages.empty:
+    st.info("No timings recorded yet. Open the mapping or dashboard page and come back here.")
+else:
+    fig_stages = px.bar(
+        stages.head(15).iloc[::-1],
+        x="total_s",
+        y="stage",
+        orientation="h",
+        title="Total time per stage (seconds)",
+    )
+    fig_stages.update_layout(xaxis_title="Seconds", yaxis_title="Stage")
+    st.plotly_chart(fig_stages, use_container_width=True)
+    st.dataframe(stages, use_container_width=True)
+    st.caption("p50/p95 over the latest calls of each stage; nested stages are included in their parents.")
+
+counters = INSTRUMENTS.counter_table(selected_session)
+if not counters.empty:
+    st.markdown("**Counters**")
+    st.dataframe(counters, use_container_width=True)
+
+st.markdown("**Cache hit rates**")
+shared = SHARED_CACHE.stats()
+col_hits, col_rate, col_entries, col_bytes = st.columns(4)
+col_hits.metric("Shared cache lookups", f"{shared['hits'] + shared['misses']:,}")
+col_rate.metric("Shared cache hit rate", f"{shared['hit_rate']:.0%}")
+col_entries.metric("Entries", f"{shared['entries']:,} / {shared['max_entries']:,}")
+col_bytes.metric("Size", f"{shared['bytes'] / 1e6:,.1f} / {shared['max_bytes'] / 1e6:,.0f} MB")
+
+caches = pd.concat(
+    [
+        pd.DataFrame(
+            [{"cache": f"Shared: {name}", **values} for name, values in shared["namespaces"].items()],
+            columns=["cache", "hits", "misses", "expired", "evictions", "hit_rate"],
+        ),
+        INSTRUMENTS.cache_table(),
+    ],
+    ignore_index=True,
+)
+st.dataframe(caches, use_container_width=True)
+
+# -------- Roadmap --------
+st.subheader("🗺️ Roadmap")
 st.markdown(
     """
 This page is the **admin/configuration** placeholder for the EducationPeople MEAL system.
@@ -18,7 +182,7 @@ Planned features for this space:
   - Activate / deactivate indicators  
   - Map indicators to strategic outcomes  
 
-- Run **data quality checks**  
+- Run **data quality checks** (first checks available above)  
   - Gender completeness (Female + Male = Total)  
   - Missing or outlier values  
   - Duplicate records across projects  
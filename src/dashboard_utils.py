@@ -2,15 +2,252 @@
 Dashboard helpers for EducationPeople MEAL system.
 """
 
-from typing import List, Dict
+import sqlite3
+import uuid
+from functools import partial
+from dataclasses import dataclass, field
+from typing import List, Dict, Optional, Tuple
 
 import numpy as np
 import pandas as pd
 import plotly.express as px
 import streamlit as st
 
+from src.data_models import widen_measure
+from src.export_utils import EXPORT_FORMATS, export_file, export_file_name
+from src.instrumentation import INSTRUMENTS, bind_session
+from src.duplicates import DuplicateClusters, deduplicated_totals, find_duplicate_clusters
+from src.db_store import (
+    FEMALE_RATIO,
+    MALE_RATIO,
+    query_dashboard_aggregates,
+    query_location_cells,
+    store_version,
+)
+from src.mapping_engine import catalog_fingerprint
+from src.shared_cache import SHARED_CACHE, SharedCache, filter_key
 
-def run_dashboard_with_gender(
+
+# Location dimensions kept in the aggregation cube (dashboard filter columns).
+CUBE_LOCATION_COLUMNS = ["Country", "Region", "District", "School_Name"]
+# Project bars drawn per indicator facet; the rest are summed into "Other".
+CHART_TOP_N_PROJECTS = 15
+OTHER_LABEL = "Other"
+# Rows sent to the browser per page of a paginated table.
+TABLE_PAGE_SIZE = 50
+# Filter column -> fallback source column when the filter column is absent.
+FILTER_COLUMN_ALIASES = {"School_Name": "School"}
+
+
+def catalog_frame(org_indicators: List[Dict]) -> pd.DataFrame:
+    """``org_indicator_id``/``name`` frame of the catalog, shared per catalog version."""
+    return SHARED_CACHE.get_or_compute(
+        ("catalog_frame", catalog_fingerprint(org_indicators)),
+        lambda: pd.DataFrame(org_indicators)[["org_indicator_id", "name"]].drop_duplicates("org_indicator_id"),
+    )
+
+
+def instrumentation_session() -> str:
+    """ID of the current Streamlit session, bound to the instrumentation (see ``src.instrumentation``)."""
+    session_id = st.session_state.setdefault("instrumentation_session", uuid.uuid4().hex[:8])
+    bind_session(session_id)
+    return session_id
+
+
+def _plain_values(frame: pd.DataFrame) -> pd.DataFrame:
+    """Turn categorical key columns of a roll-up back into plain values."""
+    for column in frame.columns:
+        if isinstance(frame[column].dtype, pd.CategoricalDtype):
+            frame[column] = frame[column].astype(frame[column].cat.categories.dtype)
+    return frame
+
+
+def _sorted_category(values: pd.Series) -> pd.Series:
+    """Categorical copy of ``values`` with only used categories, in sorted order."""
+    if not isinstance(values.dtype, pd.CategoricalDtype):
+        return values.astype("category")
+    values = values.cat.remove_unused_categories()
+    if not values.cat.categories.is_monotonic_increasing:
+        values = values.cat.reorder_categories(values.cat.categories.sort_values())
+    return values
+
+
+class FilterIndex:
+    """
+    Categorical code arrays of a frame's filter columns, built once.
+
+    Selections are evaluated as lookups of the selected codes over the code
+    arrays (no ``isin`` over object columns and no copy of the base frame),
+    and the cascading option lists come from the same codes.
+    """
+
+    @INSTRUMENTS.timed("dashboard.filter_index")
+    def __init__(self, df: pd.DataFrame, columns: List[str]):
+        self.n_rows = len(df)
+        self.codes: Dict[str, np.ndarray] = {}
+        self.categories: Dict[str, pd.Index] = {}
+        for column in columns:
+            source_col = column if column in df.columns else FILTER_COLUMN_ALIASES.get(column)
+            if source_col not in df.columns:
+                continue
+            values = _sorted_category(df[source_col])
+            self.codes[column] = values.cat.codes.to_numpy()
+            self.categories[column] = values.cat.categories
+
+    @property
+    def columns(self) -> List[str]:
+        return list(self.codes)
+
+    def mask(self, filters: Optional[Dict[str, List]] = None) -> np.ndarray:
+        """Boolean row mask for ``filters`` (column -> selected values)."""
+        mask = np.ones(self.n_rows, dtype=bool)
+        for column, values in (filters or {}).items():
+            if column not in self.codes or not values:
+                continue
+            selected = self.categories[column].get_indexer(list(values))
+            # One extra slot at the end so missing values (code -1) never match.
+            lookup = np.zeros(len(self.categories[column]) + 1, dtype=bool)
+            lookup[selected[selected >= 0]] = True
+            mask &= lookup[self.codes[column]]
+        return mask
+
+    def options(self, column: str, filters: Optional[Dict[str, List]] = None) -> List:
+        """Sorted distinct values of ``column`` among rows matching ``filters``."""
+        if column not in self.codes:
+            return []
+        codes = self.codes[column]
+        if filters:
+            codes = codes[self.mask(filters)]
+        present = np.bincount(codes[codes >= 0], minlength=len(self.categories[column])) > 0
+        return self.categories[column][present].tolist()
+
+    def row_positions(self, filters: Optional[Dict[str, List]] = None) -> np.ndarray:
+        """Positions of the rows matching ``filters`` (for ``df.iloc``)."""
+        return np.flatnonzero(self.mask(filters))
+
+
+@dataclass
+class AggregationCube:
+    """
+    Reported, female and male sums pre-aggregated by (org indicator, project,
+    country, region, district, school), built once per dataset.
+
+    Gender is kept as two measure columns (``Female``/``Male``) rather than
+    as a row dimension, so the cube is half the size of the long format.
+    Key columns are categorical; rows whose org indicator is missing from the
+    catalog are kept (so filter options match the data) but ignored by
+    ``rollup``. Cells are filtered through a ``FilterIndex`` on the key
+    columns.
+    """
+
+    frame: pd.DataFrame
+    gender_source: str
+    org_indicator_col: str = "Mapped_Org_Indicator_ID"
+    project_col: str = "Project"
+    index: FilterIndex = field(init=False, repr=False)
+
+    def __post_init__(self):
+        self.index = FilterIndex(self.frame, [*CUBE_LOCATION_COLUMNS, self.project_col])
+
+    def filter_options(
+        self,
+        column: str,
+        filters: Optional[Dict[str, List[str]]] = None,
+    ) -> List:
+        """Sorted distinct values of ``column`` among cells matching ``filters``."""
+        return self.index.options(column, filters)
+
+    def duplicates(
+        self,
+        filters: Optional[Dict[str, List[str]]] = None,
+        fuzzy_schools: bool = False,
+    ) -> DuplicateClusters:
+        """Cross-project duplicate clusters among the cells matching ``filters`` (see ``src.duplicates``)."""
+        cells = self.frame.iloc[self.index.row_positions(filters)]
+        return find_duplicate_clusters(
+            cells[cells["name"].notna()],
+            org_indicator_col=self.org_indicator_col,
+            project_col=self.project_col,
+            value_col="Total_Value",
+            fuzzy_schools=fuzzy_schools,
+        )
+
+    @INSTRUMENTS.timed("dashboard.rollup")
+    def rollup(self, filters: Optional[Dict[str, List[str]]] = None) -> Dict[str, object]:
+        """Dashboard aggregates (``compute_dashboard_aggregates`` format) for ``filters``."""
+        org_col, project_col = self.org_indicator_col, self.project_col
+        cells = self.frame.iloc[self.index.row_positions(filters)]
+        cells = cells[cells["name"].notna()]
+
+        org_agg = cells.groupby([org_col, "name"], observed=True, as_index=False)["Total_Value"].sum()
+
+        def _by_gender(keys: List[str]) -> pd.DataFrame:
+            wide = cells.groupby(keys, observed=True, as_index=False)[["Female", "Male"]].sum()
+            with INSTRUMENTS.span("dashboard.melt"):
+                long = wide.melt(id_vars=keys, var_name="Gender", value_name="Gender_Value")
+                return _plain_values(long.sort_values(keys + ["Gender"], ignore_index=True))
+
+        return {
+            "org_agg": _plain_values(org_agg),
+            "org_gender_agg": _by_gender([org_col, "name"]),
+            "proj_gender_agg": _by_gender([project_col, "name"]),
+            "gender_source": self.gender_source,
+        }
+
+
+@INSTRUMENTS.timed("dashboard.cube_build")
+def build_aggregation_cube(
+    df: pd.DataFrame,
+    org_indicators: List[Dict],
+    org_indicator_col: str = "Mapped_Org_Indicator_ID",
+    project_col: str = "Project",
+    reported_col: str = "Reported_Value",
+    female_col: str = "Female_Value",
+    male_col: str = "Male_Value",
+) -> AggregationCube:
+    """
+    Pre-aggregate mapped rows into an ``AggregationCube``.
+
+    Uses the real gender columns when both are present, otherwise the demo
+    52/48 split (rounded per row). A missing ``reported_col`` is
+    simulated once here rather than on every rerun.
+    """
+    org_df = catalog_frame(org_indicators)
+    names = df[org_indicator_col].map(org_df.set_index("org_indicator_id")["name"])
+
+    # Measures are widened to 64 bits so compact (int32/float32) columns sum exactly.
+    if reported_col in df.columns:
+        reported = widen_measure(df[reported_col])
+    else:
+        # Use or simulate a total numeric value for demonstration
+        reported = np.random.randint(50, 5000, size=len(df))
+
+    if female_col in df.columns and male_col in df.columns:
+        gender_source = "real"
+        female, male = widen_measure(df[female_col]), widen_measure(df[male_col])
+    else:
+        gender_source = "demo"
+        female = np.round(reported * FEMALE_RATIO)
+        male = np.round(reported * MALE_RATIO)
+
+    school_col = "School_Name" if "School_Name" in df.columns else "School"
+    keys = {org_indicator_col: df[org_indicator_col], "name": names, project_col: df[project_col]}
+    for column in CUBE_LOCATION_COLUMNS:
+        source_col = school_col if column == "School_Name" else column
+        if source_col in df.columns:
+            keys[column] = df[source_col]
+
+    cells = pd.DataFrame({key: _sorted_category(values) for key, values in keys.items()})
+    cells["Total_Value"] = reported
+    cells["Female"] = female
+    cells["Male"] = male
+    frame = cells.groupby(list(keys), observed=True, dropna=False, as_index=False)[
+        ["Total_Value", "Female", "Male"]
+    ].sum()
+    return AggregationCube(frame, gender_source, org_indicator_col, project_col)
+
+
+def compute_dashboard_aggregates(
     df: pd.DataFrame,
     org_indicators: List[Dict],
     indicator_col: str = "Project_Indicator_Name",
@@ -19,43 +256,165 @@ def run_dashboard_with_gender(
     reported_col: str = "Reported_Value",
     female_col: str = "Female_Value",
     male_col: str = "Male_Value",
-) -> None:
+) -> Dict[str, object]:
     """
-    Build an org-level dashboard with:
-      - KPI cards (students, schools, teachers, households)
-      - Overall totals by org indicator
-      - Gender-disaggregated charts
+    Aggregate mapped rows (already filtered to mapped org indicators) into:
+      - org_agg: totals by org indicator
+      - org_gender_agg / proj_gender_agg: long format by gender
+      - gender_source: "real" (gender columns) or "demo" (52/48 split)
+
+    One-off roll-up of a fresh ``build_aggregation_cube``; build the cube
+    once and call ``rollup`` instead when filters change repeatedly.
     """
+    cube = build_aggregation_cube(
+        df,
+        org_indicators,
+        org_indicator_col=org_indicator_col,
+        project_col=project_col,
+        reported_col=reported_col,
+        female_col=female_col,
+        male_col=male_col,
+    )
+    return cube.rollup()
 
-    if df.empty:
-        st.info("No data provided.")
-        return
 
-    if org_indicator_col not in df.columns:
-        st.error(f"Required column `{org_indicator_col}` not found in uploaded data.")
-        return
+def search_rows(frame: pd.DataFrame, search: str = "") -> np.ndarray:
+    """
+    Positions of the rows containing ``search`` (case-insensitive) in any
+    text column. For categorical columns only the categories are searched.
+    """
+    needle = search.strip().lower()
+    if not needle:
+        return np.arange(len(frame))
+    matches = np.zeros(len(frame), dtype=bool)
+    for column in frame.columns:
+        values = frame[column]
+        if isinstance(values.dtype, pd.CategoricalDtype):
+            categories = values.cat.categories.astype(str).str.lower()
+            hit_codes = np.flatnonzero(categories.str.contains(needle, regex=False))
+            matches |= np.isin(values.cat.codes.to_numpy(), hit_codes)
+        elif values.dtype == object or pd.api.types.is_string_dtype(values.dtype):
+            matches |= values.astype(str).str.lower().str.contains(needle, regex=False).to_numpy()
+    return np.flatnonzero(matches)
 
-    # Use or simulate a total numeric value for demonstration
-    if reported_col not in df.columns:
-        df[reported_col] = np.random.randint(50, 5000, size=len(df))
 
-    # Only keep rows that have a mapped org indicator
-    df = df[df[org_indicator_col].notna()].copy()
-    if df.empty:
-        st.info("No mapped indicators found after filtering.")
+def table_page(
+    frame: pd.DataFrame,
+    positions: np.ndarray,
+    sort_by: Optional[str] = None,
+    ascending: bool = True,
+    page: int = 1,
+    page_size: int = TABLE_PAGE_SIZE,
+) -> pd.DataFrame:
+    """
+    One page of the rows at ``positions`` (see ``search_rows``), optionally
+    sorted by ``sort_by``. Sorting works on positions; only the requested
+    page is materialised.
+    """
+    if sort_by in frame.columns:
+        values = frame[sort_by].iloc[positions].reset_index(drop=True)
+        order = values.sort_values(ascending=ascending, kind="stable", na_position="last").index
+        positions = positions[order.to_numpy()]
+    start = (max(page, 1) - 1) * page_size
+    return frame.iloc[positions[start : start + page_size]]
+
+
+@INSTRUMENTS.timed("render.table")
+def paginated_table(frame: pd.DataFrame, key: str, page_size: int = TABLE_PAGE_SIZE) -> None:
+    """
+    Searchable, sortable table that only sends the visible page to the
+    browser (``frame`` stays on the server, e.g. in a cache).
+    """
+    if len(frame) <= page_size:
+        st.dataframe(frame, use_container_width=True)
         return
 
-    org_df = pd.DataFrame(org_indicators)
-    merged = df.merge(
-        org_df[["org_indicator_id", "name"]],
-        left_on=org_indicator_col,
-        right_on="org_indicator_id",
-        how="left",
+    col_search, col_sort, col_order, col_page = st.columns([3, 2, 1, 1])
+    search = col_search.text_input("Search", key=f"{key}_search", placeholder="Filter rows…")
+    sort_by = col_sort.selectbox("Sort by", ["(original order)", *frame.columns], key=f"{key}_sort")
+    descending = col_order.checkbox("Descending", key=f"{key}_desc")
+
+    positions = search_rows(frame, search)
+    n_matching = len(positions)
+    n_pages = max(1, -(-n_matching // page_size))
+    # Keyed on the search so a new search starts on page 1 (and never past the end)
+    page = col_page.number_input(
+        f"Page (of {n_pages:,})", 1, n_pages, 1, key=f"{key}_page_{search}_{n_pages}"
+    )
+
+    rows = table_page(frame, positions, sort_by, not descending, int(page), page_size)
+    st.dataframe(rows, use_container_width=True)
+    first = (int(page) - 1) * page_size
+    st.caption(
+        f"Rows {first + 1 if n_matching else 0:,}–{first + len(rows):,} of {n_matching:,}"
+        + (f" (filtered from {len(frame):,})" if n_matching != len(frame) else "")
+    )
+
+
+def export_table(frame: pd.DataFrame, file_stem: str, label: str, key: str) -> None:
+    """
+    Format picker plus download button. The export is only built when the
+    button is clicked (see ``src.export_utils.export_file``).
+    """
+    col_format, col_button = st.columns([1, 3])
+    fmt = col_format.selectbox(
+        "Format", list(EXPORT_FORMATS), key=f"{key}_format", label_visibility="collapsed"
     )
+    col_button.download_button(
+        label,
+        data=partial(export_file, frame, fmt),
+        file_name=export_file_name(file_stem, fmt),
+        mime=EXPORT_FORMATS[fmt][1],
+        key=f"{key}_download",
+    )
+
+
+def top_n_with_other(
+    frame: pd.DataFrame,
+    column: str,
+    value_col: str,
+    n: int,
+    other_label: str = OTHER_LABEL,
+) -> Tuple[pd.DataFrame, List]:
+    """
+    Keep the ``n`` largest values of ``column`` (by total ``value_col``) and
+    sum the rest into ``other_label``, per combination of the remaining
+    columns. Returns the reduced frame and the category order (largest
+    first, ``other_label`` last) for the chart axis.
+    """
+    totals = frame.groupby(column, observed=True)[value_col].sum().sort_values(ascending=False)
+    if len(totals) <= n:
+        return frame, totals.index.tolist()
+    keep = totals.index[:n]
+    labels = frame[column].astype(object).where(frame[column].isin(keep), other_label)
+    by = [column, *(c for c in frame.columns if c not in (column, value_col))]
+    reduced = frame.assign(**{column: labels}).groupby(by, as_index=False, sort=False)[value_col].sum()
+    return reduced, [*keep.tolist(), other_label]
 
-    # ----------------- Org totals (all genders) ----------------- #
-    org_agg = merged.groupby([org_indicator_col, "name"], as_index=False)[reported_col].sum()
-    org_agg = org_agg.rename(columns={reported_col: "Total_Value"})
+
+@INSTRUMENTS.timed("dashboard.render")
+def render_dashboard(
+    aggregates: Dict[str, object],
+    org_indicator_col: str = "Mapped_Org_Indicator_ID",
+    project_col: str = "Project",
+    top_n_projects: int = CHART_TOP_N_PROJECTS,
+    compact_charts: bool = False,
+    duplicates: Optional[DuplicateClusters] = None,
+) -> None:
+    """
+    Draw KPI cards, tables and charts from ``compute_dashboard_aggregates`` output.
+
+    The project chart is reduced to the ``top_n_projects`` largest projects
+    plus "Other", so its payload does not grow with the number of projects.
+    ``compact_charts`` draws it as a single project x indicator heatmap trace
+    instead of one bar trace per indicator facet and gender.
+
+    With ``duplicates`` (see ``src.duplicates``) the KPI cards show
+    de-duplicated totals, i.e. each duplicate cluster counted once.
+    """
+    org_agg = aggregates["org_agg"]
+    org_gender_agg = aggregates["org_gender_agg"]
+    proj_gender_agg = aggregates["proj_gender_agg"]
 
     # ---------- NEW: KPI overview widgets ---------- #
     st.markdown("### 🔹 Key Performance Indicators")
@@ -68,101 +427,266 @@ def run_dashboard_with_gender(
         "EDP_OUT2_HH": "Total households engaged",
     }
 
+    # Double-counted value per indicator, removed from the KPI totals
+    excess = duplicates.excess_by_indicator() if duplicates is not None else pd.Series(dtype=float)
+
     # Compute totals for each KPI (0 if not present)
     kpi_values = {}
+    kpi_deltas = {}
     for ind_id, label in kpi_defs.items():
         value = (
             org_agg.loc[org_agg[org_indicator_col] == ind_id, "Total_Value"]
             .sum()
         )
-        kpi_values[label] = int(value) if not np.isnan(value) else 0
+        removed = int(excess.get(ind_id, 0))
+        kpi_values[label] = (int(value) if not np.isnan(value) else 0) - removed
+        kpi_deltas[label] = f"-{removed:,} duplicates" if removed else None
 
-    col1, col2, col3, col4 = st.columns(4)
-    col1.metric("👩‍🎓 Students reached", f"{kpi_values['Total students reached']:,}")
-    col2.metric("🏫 Schools supported", f"{kpi_values['Total schools supported']:,}")
-    col3.metric("👩‍🏫 Teachers trained", f"{kpi_values['Total teachers trained']:,}")
-    col4.metric("🏠 Households engaged", f"{kpi_values['Total households engaged']:,}")
+    kpi_cards = [
+        ("👩‍🎓 Students reached", "Total students reached"),
+        ("🏫 Schools supported", "Total schools supported"),
+        ("👩‍🏫 Teachers trained", "Total teachers trained"),
+        ("🏠 Households engaged", "Total households engaged"),
+    ]
+    for col, (title, label) in zip(st.columns(4), kpi_cards):
+        col.metric(title, f"{kpi_values[label]:,}", kpi_deltas[label], delta_color="off")
 
-    st.markdown("### 🔹 Organization-level totals (all genders combined)")
-    st.dataframe(org_agg, use_container_width=True)
+    if duplicates is not None:
+        clusters = duplicates.clusters
+        st.caption(
+            f"De-duplicated across projects: {len(clusters):,} duplicate clusters "
+            "(same location, school and indicator reported by several projects) are counted once, "
+            "at the largest single-project value."
+        )
+        if not clusters.empty:
+            with st.expander(f"🔁 Duplicate clusters ({len(clusters):,})"):
+                paginated_table(clusters, key="duplicate_clusters")
+                export_table(clusters, "educationpeople_duplicate_clusters", "Duplicate clusters", key="export_duplicates")
+        org_agg = deduplicated_totals(org_agg, duplicates, org_indicator_col)
 
-    fig_totals = px.bar(
-        org_agg,
-        x="name",
-        y="Total_Value",
-        title="Total by EducationPeople indicator",
-    )
-    fig_totals.update_layout(xaxis_title="Indicator", yaxis_title="Total")
-    st.plotly_chart(fig_totals, use_container_width=True)
+    st.markdown("### 🔹 Organization-level totals (all genders combined)")
+    paginated_table(org_agg, key="org_agg")
 
-    # ----------------- Gender disaggregation ----------------- #
-    has_female = female_col in df.columns
-    has_male = male_col in df.columns
+    with INSTRUMENTS.span("render.plotly"):
+        fig_totals = px.bar(
+            org_agg,
+            x="name",
+            y="Total_Value",
+            title="Total by EducationPeople indicator",
+        )
+        fig_totals.update_layout(xaxis_title="Indicator", yaxis_title="Total")
+        st.plotly_chart(fig_totals, use_container_width=True)
 
-    if has_female and has_male:
+    if aggregates["gender_source"] == "real":
         st.markdown("### 🔹 Gender-disaggregated dashboard (using real gender columns)")
-        gender_df = df[[project_col, indicator_col, org_indicator_col, female_col, male_col]].copy()
+    else:
+        st.markdown("### 🔹 Gender-disaggregated dashboard (demo split from totals)")
+
+    st.markdown("**Organization-level totals by indicator and gender**")
+    paginated_table(org_gender_agg, key="org_gender_agg")
 
-        gender_df = gender_df.merge(
-            org_df[["org_indicator_id", "name"]],
-            left_on=org_indicator_col,
-            right_on="org_indicator_id",
-            how="left",
+    with INSTRUMENTS.span("render.plotly"):
+        fig_org_gender = px.bar(
+            org_gender_agg,
+            x="name",
+            y="Gender_Value",
+            color="Gender",
+            barmode="group",
+            title="EducationPeople indicators by gender",
         )
+        fig_org_gender.update_layout(xaxis_title="Indicator", yaxis_title="Total")
+        st.plotly_chart(fig_org_gender, use_container_width=True)
 
-        gender_df = gender_df.melt(
-            id_vars=[project_col, indicator_col, org_indicator_col, "name"],
-            value_vars=[female_col, male_col],
-            var_name="Gender",
-            value_name="Gender_Value",
+    with INSTRUMENTS.span("render.plotly"):
+        proj_chart, project_order = top_n_with_other(
+            proj_gender_agg, project_col, "Gender_Value", top_n_projects
+        )
+        title = "Project contributions to indicators by gender"
+        if len(project_order) > top_n_projects:
+            title += f" (top {top_n_projects} projects + Other)"
+
+        if compact_charts:
+            matrix = proj_chart.pivot_table(
+                index=project_col, columns="name", values="Gender_Value", aggfunc="sum", observed=True
+            ).reindex(project_order)
+            fig_proj_gender = px.imshow(
+                matrix,
+                aspect="auto",
+                color_continuous_scale="Blues",
+                title=title.replace("by gender", "(all genders)"),
+            )
+            fig_proj_gender.update_layout(xaxis_title="Indicator", yaxis_title="Project")
+        else:
+            fig_proj_gender = px.bar(
+                proj_chart,
+                x=project_col,
+                y="Gender_Value",
+                color="Gender",
+                facet_col="name",
+                facet_col_wrap=2,
+                category_orders={project_col: project_order},
+                title=title,
+            )
+        st.plotly_chart(fig_proj_gender, use_container_width=True)
+
+    with st.expander("⬇️ Export aggregate tables"):
+        export_table(org_agg, "educationpeople_org_totals", "Organization totals", key="export_org_agg")
+        export_table(
+            org_gender_agg, "educationpeople_org_by_gender", "Organization totals by gender", key="export_org_gender"
+        )
+        export_table(
+            proj_gender_agg, "educationpeople_projects_by_gender", "Project totals by gender", key="export_proj_gender"
         )
-        gender_df["Gender"] = gender_df["Gender"].str.replace("_Value", "", regex=False)
-    else:
-        st.markdown("### 🔹 Gender-disaggregated dashboard (demo split from totals)")
 
-        female_ratio, male_ratio = 0.52, 0.48
 
-        df_f = merged.copy()
-        df_f["Gender"] = "Female"
-        df_f["Gender_Value"] = (df_f[reported_col] * female_ratio).round(0)
+def run_dashboard_with_gender(
+    df: Optional[pd.DataFrame],
+    org_indicators: List[Dict],
+    indicator_col: str = "Project_Indicator_Name",
+    org_indicator_col: str = "Mapped_Org_Indicator_ID",
+    project_col: str = "Project",
+    reported_col: str = "Reported_Value",
+    female_col: str = "Female_Value",
+    male_col: str = "Male_Value",
+    store: Optional[sqlite3.Connection] = None,
+    filters: Optional[Dict[str, List[str]]] = None,
+    cube: Optional[AggregationCube] = None,
+    cache: Optional[SharedCache] = None,
+    dataset_key: Optional[str] = None,
+    top_n_projects: int = CHART_TOP_N_PROJECTS,
+    compact_charts: bool = False,
+    deduplicate: bool = False,
+    fuzzy_schools: bool = False,
+) -> None:
+    """
+    Build an org-level dashboard with:
+      - KPI cards (students, schools, teachers, households)
+      - Overall totals by org indicator
+      - Gender-disaggregated charts
 
-        df_m = merged.copy()
-        df_m["Gender"] = "Male"
-        df_m["Gender_Value"] = (df_m[reported_col] * male_ratio).round(0)
+    With a ``store`` connection (see ``src.db_store``) the aggregates are
+    queried from the persistent store for the given ``filters`` and ``df`` is
+    not used. Likewise, with a prebuilt ``cube`` (see
+    ``build_aggregation_cube``) the aggregates are a roll-up of the cube for
+    ``filters``, so filter changes never touch the row-level data.
 
-        gender_df = pd.concat([df_f, df_m], ignore_index=True)
+    With a shared ``cache`` the store and cube aggregates are looked up under
+    (store version or ``dataset_key``, catalog version, filter selection)
+    first, so sessions viewing the same selection share one roll-up.
 
-    # org-level by gender
-    org_gender_agg = gender_df.groupby([org_indicator_col, "name", "Gender"], as_index=False)[
-        "Gender_Value"
-    ].sum()
+    With ``deduplicate`` the KPI cards count rows that several projects
+    report for the same location, school and org indicator once (see
+    ``src.duplicates``), matching school names fuzzily with ``fuzzy_schools``.
+    """
+    duplicates = None
 
-    st.markdown("**Organization-level totals by indicator and gender**")
-    st.dataframe(org_gender_agg, use_container_width=True)
-
-    fig_org_gender = px.bar(
-        org_gender_agg,
-        x="name",
-        y="Gender_Value",
-        color="Gender",
-        barmode="group",
-        title="EducationPeople indicators by gender",
-    )
-    fig_org_gender.update_layout(xaxis_title="Indicator", yaxis_title="Total")
-    st.plotly_chart(fig_org_gender, use_container_width=True)
+    if store is not None:
+        with INSTRUMENTS.span("dashboard.store_aggregates"):
+            if cache is not None:
+                aggregates = cache.get_or_compute(
+                    ("store_aggregates", *store_version(store), filter_key(filters)),
+                    lambda: query_dashboard_aggregates(store, filters),
+                )
+            else:
+                aggregates = query_dashboard_aggregates(store, filters)
+        if aggregates["org_agg"].empty:
+            st.info("No mapped indicators found in the store for these filters.")
+            return
+        if deduplicate:
 
-    # project-level by gender
-    proj_gender_agg = gender_df.groupby([project_col, "name", "Gender"], as_index=False)[
-        "Gender_Value"
-    ].sum()
+            def store_duplicates() -> DuplicateClusters:
+                cells = query_location_cells(store, filters)
+                return find_duplicate_clusters(cells, value_col="Total_Value", fuzzy_schools=fuzzy_schools)
 
-    fig_proj_gender = px.bar(
-        proj_gender_agg,
-        x=project_col,
-        y="Gender_Value",
-        color="Gender",
-        facet_col="name",
-        facet_col_wrap=2,
-        title="Project contributions to indicators by gender",
+            if cache is not None:
+                duplicates = cache.get_or_compute(
+                    ("store_duplicates", *store_version(store), filter_key(filters), fuzzy_schools),
+                    store_duplicates,
+                )
+            else:
+                duplicates = store_duplicates()
+        render_dashboard(
+            aggregates, top_n_projects=top_n_projects, compact_charts=compact_charts, duplicates=duplicates
+        )
+        return
+
+    if cube is not None:
+        with INSTRUMENTS.span("dashboard.aggregates"):
+            if cache is not None and dataset_key is not None:
+                aggregates = cache.get_or_compute(
+                    ("aggregates", dataset_key, catalog_fingerprint(org_indicators), filter_key(filters)),
+                    lambda: cube.rollup(filters),
+                )
+            else:
+                aggregates = cube.rollup(filters)
+        if aggregates["org_agg"].empty:
+            st.info("No mapped indicators found after filtering.")
+            return
+        if deduplicate:
+            if cache is not None and dataset_key is not None:
+                duplicates = cache.get_or_compute(
+                    (
+                        "duplicates",
+                        dataset_key,
+                        catalog_fingerprint(org_indicators),
+                        filter_key(filters),
+                        fuzzy_schools,
+                    ),
+                    lambda: cube.duplicates(filters, fuzzy_schools),
+                )
+            else:
+                duplicates = cube.duplicates(filters, fuzzy_schools)
+        render_dashboard(
+            aggregates,
+            org_indicator_col=cube.org_indicator_col,
+            project_col=cube.project_col,
+            top_n_projects=top_n_projects,
+            compact_charts=compact_charts,
+            duplicates=duplicates,
+        )
+        return
+
+    if df.empty:
+        st.info("No data provided.")
+        return
+
+    if org_indicator_col not in df.columns:
+        st.error(f"Required column `{org_indicator_col}` not found in uploaded data.")
+        return
+
+    # Only keep rows that have a mapped org indicator
+    df = df[df[org_indicator_col].notna()]
+    if df.empty:
+        st.info("No mapped indicators found after filtering.")
+        return
+
+    cube = build_aggregation_cube(
+        df,
+        org_indicators,
+        org_indicator_col=org_indicator_col,
+        project_col=project_col,
+        reported_col=reported_col,
+        female_col=female_col,
+        male_col=male_col,
+    )
+    aggregates = cube.rollup()
+    if deduplicate:
+        if reported_col in df.columns:
+            duplicates = find_duplicate_clusters(
+                df,
+                org_indicator_col=org_indicator_col,
+                project_col=project_col,
+                value_col=reported_col,
+                fuzzy_schools=fuzzy_schools,
+            )
+        else:
+            # No reported values: de-duplicate the simulated ones the KPI totals use
+            duplicates = cube.duplicates(fuzzy_schools=fuzzy_schools)
+    render_dashboard(
+        aggregates,
+        org_indicator_col=org_indicator_col,
+        project_col=project_col,
+        top_n_projects=top_n_projects,
+        compact_charts=compact_charts,
+        duplicates=duplicates,
     )
-    st.plotly_chart(fig_proj_gender, use_container_width=True)
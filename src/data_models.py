@@ -0,0 +1,125 @@
+"""
+Typed, memory-compact dataset models for EducationPeople.
+
+Mapping results and reported values arrive as wide object-dtype frames in
+which every project, location and indicator name is a separate Python string
+on every row. ``compact_frame`` converts them to the column models below:
+
+ - name columns are dictionary-encoded categoricals (one copy of each
+   distinct string plus small integer codes),
+ - reported values are int32 (float32 when fractional or missing),
+ - gender values are nullable Int32 (float32 when fractional),
+ - similarity scores are float32.
+
+Both pages convert their datasets on load, so every Streamlit session holds
+the compact copy. Aggregations widen the numbers again before summing (see
+``widen_measure``), so totals do not lose precision.
+"""
+
+from typing import Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+
+NAME = "name"
+VALUE = "value"
+COUNT = "count"
+SCORE = "score"
+
+# Column -> model of the column in compact frames. Columns not listed here
+# are left as they are.
+COLUMN_MODELS: Dict[str, str] = {
+    "Project": NAME,
+    "Country": NAME,
+    "Region": NAME,
+    "District": NAME,
+    "School_Name": NAME,
+    "School": NAME,
+    "Level": NAME,
+    "Program_Type": NAME,
+    "Focus_Area": NAME,
+    "Source_File": NAME,
+    "__Source_File": NAME,
+    "Project_Indicator_Name": NAME,
+    "Indicator_Name": NAME,
+    "Best_Org_Indicator_ID": NAME,
+    "Mapped_Org_Indicator_ID": NAME,
+    "Reported_Value": VALUE,
+    "Female_Value": COUNT,
+    "Male_Value": COUNT,
+    "Similarity_Score": SCORE,
+}
+
+_INT32 = np.iinfo(np.int32)
+
+
+def _integral(values: pd.Series) -> bool:
+    """True when all non-missing values are whole numbers within int32 range."""
+    present = values.dropna().to_numpy(dtype=float)
+    return bool(
+        np.all(np.mod(present, 1) == 0)
+        and (present.size == 0 or (present.min() >= _INT32.min and present.max() <= _INT32.max))
+    )
+
+
+def to_name(values: pd.Series) -> pd.Series:
+    """Dictionary-encode a name column."""
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        return values.cat.remove_unused_categories()
+    return values.astype("category")
+
+
+def to_value(values: pd.Series) -> pd.Series:
+    """int32 when every value is a whole number, otherwise float32."""
+    numbers = pd.to_numeric(values, errors="coerce")
+    if numbers.notna().all() and _integral(numbers):
+        return numbers.astype(np.int32)
+    return numbers.astype(np.float32)
+
+
+def to_count(values: pd.Series) -> pd.Series:
+    """Nullable Int32 for whole numbers (missing stays missing), otherwise float32."""
+    numbers = pd.to_numeric(values, errors="coerce")
+    if _integral(numbers):
+        return numbers.astype("Int32")
+    return numbers.astype(np.float32)
+
+
+def to_score(values: pd.Series) -> pd.Series:
+    return pd.to_numeric(values, errors="coerce").astype(np.float32)
+
+
+_CONVERTERS = {NAME: to_name, VALUE: to_value, COUNT: to_count, SCORE: to_score}
+
+
+def compact_frame(df: pd.DataFrame, models: Optional[Dict[str, str]] = None) -> pd.DataFrame:
+    """
+    Convert the columns of ``df`` listed in ``models`` (default
+    ``COLUMN_MODELS``) to their compact dtypes. Returns a new frame;
+    unlisted columns are shared with ``df``, not copied.
+    """
+    models = COLUMN_MODELS if models is None else models
+    converted = {
+        column: _CONVERTERS[models[column]](df[column])
+        for column in df.columns
+        if column in models
+    }
+    if not converted:
+        return df
+    return df.assign(**converted)
+
+
+def widen_measure(values: pd.Series) -> np.ndarray:
+    """
+    64-bit numpy copy of a compact numeric column for summing: int64 when it
+    has no missing values and is integral, otherwise float64 (NaN for missing).
+    """
+    if pd.api.types.is_integer_dtype(values.dtype) and not values.isna().any():
+        return values.to_numpy(dtype=np.int64)
+    return pd.to_numeric(values, errors="coerce").to_numpy(dtype=np.float64, na_value=np.nan)
+
+
+def frame_memory(df: pd.DataFrame) -> int:
+    """Deep memory usage of ``df`` in bytes."""
+    return int(df.memory_usage(deep=True).sum())
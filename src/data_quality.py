@@ -0,0 +1,286 @@
+"""
+Vectorized data-quality (DQ) checks for reported indicator values.
+
+Every rule is a columnar NumPy/pandas expression evaluated on a whole chunk
+at once; there are no per-row Python checks. Uploads are checked chunk by
+chunk (see ``check_quality_chunks``), so the data is read once and never
+needs to fit in memory as a whole. The result is one ``uint8`` bitmask per
+row (bit ``1 << i`` set when the row violates rule ``i``, see ``RULES``) and
+summary counts per rule.
+
+Two rules need the whole dataset rather than one chunk: outliers are judged
+against the median of their indicator group, and duplicates against all
+earlier rows. For these, each chunk only contributes compact per-row arrays
+(a group code and a float32 value, a 64-bit row hash), which are evaluated
+together after the last chunk.
+"""
+
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from src.instrumentation import INSTRUMENTS
+
+
+MISSING_VALUE = 1 << 0
+NEGATIVE_VALUE = 1 << 1
+GENDER_MISSING = 1 << 2
+GENDER_ZERO = 1 << 3
+GENDER_MISMATCH = 1 << 4
+OUTLIER = 1 << 5
+DUPLICATE = 1 << 6
+
+# Bit -> (rule name, description), in bit order.
+RULES: Dict[int, Tuple[str, str]] = {
+    MISSING_VALUE: ("Missing value", "Reported value is empty or not a number"),
+    NEGATIVE_VALUE: ("Negative value", "Reported, female or male value is below zero"),
+    GENDER_MISSING: ("Gender incomplete", "Female or male value is empty while the total is reported"),
+    GENDER_ZERO: ("Gender not disaggregated", "Female and male are both 0 while the total is above 0"),
+    GENDER_MISMATCH: ("Gender mismatch", "Female + Male differs from the reported total"),
+    OUTLIER: ("Outlier", "Reported value far from the median of its indicator (log scale, modified z-score)"),
+    DUPLICATE: ("Duplicate row", "Same values as an earlier row (source file ignored)"),
+}
+
+# Modified z-score above which a value is an outlier (Iglewicz & Hoaglin).
+OUTLIER_Z = 3.5
+# Groups smaller than this are not checked for outliers.
+OUTLIER_MIN_GROUP = 5
+# Female + Male may differ from the total by this much (rounding in reports).
+GENDER_TOLERANCE = 0.0
+
+# Columns ignored when looking for duplicate rows.
+DUPLICATE_IGNORE_COLUMNS = ["Source_File", "__Source_File"]
+# Outlier groups: the first of these columns present in the data.
+GROUP_COLUMNS = ["Mapped_Org_Indicator_ID", "Project_Indicator_Name", "Indicator_Name"]
+
+
+@dataclass
+class QualityReport:
+    """Per-row violation bitmask of a checked dataset plus summary counts."""
+
+    flags: np.ndarray
+
+    @property
+    def n_rows(self) -> int:
+        return len(self.flags)
+
+    def count(self, rule: int) -> int:
+        return int(np.count_nonzero(self.flags & rule))
+
+    def summary(self) -> pd.DataFrame:
+        """Rows violating each rule, and the share of all rows."""
+        counts = [self.count(bit) for bit in RULES]
+        return pd.DataFrame(
+            {
+                "Rule": [name for name, _ in RULES.values()],
+                "Description": [description for _, description in RULES.values()],
+                "Rows": counts,
+                "Share": [round(c / self.n_rows, 4) if self.n_rows else 0.0 for c in counts],
+            }
+        )
+
+    def rows_with(self, rules: Optional[int] = None) -> np.ndarray:
+        """Positions of the rows violating any of ``rules`` (default: any rule)."""
+        if rules is None:
+            return np.flatnonzero(self.flags)
+        return np.flatnonzero(self.flags & rules)
+
+    def describe(self, positions: np.ndarray) -> pd.Series:
+        """Comma-separated rule names of the rows at ``positions``."""
+        flags = self.flags[positions]
+        # Each distinct bitmask is decoded once
+        masks, codes = np.unique(flags, return_inverse=True)
+        labels = np.array(
+            [", ".join(name for bit, (name, _) in RULES.items() if mask & bit) for mask in masks],
+            dtype=object,
+        )
+        return pd.Series(labels[codes], dtype="category")
+
+
+def _numeric(chunk: pd.DataFrame, column: Optional[str]) -> Optional[np.ndarray]:
+    if column is None or column not in chunk.columns:
+        return None
+    return pd.to_numeric(chunk[column], errors="coerce").to_numpy(dtype=np.float64, na_value=np.nan)
+
+
+def row_flags(
+    chunk: pd.DataFrame,
+    reported_col: str = "Reported_Value",
+    female_col: str = "Female_Value",
+    male_col: str = "Male_Value",
+    tolerance: float = GENDER_TOLERANCE,
+) -> np.ndarray:
+    """Bitmask of the rules that only need the row itself (all but outliers and duplicates)."""
+    flags = np.zeros(len(chunk), dtype=np.uint8)
+    reported = _numeric(chunk, reported_col)
+    if reported is None:
+        return flags | MISSING_VALUE
+
+    missing = np.isnan(reported)
+    flags[missing] |= MISSING_VALUE
+    negative = reported < 0
+
+    female, male = _numeric(chunk, female_col), _numeric(chunk, male_col)
+    if female is not None and male is not None:
+        negative |= (female < 0) | (male < 0)
+        # Only checked when the data has gender columns at all
+        flags[(np.isnan(female) | np.isnan(male)) & ~missing] |= GENDER_MISSING
+        gender_total = female + male
+        zero = (gender_total == 0) & (reported > 0)
+        flags[zero] |= GENDER_ZERO
+        flags[(np.abs(gender_total - reported) > tolerance) & ~zero] |= GENDER_MISMATCH
+
+    flags[negative] |= NEGATIVE_VALUE
+    return flags
+
+
+def row_hashes(chunk: pd.DataFrame, ignore: Iterable[str] = DUPLICATE_IGNORE_COLUMNS) -> np.ndarray:
+    """
+    64-bit hash per row over every column but ``ignore``. Numbers are hashed
+    as float64 and text as strings, so the same row hashes alike whichever
+    reader (CSV, Parquet, Excel) produced its chunk.
+    """
+    columns = sorted(c for c in chunk.columns if c not in set(ignore))
+    keys = {}
+    for column in columns:
+        values = chunk[column]
+        if pd.api.types.is_numeric_dtype(values.dtype) and not pd.api.types.is_bool_dtype(values.dtype):
+            keys[column] = values.astype(np.float64)
+        elif isinstance(values.dtype, pd.CategoricalDtype):
+            # Hash the categories once instead of every row's string
+            keys[column] = values.cat.rename_categories(values.cat.categories.astype(str))
+        elif values.dtype != object and pd.api.types.is_string_dtype(values.dtype):
+            # Arrow-backed strings hash row by row; as categories each distinct string is hashed once
+            keys[column] = values.astype("category")
+        else:
+            keys[column] = values
+    return pd.util.hash_pandas_object(pd.DataFrame(keys, index=chunk.index), index=False).to_numpy()
+
+
+def outlier_mask(
+    groups: np.ndarray,
+    values: np.ndarray,
+    z: float = OUTLIER_Z,
+    min_group: int = OUTLIER_MIN_GROUP,
+) -> np.ndarray:
+    """
+    Values whose modified z-score within their group (on ``log1p`` of the
+    value) exceeds ``z``. Rows with a missing or negative value, or in a
+    group smaller than ``min_group``, are never outliers.
+    """
+    mask = np.zeros(len(values), dtype=bool)
+    valid = ~np.isnan(values) & (values >= 0)
+    if not valid.any():
+        return mask
+    logs = np.log1p(values[valid].astype(np.float64))
+    by_group = pd.Series(logs).groupby(groups[valid])
+    median = by_group.transform("median").to_numpy()
+    deviation = np.abs(logs - median)
+    mad = pd.Series(deviation).groupby(groups[valid]).transform("median").to_numpy()
+    # When over half of a group shares one value the MAD is 0; fall back to
+    # the mean absolute deviation (scaled to the same consistency)
+    mean_ad = pd.Series(deviation).groupby(groups[valid]).transform("mean").to_numpy() * 1.2533
+    scale = np.where(mad > 0, mad / 0.6745, mean_ad)
+    size = by_group.transform("size").to_numpy()
+    with np.errstate(divide="ignore", invalid="ignore"):
+        score = np.where(scale > 0, deviation / scale, 0.0)
+    mask[valid] = (score > z) & (size >= min_group)
+    return mask
+
+
+class _GroupCodes:
+    """Stable integer codes for group labels seen across chunks."""
+
+    def __init__(self):
+        self._codes: Dict[object, int] = {}
+
+    def encode(self, values: pd.Series) -> np.ndarray:
+        codes, uniques = pd.factorize(values, use_na_sentinel=False)
+        lookup = np.array(
+            [self._codes.setdefault(label, len(self._codes)) for label in uniques], dtype=np.int32
+        )
+        return lookup[codes] if len(lookup) else codes.astype(np.int32)
+
+
+def check_quality_chunks(
+    chunks: Iterable[pd.DataFrame],
+    reported_col: str = "Reported_Value",
+    female_col: str = "Female_Value",
+    male_col: str = "Male_Value",
+    group_col: Optional[str] = None,
+    tolerance: float = GENDER_TOLERANCE,
+    outlier_z: float = OUTLIER_Z,
+    check_duplicates: bool = True,
+) -> QualityReport:
+    """
+    Run all DQ rules over a stream of chunks (e.g. ``iter_upload_chunks``)
+    in one pass. ``group_col`` defaults to the first of ``GROUP_COLUMNS``
+    found in the first chunk; rows of a chunk without it form one group.
+    """
+    flag_parts: List[np.ndarray] = []
+    group_parts: List[np.ndarray] = []
+    value_parts: List[np.ndarray] = []
+    hash_parts: List[np.ndarray] = []
+    group_codes = _GroupCodes()
+
+    with INSTRUMENTS.span("quality.check"):
+        for chunk in chunks:
+            if group_col is None:
+                group_col = next((c for c in GROUP_COLUMNS if c in chunk.columns), "")
+            flag_parts.append(row_flags(chunk, reported_col, female_col, male_col, tolerance))
+            values = _numeric(chunk, reported_col)
+            value_parts.append(
+                np.full(len(chunk), np.nan, dtype=np.float32) if values is None else values.astype(np.float32)
+            )
+            if group_col in chunk.columns:
+                group_parts.append(group_codes.encode(chunk[group_col]))
+            else:
+                group_parts.append(np.full(len(chunk), -1, dtype=np.int32))
+            if check_duplicates:
+                hash_parts.append(row_hashes(chunk))
+            INSTRUMENTS.count("quality.rows", len(chunk))
+
+        if not flag_parts:
+            return QualityReport(np.zeros(0, dtype=np.uint8))
+
+        flags = np.concatenate(flag_parts)
+        flags[outlier_mask(np.concatenate(group_parts), np.concatenate(value_parts), outlier_z)] |= OUTLIER
+        if check_duplicates:
+            flags[pd.Series(np.concatenate(hash_parts)).duplicated().to_numpy()] |= DUPLICATE
+    return QualityReport(flags)
+
+
+def check_quality(df: pd.DataFrame, **options) -> QualityReport:
+    """Run all DQ rules over an in-memory frame (see ``check_quality_chunks``)."""
+    return check_quality_chunks([df], **options)
+
+
+def flagged_rows(
+    chunks: Iterable[pd.DataFrame],
+    report: QualityReport,
+    rules: Optional[int] = None,
+    limit: int = 1000,
+) -> pd.DataFrame:
+    """
+    The first ``limit`` rows violating ``rules`` (default: any rule), read
+    again from the same ``chunks`` the report was built from, with the row
+    number and the violated rules added as columns.
+    """
+    wanted = report.rows_with(rules)[:limit]
+    pieces, start = [], 0
+    for chunk in chunks:
+        if not len(wanted) or start > wanted[-1]:
+            break
+        stop = start + len(chunk)
+        positions = wanted[(wanted >= start) & (wanted < stop)]
+        if len(positions):
+            rows = chunk.iloc[positions - start].reset_index(drop=True)
+            rows.insert(0, "Issues", report.describe(positions).to_numpy())
+            rows.insert(0, "Row", positions + 1)
+            pieces.append(rows)
+        start = stop
+    if not pieces:
+        return pd.DataFrame(columns=["Row", "Issues"])
+    return pd.concat(pieces, ignore_index=True)
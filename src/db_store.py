@@ -0,0 +1,416 @@
+"""
+Persistent analytical store for EducationPeople (SQLite).
+
+Mapped results are bulk-loaded once into the schema in ``db/schema.sql``;
+dashboards then query pre-indexed aggregates instead of re-uploading and
+re-aggregating multi-year portfolios in pandas on every rerun.
+"""
+
+import hashlib
+import os
+import sqlite3
+import threading
+from contextlib import closing
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from src.data_quality import row_hashes
+
+
+DEFAULT_DB_PATH = "data/educationpeople.db"
+SCHEMA_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "db", "schema.sql")
+
+# Dashboard filter column -> SQL column (see _FROM for the aliases).
+FILTER_COLUMNS = {
+    "Country": "l.country",
+    "Region": "l.region",
+    "District": "l.district",
+    "School_Name": "l.school",
+    "Project": "p.name",
+}
+
+_FROM = """
+    FROM reported_values v
+    JOIN projects p ON p.project_id = v.project_id
+    JOIN locations l ON l.location_id = v.location_id
+    JOIN mappings m ON m.mapping_id = v.mapping_id
+"""
+
+FEMALE_RATIO, MALE_RATIO = 0.52, 0.48
+
+# Serializes writes from the threads (Streamlit sessions) of this process: the
+# dashboard shares one connection, so without it another session's statements
+# could land inside an open load transaction. Reentrant for ``save_dataset``.
+_WRITE_LOCK = threading.RLock()
+
+
+def connect(path: str = DEFAULT_DB_PATH) -> sqlite3.Connection:
+    """Open (and if needed create) the store, applying ``db/schema.sql``."""
+    if path != ":memory:":
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    conn = sqlite3.connect(path, check_same_thread=False)
+    conn.execute("PRAGMA journal_mode = WAL")
+    _migrate(conn)
+    with open(SCHEMA_PATH, "r", encoding="utf-8") as fh:
+        conn.executescript(fh.read())
+    return conn
+
+
+def _migrate(conn: sqlite3.Connection) -> None:
+    """Add the columns ``db/schema.sql`` expects to stores created by older versions."""
+    columns = [row[1] for row in conn.execute("PRAGMA table_info(load_batches)")]
+    if columns and "content_hash" not in columns:
+        conn.execute("ALTER TABLE load_batches ADD COLUMN content_hash TEXT")
+
+
+def dataset_hash(df: pd.DataFrame) -> str:
+    """
+    Content hash of a dataset: the same rows give the same hash whichever
+    file (name or format) they were read from (see ``row_hashes``).
+    """
+    digest = hashlib.sha256()
+    digest.update("\x1f".join(sorted(map(str, df.columns))).encode("utf-8"))
+    digest.update(row_hashes(df).tobytes())
+    return digest.hexdigest()
+
+
+def find_batch(conn: sqlite3.Connection, content_hash: str) -> Optional[int]:
+    """``batch_id`` of the batch loaded from a dataset with this hash, if any."""
+    row = conn.execute("SELECT batch_id FROM load_batches WHERE content_hash = ?", (content_hash,)).fetchone()
+    return None if row is None else row[0]
+
+
+def sync_org_indicators(conn: sqlite3.Connection, org_indicators: List[Dict]) -> None:
+    """Insert or update the catalog in ``org_indicators``."""
+    with _WRITE_LOCK, conn:
+        conn.executemany(
+            """
+            INSERT INTO org_indicators (org_indicator_id, name, description, level, unit, disaggregation)
+            VALUES (:org_indicator_id, :name, :description, :level, :unit, :disaggregation)
+            ON CONFLICT (org_indicator_id) DO UPDATE SET
+                name = excluded.name,
+                description = excluded.description,
+                level = excluded.level,
+                unit = excluded.unit,
+                disaggregation = excluded.disaggregation
+            """,
+            [
+                {
+                    "org_indicator_id": ind["org_indicator_id"],
+                    "name": ind.get("name", ""),
+                    "description": ind.get("description"),
+                    "level": ind.get("level"),
+                    "unit": ind.get("unit"),
+                    "disaggregation": ind.get("disaggregation"),
+                }
+                for ind in org_indicators
+            ],
+        )
+
+
+def _text_column(df: pd.DataFrame, name: Optional[str]) -> pd.Series:
+    if name is None or name not in df.columns:
+        return pd.Series("", index=df.index, dtype=object)
+    # (via object so categorical columns accept the "" fill)
+    return df[name].astype(object).fillna("").astype(str)
+
+
+def _numeric_values(df: pd.DataFrame, name: str) -> List[Optional[float]]:
+    if name not in df.columns:
+        return [None] * len(df)
+    values = pd.to_numeric(df[name], errors="coerce").astype(float).to_numpy()
+    return [None if np.isnan(v) else float(v) for v in values]
+
+
+def _dimension_ids(
+    conn: sqlite3.Connection,
+    table: str,
+    id_col: str,
+    key_cols: Sequence[str],
+    keys: pd.DataFrame,
+) -> np.ndarray:
+    """Insert missing dimension rows and return the ID of every row of ``keys``."""
+    unique = keys.drop_duplicates()
+    placeholders = ", ".join("?" for _ in key_cols)
+    conn.executemany(
+        f"INSERT OR IGNORE INTO {table} ({', '.join(key_cols)}) VALUES ({placeholders})",
+        unique.itertuples(index=False, name=None),
+    )
+    existing = pd.read_sql_query(f"SELECT {id_col}, {', '.join(key_cols)} FROM {table}", conn)
+    lookup = pd.MultiIndex.from_frame(existing[list(key_cols)].astype(str))
+    return existing[id_col].to_numpy()[lookup.get_indexer(pd.MultiIndex.from_frame(keys.astype(str)))]
+
+
+def load_mapped_results(
+    conn: sqlite3.Connection,
+    df: pd.DataFrame,
+    source: str = "upload",
+    indicator_col: str = "Project_Indicator_Name",
+    org_indicator_col: str = "Mapped_Org_Indicator_ID",
+    project_col: str = "Project",
+    content_hash: Optional[str] = None,
+) -> int:
+    """
+    Bulk-insert mapped results (mapping page / dashboard upload format).
+
+    Rows without a mapped org indicator are skipped. Dimension rows are
+    upserted once per distinct value and facts are inserted with a single
+    ``executemany`` in one transaction. Returns the new ``batch_id``.
+
+    Loading is idempotent: when a batch with the same ``content_hash``
+    (default: ``dataset_hash(df)``) exists, nothing is inserted and its
+    ``batch_id`` is returned. The check and the insert run under the
+    module's write lock; the unique index on ``content_hash`` covers other
+    processes.
+    """
+    if content_hash is None:
+        content_hash = dataset_hash(df)
+    df = df[df[org_indicator_col].notna()]
+    school_col = "School_Name" if "School_Name" in df.columns else "School"
+
+    with _WRITE_LOCK, conn:
+        existing = find_batch(conn, content_hash)
+        if existing is not None:
+            return existing
+        try:
+            cursor = conn.execute(
+                "INSERT INTO load_batches (source, loaded_at, row_count, content_hash) VALUES (?, ?, ?, ?)",
+                (source, datetime.now(timezone.utc).isoformat(timespec="seconds"), len(df), content_hash),
+            )
+        except sqlite3.IntegrityError:
+            # Another process loaded the same dataset first (content_hash is unique)
+            return find_batch(conn, content_hash)
+        batch_id = cursor.lastrowid
+        if df.empty:
+            return batch_id
+
+        project_ids = _dimension_ids(
+            conn,
+            "projects",
+            "project_id",
+            ["name"],
+            pd.DataFrame({"name": _text_column(df, project_col)}),
+        )
+        location_ids = _dimension_ids(
+            conn,
+            "locations",
+            "location_id",
+            ["country", "region", "district", "school"],
+            pd.DataFrame(
+                {
+                    "country": _text_column(df, "Country"),
+                    "region": _text_column(df, "Region"),
+                    "district": _text_column(df, "District"),
+                    "school": _text_column(df, school_col),
+                }
+            ),
+        )
+        org_ids = df[org_indicator_col].astype(str)
+        mapping_keys = pd.DataFrame(
+            {
+                "project_indicator_name": _text_column(df, indicator_col),
+                "mapped_org_indicator_id": org_ids,
+            }
+        )
+        if "Similarity_Score" in df.columns:
+            scored = mapping_keys.assign(similarity_score=_numeric_values(df, "Similarity_Score"))
+            conn.executemany(
+                """
+                INSERT OR IGNORE INTO mappings (project_indicator_name, mapped_org_indicator_id, similarity_score)
+                VALUES (?, ?, ?)
+                """,
+                scored.drop_duplicates(["project_indicator_name", "mapped_org_indicator_id"]).itertuples(
+                    index=False, name=None
+                ),
+            )
+        mapping_ids = _dimension_ids(
+            conn,
+            "mappings",
+            "mapping_id",
+            ["project_indicator_name", "mapped_org_indicator_id"],
+            mapping_keys,
+        )
+
+        conn.executemany(
+            """
+            INSERT INTO reported_values (
+                batch_id, project_id, location_id, mapping_id, mapped_org_indicator_id,
+                source_file, reported_value, female_value, male_value
+            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """,
+            zip(
+                [batch_id] * len(df),
+                project_ids.tolist(),
+                location_ids.tolist(),
+                mapping_ids.tolist(),
+                org_ids.tolist(),
+                _text_column(df, "Source_File").tolist(),
+                _numeric_values(df, "Reported_Value"),
+                _numeric_values(df, "Female_Value"),
+                _numeric_values(df, "Male_Value"),
+            ),
+        )
+    return batch_id
+
+
+def save_dataset(
+    df: pd.DataFrame,
+    source: str,
+    content_hash: Optional[str] = None,
+    path: str = DEFAULT_DB_PATH,
+) -> Tuple[int, bool]:
+    """
+    Load ``df`` on a connection of its own: ``(batch_id, created)``, where
+    ``created`` is False when the dataset was already in the store. Readers
+    on a shared connection only ever see the committed batch.
+    """
+    if content_hash is None:
+        content_hash = dataset_hash(df)
+    with _WRITE_LOCK, closing(connect(path)) as conn:
+        existing = find_batch(conn, content_hash)
+        if existing is not None:
+            return existing, False
+        return load_mapped_results(conn, df, source=source, content_hash=content_hash), True
+
+
+def store_version(conn: sqlite3.Connection) -> Tuple[str, int]:
+    """(database file, latest batch_id): changes whenever a batch is loaded, for cache keys."""
+    path = conn.execute("PRAGMA database_list").fetchone()[2]
+    latest = conn.execute("SELECT COALESCE(MAX(batch_id), 0) FROM load_batches").fetchone()[0]
+    return path, latest
+
+
+def _where(filters: Optional[Dict[str, List[str]]]) -> Tuple[str, List]:
+    clauses, params = [], []
+    for column, values in (filters or {}).items():
+        if column in FILTER_COLUMNS and values:
+            clauses.append(f"{FILTER_COLUMNS[column]} IN ({', '.join('?' for _ in values)})")
+            params.extend(values)
+    return (" WHERE " + " AND ".join(clauses)) if clauses else "", params
+
+
+def distinct_values(
+    conn: sqlite3.Connection,
+    column: str,
+    filters: Optional[Dict[str, List[str]]] = None,
+) -> List[str]:
+    """Sorted distinct values of a filter column among rows matching ``filters``."""
+    where, params = _where(filters)
+    sql_col = FILTER_COLUMNS[column]
+    rows = conn.execute(f"SELECT DISTINCT {sql_col} {_FROM} {where} ORDER BY 1", params).fetchall()
+    return [row[0] for row in rows if row[0] != ""]
+
+
+def query_rows(
+    conn: sqlite3.Connection,
+    filters: Optional[Dict[str, List[str]]] = None,
+    limit: Optional[int] = None,
+) -> pd.DataFrame:
+    """Fact rows in the dashboard upload format (e.g. for previews)."""
+    where, params = _where(filters)
+    sql = f"""
+        SELECT p.name AS Project, l.country AS Country, l.region AS Region,
+               l.district AS District, l.school AS School_Name,
+               m.project_indicator_name AS Project_Indicator_Name,
+               v.mapped_org_indicator_id AS Mapped_Org_Indicator_ID,
+               m.similarity_score AS Similarity_Score,
+               v.reported_value AS Reported_Value, v.female_value AS Female_Value,
+               v.male_value AS Male_Value, v.source_file AS Source_File
+        {_FROM} {where}
+        ORDER BY v.value_id
+    """
+    if limit is not None:
+        sql += f" LIMIT {int(limit)}"
+    return pd.read_sql_query(sql, conn, params=params)
+
+
+def query_location_cells(
+    conn: sqlite3.Connection,
+    filters: Optional[Dict[str, List[str]]] = None,
+) -> pd.DataFrame:
+    """
+    Reported totals by (location, school, org indicator, project) for the
+    rows matching ``filters``, e.g. for duplicate detection across projects.
+    """
+    where, params = _where(filters)
+    cells = pd.read_sql_query(
+        f"""
+        SELECT l.country AS Country, l.region AS Region, l.district AS District,
+               l.school AS School_Name, v.mapped_org_indicator_id AS Mapped_Org_Indicator_ID,
+               p.name AS Project, SUM(v.reported_value) AS Total_Value
+        {_FROM} {where}
+        GROUP BY v.location_id, v.mapped_org_indicator_id, v.project_id
+        """,
+        conn,
+        params=params,
+    )
+    # Missing locations are stored as "" (see _text_column)
+    location_cols = ["Country", "Region", "District", "School_Name"]
+    cells[location_cols] = cells[location_cols].replace("", None)
+    return cells
+
+
+def query_dashboard_aggregates(
+    conn: sqlite3.Connection,
+    filters: Optional[Dict[str, List[str]]] = None,
+) -> Dict[str, object]:
+    """
+    Aggregates behind ``run_dashboard_with_gender``, computed in SQL.
+
+    Returns ``org_agg`` (org totals), ``org_gender_agg`` and
+    ``proj_gender_agg`` (long format by gender) and ``gender_source``
+    ("real" when any female/male values are stored for the filtered rows,
+    otherwise "demo" with the fixed 52/48 split).
+    """
+    where, params = _where(filters)
+    from_org = f"{_FROM} JOIN org_indicators o ON o.org_indicator_id = v.mapped_org_indicator_id {where}"
+
+    org_agg = pd.read_sql_query(
+        f"""
+        SELECT v.mapped_org_indicator_id AS Mapped_Org_Indicator_ID, o.name AS name,
+               SUM(v.reported_value) AS Total_Value
+        {from_org}
+        GROUP BY v.mapped_org_indicator_id, o.name
+        ORDER BY v.mapped_org_indicator_id
+        """,
+        conn,
+        params=params,
+    )
+
+    gender_count = conn.execute(
+        f"SELECT COUNT(v.female_value) + COUNT(v.male_value) {from_org}", params
+    ).fetchone()[0]
+    if gender_count:
+        gender_source = "real"
+        female, male = "v.female_value", "v.male_value"
+    else:
+        gender_source = "demo"
+        female = f"ROUND(v.reported_value * {FEMALE_RATIO})"
+        male = f"ROUND(v.reported_value * {MALE_RATIO})"
+
+    def _by_gender(keys: str, labels: List[str]) -> pd.DataFrame:
+        wide = pd.read_sql_query(
+            f"""
+            SELECT {keys}, SUM({female}) AS Female, SUM({male}) AS Male
+            {from_org}
+            GROUP BY {keys}
+            ORDER BY {keys}
+            """,
+            conn,
+            params=params,
+        )
+        wide.columns = [*labels, "Female", "Male"]
+        long = wide.melt(id_vars=labels, var_name="Gender", value_name="Gender_Value")
+        return long.sort_values(labels + ["Gender"], ignore_index=True)
+
+    return {
+        "org_agg": org_agg,
+        "org_gender_agg": _by_gender(
+            "v.mapped_org_indicator_id, o.name", ["Mapped_Org_Indicator_ID", "name"]
+        ),
+        "proj_gender_agg": _by_gender("p.name, o.name", ["Project", "name"]),
+        "gender_source": gender_source,
+    }
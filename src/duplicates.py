@@ -0,0 +1,219 @@
+"""
+Cross-project duplicate detection for reported indicator values.
+
+When two partners report the same school and org indicator, the dashboard
+totals count those beneficiaries twice. Comparing every pair of rows is
+quadratic, so rows are first put into blocks by a hash of their location
+(Country/Region/District/School_Name) and Mapped_Org_Indicator_ID. Only a
+block that holds more than one project is a duplicate cluster. Finding the
+blocks takes one hash and one group-by over the rows, so run time grows
+near-linearly with the number of rows.
+
+Optionally, school names are matched fuzzily ("St. Mary's Primary" vs
+"St Marys Primary School"). Names are only compared with the other distinct
+names of the same Country/Region/District, never across the whole dataset.
+
+A cluster's de-duplicated value is the largest total any single project
+reported in it. The difference from the sum of all projects in the cluster
+is its excess, which ``deduplicated_totals`` subtracts from the org totals.
+"""
+
+import re
+from dataclasses import dataclass
+from difflib import SequenceMatcher
+from typing import List, Optional
+
+import numpy as np
+import pandas as pd
+
+from src.instrumentation import INSTRUMENTS
+
+
+LOCATION_COLUMNS = ["Country", "Region", "District"]
+SCHOOL_COLUMN = "School_Name"
+# Fuzzy school matching: names at least this similar (difflib ratio) are the same school.
+SCHOOL_NAME_THRESHOLD = 0.9
+# Words left out when comparing school names.
+SCHOOL_STOP_WORDS = frozenset(["school", "sch", "the", "of"])
+
+
+@dataclass
+class DuplicateClusters:
+    """
+    Duplicate clusters found by ``find_duplicate_clusters``.
+
+    ``clusters`` has one row per cluster (location, org indicator, projects,
+    reported total, kept value and excess); ``members`` has one row per input
+    row in a cluster, with its ``Cluster`` number and ``Row`` position.
+    """
+
+    clusters: pd.DataFrame
+    members: pd.DataFrame
+    org_indicator_col: str = "Mapped_Org_Indicator_ID"
+
+    def excess_by_indicator(self) -> pd.Series:
+        """Double-counted value per org indicator."""
+        if self.clusters.empty:
+            return pd.Series(dtype=float)
+        return self.clusters.groupby(self.org_indicator_col, observed=True)["Excess"].sum()
+
+
+def normalize_school_name(name) -> str:
+    """Lower-case alphanumeric words of a school name, without ``SCHOOL_STOP_WORDS``."""
+    words = re.findall(r"[a-z0-9]+", str(name).lower())
+    return " ".join(word for word in words if word not in SCHOOL_STOP_WORDS)
+
+
+def _same_school_groups(names: List[str], threshold: float) -> List[int]:
+    """Union-find over one location's distinct normalised names; returns a group per name."""
+    parent = list(range(len(names)))
+
+    def find(i: int) -> int:
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    for i in range(len(names)):
+        matcher = SequenceMatcher(None, b=names[i])
+        for j in range(i + 1, len(names)):
+            if find(i) == find(j):
+                continue
+            matcher.set_seq1(names[j])
+            # real_quick_ratio/quick_ratio are cheap upper bounds of ratio
+            if (
+                matcher.real_quick_ratio() >= threshold
+                and matcher.quick_ratio() >= threshold
+                and matcher.ratio() >= threshold
+            ):
+                parent[find(j)] = find(i)
+    return [find(i) for i in range(len(names))]
+
+
+def canonical_schools(
+    df: pd.DataFrame,
+    school_col: str = SCHOOL_COLUMN,
+    location_cols: Optional[List[str]] = None,
+    threshold: float = SCHOOL_NAME_THRESHOLD,
+) -> np.ndarray:
+    """
+    Integer school key per row: rows get the same key when their school names
+    match fuzzily within the same location (``location_cols``). Missing
+    school names get -1.
+    """
+    location_cols = [c for c in (location_cols or LOCATION_COLUMNS) if c in df.columns]
+    school_codes, school_names = pd.factorize(df[school_col])
+    normalized = np.array([normalize_school_name(name) for name in school_names], dtype=object)
+    normalized_codes, normalized_names = pd.factorize(normalized)
+
+    # Distinct (location, normalised name) pairs: only these are compared
+    keys = pd.DataFrame({column: pd.factorize(df[column])[0] for column in location_cols})
+    keys["_school"] = np.where(school_codes >= 0, normalized_codes[school_codes], -1)
+    pairs = keys[keys["_school"] >= 0].drop_duplicates()
+    if pairs.empty:
+        return np.full(len(df), -1, dtype=np.int64)
+
+    canonical = np.empty(len(pairs), dtype=np.int64)
+    blocks = pairs.groupby(location_cols, sort=False).indices if location_cols else {(): np.arange(len(pairs))}
+    school_of_pair = pairs["_school"].to_numpy()
+    for block in blocks.values():
+        groups = _same_school_groups([normalized_names[c] for c in school_of_pair[block]], threshold)
+        # Key of a name: position (among all pairs) of its group's representative
+        canonical[block] = block[groups]
+
+    pair_index = pd.MultiIndex.from_frame(pairs)
+    positions = pair_index.get_indexer(pd.MultiIndex.from_frame(keys))
+    return np.where(positions >= 0, canonical[positions], -1)
+
+
+def find_duplicate_clusters(
+    df: pd.DataFrame,
+    org_indicator_col: str = "Mapped_Org_Indicator_ID",
+    project_col: str = "Project",
+    value_col: str = "Reported_Value",
+    school_col: str = SCHOOL_COLUMN,
+    fuzzy_schools: bool = False,
+    threshold: float = SCHOOL_NAME_THRESHOLD,
+) -> DuplicateClusters:
+    """
+    Clusters of rows from different projects reporting the same school and
+    org indicator. Works on row-level data or on the cells of an
+    ``AggregationCube`` (``value_col="Total_Value"``). Rows missing a
+    location, school or org indicator are never in a cluster.
+    """
+    with INSTRUMENTS.span("duplicates.find"):
+        location_cols = [c for c in LOCATION_COLUMNS if c in df.columns]
+        if school_col not in df.columns and "School" in df.columns:
+            school_col = "School"
+
+        if fuzzy_schools:
+            school_key = canonical_schools(df, school_col, location_cols, threshold)
+        else:
+            school_key = pd.factorize(df[school_col])[0] if school_col in df.columns else np.full(len(df), -1)
+
+        # Block key: hash of the location, school and org indicator codes
+        codes = {column: pd.factorize(df[column])[0] for column in [*location_cols, org_indicator_col]}
+        codes["_school"] = school_key
+        code_frame = pd.DataFrame(codes)
+        complete = (code_frame >= 0).all(axis=1).to_numpy()
+        block_hash = pd.util.hash_pandas_object(code_frame, index=False).to_numpy()
+        block = np.where(complete, pd.factorize(block_hash)[0], -1)
+        project = pd.factorize(df[project_col])[0]
+        values = pd.to_numeric(df[value_col], errors="coerce").to_numpy(dtype=np.float64, na_value=np.nan)
+        INSTRUMENTS.count("duplicates.rows", len(df))
+
+        # Blocks with more than one project are clusters
+        rows = pd.DataFrame({"block": block, "project": project, "value": values})[complete & (project >= 0)]
+        by_project = rows.groupby(["block", "project"], sort=False)["value"].sum().reset_index()
+        n_projects = by_project.groupby("block", sort=False)["project"].transform("size")
+        by_project = by_project[n_projects.to_numpy() > 1]
+        member_mask = complete & (project >= 0) & np.isin(block, by_project["block"].unique())
+
+        stats = by_project.groupby("block", sort=True).agg(
+            Projects=("project", "size"),
+            Reported_Total=("value", "sum"),
+            Kept_Value=("value", "max"),
+        )
+        cluster_of_block = pd.Series(np.arange(1, len(stats) + 1), index=stats.index)
+
+        positions = np.flatnonzero(member_mask)
+        member_blocks = block[positions]
+        label_cols = [*location_cols, school_col, org_indicator_col]
+        if "name" in df.columns:
+            label_cols.append("name")
+        members = df.iloc[positions][[c for c in [*label_cols, project_col, value_col] if c in df.columns]]
+        members = members.reset_index(drop=True)
+        members.insert(0, "Row", positions)
+        members.insert(0, "Cluster", cluster_of_block.reindex(member_blocks).to_numpy())
+        members = members.sort_values(["Cluster", "Row"], ignore_index=True)
+
+        first = members.drop_duplicates("Cluster").set_index("Cluster")
+        clusters = first[[c for c in label_cols if c in first.columns]].copy()
+        clusters["Projects"] = stats["Projects"].to_numpy()
+        clusters["Project_Names"] = (
+            members.groupby("Cluster")[project_col]
+            .agg(lambda names: ", ".join(sorted(set(map(str, names)))))
+            .reindex(clusters.index)
+            .to_numpy()
+        )
+        clusters["Rows"] = members.groupby("Cluster").size().reindex(clusters.index).to_numpy()
+        clusters["Reported_Total"] = stats["Reported_Total"].to_numpy()
+        clusters["Kept_Value"] = stats["Kept_Value"].to_numpy()
+        clusters["Excess"] = clusters["Reported_Total"] - clusters["Kept_Value"]
+        clusters = clusters.reset_index()
+
+    return DuplicateClusters(clusters, members, org_indicator_col)
+
+
+def deduplicated_totals(
+    org_agg: pd.DataFrame,
+    duplicates: DuplicateClusters,
+    org_indicator_col: str = "Mapped_Org_Indicator_ID",
+) -> pd.DataFrame:
+    """``org_agg`` with ``Duplicate_Excess`` and ``Deduplicated_Value`` columns added."""
+    excess = duplicates.excess_by_indicator()
+    excess = org_agg[org_indicator_col].map(excess).astype(float).fillna(0.0).to_numpy()
+    return org_agg.assign(
+        Duplicate_Excess=excess,
+        Deduplicated_Value=org_agg["Total_Value"].to_numpy(dtype=float) - excess,
+    )
@@ -0,0 +1,432 @@
+"""
+SurveyMonkey ETL for EducationPeople.
+
+Pulls survey responses from the SurveyMonkey API (v3) bulk endpoint:
+
+ - a token-bucket scheduler keeps requests under the per-minute and per-day
+   API quotas (and backs off on HTTP 429); the day's usage is saved with the
+   checkpoints and corrected from the API's rate-limit headers,
+ - pages are fetched concurrently over one pooled ``requests.Session``,
+ - the page cursor is checkpointed to disk, so an interrupted run resumes
+   where it stopped instead of restarting from page one.
+
+Responses are flattened page by page into the columns used by the Org
+dashboard. The base URL is configurable, so the fetcher can be pointed at a
+local fake server for testing.
+"""
+
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Dict, Iterator, List, Optional
+
+import pandas as pd
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+
+SURVEYMONKEY_URL = "https://api.surveymonkey.com/v3"
+SM_PER_PAGE = 100  # API maximum for /responses/bulk
+SM_PER_MINUTE = 120
+SM_PER_DAY = 500
+SM_MAX_WORKERS = 4
+SM_CHECKPOINT_PATH = "data/cache/surveymonkey_checkpoints.json"
+SM_DAY_REMAINING_HEADER = "X-Ratelimit-App-Global-Day-Remaining"
+SM_DEFAULT_RETRY_AFTER = 60.0
+
+# Dashboard column -> question heading (or question ID) in the survey.
+DEFAULT_QUESTION_MAP = {
+    "Project": "Project",
+    "Country": "Country",
+    "Region": "Region",
+    "District": "District",
+    "School_Name": "School name",
+    "Project_Indicator_Name": "Indicator name",
+    "Mapped_Org_Indicator_ID": "Org indicator ID",
+    "Reported_Value": "Reported value",
+    "Female_Value": "Female value",
+    "Male_Value": "Male value",
+}
+NUMERIC_COLUMNS = ["Reported_Value", "Female_Value", "Male_Value"]
+
+
+class QuotaExceeded(RuntimeError):
+    """Raised when the daily request quota would be exceeded."""
+
+
+class TokenBucket:
+    """Thread-safe token bucket holding up to ``capacity`` tokens, refilled at ``rate`` per second."""
+
+    def __init__(self, capacity: float, rate: float):
+        self.capacity = capacity
+        self.rate = rate
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def try_take(self) -> float:
+        """Take one token and return 0, or return the seconds until one is available."""
+        with self._lock:
+            self._refill()
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return 0.0
+            return (1 - self.tokens) / self.rate
+
+
+def _today() -> str:
+    return datetime.now(timezone.utc).strftime("%Y-%m-%d")
+
+
+def _retry_after_seconds(value: Optional[str]) -> float:
+    """Seconds to wait for a ``Retry-After`` header: delay-seconds or an HTTP date."""
+    if not value:
+        return SM_DEFAULT_RETRY_AFTER
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return SM_DEFAULT_RETRY_AFTER
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=timezone.utc)
+    return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+
+
+class RateLimiter:
+    """
+    Per-minute and per-day quotas as two token buckets.
+
+    ``acquire`` blocks until both buckets have a token. Waiting on the
+    per-day bucket longer than ``max_daily_wait`` seconds raises
+    ``QuotaExceeded`` so a long run stops (and can resume) instead of hanging.
+
+    With ``usage`` (a ``CheckpointStore``) the requests made today are saved
+    and the per-day bucket starts from what is left of the quota, not full.
+    ``observe`` lowers it further to the remaining count the API reports.
+    """
+
+    def __init__(
+        self,
+        per_minute: int = SM_PER_MINUTE,
+        per_day: int = SM_PER_DAY,
+        max_daily_wait: float = 60.0,
+        usage: Optional["CheckpointStore"] = None,
+    ):
+        self.minute = TokenBucket(per_minute, per_minute / 60.0)
+        self.day = TokenBucket(per_day, per_day / 86400.0)
+        self.max_daily_wait = max_daily_wait
+        self.usage = usage
+        self.requests = 0
+        self._lock = threading.Lock()
+        if usage is not None:
+            self.day.tokens = max(0.0, per_day - usage.daily_usage(_today()))
+
+    def acquire(self) -> None:
+        wait = self.day.try_take()
+        if wait > self.max_daily_wait:
+            raise QuotaExceeded(f"Daily SurveyMonkey quota reached; next request in {wait:.0f}s")
+        if wait:
+            time.sleep(wait)
+            return self.acquire()
+        while True:
+            wait = self.minute.try_take()
+            if not wait:
+                break
+            time.sleep(wait)
+        with self._lock:
+            self.requests += 1
+        if self.usage is not None:
+            self.usage.add_usage(_today())
+
+    def observe(self, headers) -> None:
+        """Cap the per-day bucket at the remaining quota reported in response ``headers``."""
+        try:
+            remaining = float(headers[SM_DAY_REMAINING_HEADER])
+        except (KeyError, TypeError, ValueError):
+            return
+        with self.day._lock:
+            self.day.tokens = min(self.day.tokens, max(0.0, remaining))
+
+    def pause(self, seconds: float) -> None:
+        """Drain the per-minute bucket after a 429 so all workers back off."""
+        with self.minute._lock:
+            self.minute.tokens = min(self.minute.tokens, 1 - seconds * self.minute.rate)
+
+
+class CheckpointStore:
+    """
+    Per-survey resume state persisted to JSON.
+
+    ``next_page`` is the first page not yet delivered to the caller;
+    ``started_at`` is when that run began (used as ``start_modified_at`` for
+    the next incremental run once it completes). The API requests made today
+    are kept under ``USAGE_KEY`` (see ``RateLimiter``).
+    """
+
+    USAGE_KEY = "_daily_usage"
+
+    def __init__(self, path: Optional[str] = SM_CHECKPOINT_PATH):
+        self.path = path
+        self.state: Dict[str, Dict] = {}
+        self._lock = threading.Lock()
+        if path and os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as fh:
+                self.state = json.load(fh)
+
+    def get(self, survey_id: str) -> Dict:
+        return dict(self.state.get(survey_id, {}))
+
+    def update(self, survey_id: str, **values) -> None:
+        with self._lock:
+            self.state.setdefault(survey_id, {}).update(values)
+            self._save()
+
+    def daily_usage(self, day: str) -> int:
+        """Requests recorded for ``day`` (``YYYY-MM-DD``, UTC)."""
+        usage = self.state.get(self.USAGE_KEY, {})
+        return int(usage.get("requests", 0)) if usage.get("day") == day else 0
+
+    def add_usage(self, day: str, requests: int = 1) -> None:
+        with self._lock:
+            usage = self.state.get(self.USAGE_KEY, {})
+            if usage.get("day") != day:
+                usage = {"day": day, "requests": 0}
+            usage["requests"] = int(usage["requests"]) + requests
+            self.state[self.USAGE_KEY] = usage
+            self._save()
+
+    def staged(self, survey_ids: List[str]) -> "CheckpointStore":
+        """An in-memory copy of the state of ``survey_ids``, saved back by ``commit``."""
+        copy = CheckpointStore(path=None)
+        copy.state = {survey_id: self.get(survey_id) for survey_id in survey_ids if survey_id in self.state}
+        return copy
+
+    def commit(self, staged: "CheckpointStore") -> None:
+        """Replace the state of every survey in ``staged`` with its staged state."""
+        with self._lock:
+            self.state.update({survey_id: dict(values) for survey_id, values in staged.state.items()})
+            self._save()
+
+    def _save(self) -> None:
+        if not self.path:
+            return
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as fh:
+            json.dump(self.state, fh)
+        os.replace(tmp_path, self.path)
+
+
+def _pooled_session(token: str, pool_size: int) -> requests.Session:
+    session = requests.Session()
+    adapter = HTTPAdapter(
+        pool_connections=1,
+        pool_maxsize=pool_size,
+        max_retries=Retry(total=3, backoff_factor=1.0, status_forcelist=[500, 502, 503, 504]),
+    )
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    session.headers.update({"Authorization": f"Bearer {token}", "Content-Type": "application/json"})
+    return session
+
+
+class SurveyMonkeyFetcher:
+    """Rate-limited, resumable fetcher for SurveyMonkey bulk responses."""
+
+    def __init__(
+        self,
+        token: str,
+        base_url: str = SURVEYMONKEY_URL,
+        per_page: int = SM_PER_PAGE,
+        max_workers: int = SM_MAX_WORKERS,
+        limiter: Optional[RateLimiter] = None,
+        checkpoints: Optional[CheckpointStore] = None,
+        timeout: float = 60.0,
+    ):
+        self.base_url = base_url.rstrip("/")
+        self.per_page = per_page
+        self.max_workers = max_workers
+        self.checkpoints = checkpoints or CheckpointStore()
+        self.limiter = limiter or RateLimiter(usage=self.checkpoints)
+        self.timeout = timeout
+        self.session = _pooled_session(token, max_workers)
+
+    def _get(self, path: str, params: Optional[Dict] = None) -> Dict:
+        while True:
+            self.limiter.acquire()
+            response = self.session.get(f"{self.base_url}{path}", params=params, timeout=self.timeout)
+            self.limiter.observe(response.headers)
+            if response.status_code == 429:
+                self.limiter.pause(_retry_after_seconds(response.headers.get("Retry-After")))
+                continue
+            response.raise_for_status()
+            return response.json()
+
+    def survey_details(self, survey_id: str) -> Dict:
+        return self._get(f"/surveys/{survey_id}/details")
+
+    def _page(self, survey_id: str, page: int, start_modified_at: Optional[str]) -> Dict:
+        params = {"page": page, "per_page": self.per_page, "sort_order": "ASC"}
+        if start_modified_at:
+            params["start_modified_at"] = start_modified_at
+        return self._get(f"/surveys/{survey_id}/responses/bulk", params)
+
+    def iter_response_pages(self, survey_id: str) -> Iterator[List[Dict]]:
+        """
+        Yield the raw responses of a survey page by page, in page order.
+
+        Pages are fetched ``max_workers`` at a time. ``next_page`` is
+        checkpointed once the caller has consumed a page (asked for the next
+        one), so a page is delivered again rather than lost if processing is
+        interrupted. A completed run clears the cursor and records its start
+        time, so the next run only asks for responses modified since then.
+        """
+        checkpoint = self.checkpoints.get(survey_id)
+        started_at = checkpoint.get("started_at") or datetime.now(timezone.utc).strftime(
+            "%Y-%m-%dT%H:%M:%S"
+        )
+        since = checkpoint.get("since")
+        next_page = int(checkpoint.get("next_page", 1))
+        self.checkpoints.update(survey_id, started_at=started_at, next_page=next_page)
+
+        first = self._page(survey_id, next_page, since)
+        total = int(first.get("total", 0))
+        last_page = max(1, -(-total // self.per_page))
+
+        yield first.get("data", [])
+        self.checkpoints.update(survey_id, next_page=next_page + 1)
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            pending = range(next_page + 1, last_page + 1)
+            for window_start in range(0, len(pending), self.max_workers):
+                window = pending[window_start : window_start + self.max_workers]
+                futures = [executor.submit(self._page, survey_id, page, since) for page in window]
+                for page, future in zip(window, futures):
+                    yield future.result().get("data", [])
+                    self.checkpoints.update(survey_id, next_page=page + 1)
+
+        self.checkpoints.update(survey_id, next_page=1, since=started_at, started_at=None)
+
+
+def _question_lookup(details: Dict) -> Dict[str, Dict]:
+    """Question ID -> {"heading": str, "choices": {choice_id: text}}."""
+    questions = {}
+    for page in details.get("pages", []):
+        for question in page.get("questions", []):
+            headings = question.get("headings") or [{}]
+            choices = {}
+            for choice in (question.get("answers") or {}).get("choices", []):
+                choices[choice.get("id")] = choice.get("text")
+            questions[question.get("id")] = {
+                "heading": (headings[0].get("heading") or "").strip(),
+                "choices": choices,
+            }
+    return questions
+
+
+def flatten_responses(
+    responses: List[Dict],
+    details: Dict,
+    survey_id: str,
+    question_map: Optional[Dict[str, str]] = None,
+) -> pd.DataFrame:
+    """
+    Flatten bulk responses into the dashboard schema.
+
+    ``question_map`` maps dashboard columns to question headings (case
+    insensitive) or question IDs. Choice answers are resolved to their text
+    via the survey ``details``. Adds ``Source_File`` (``surveymonkey:<id>``),
+    ``Response_ID`` and ``Date_Modified``.
+    """
+    question_map = question_map or DEFAULT_QUESTION_MAP
+    questions = _question_lookup(details)
+    by_heading = {q["heading"].lower(): qid for qid, q in questions.items()}
+    column_qids = {
+        column: target if target in questions else by_heading.get(target.lower())
+        for column, target in question_map.items()
+    }
+
+    rows = []
+    for response in responses:
+        answers = {}
+        for page in response.get("pages", []):
+            for question in page.get("questions", []):
+                qid = question.get("id")
+                first = (question.get("answers") or [{}])[0]
+                value = first.get("text")
+                if value is None and "choice_id" in first:
+                    value = questions.get(qid, {}).get("choices", {}).get(first["choice_id"])
+                answers[qid] = value
+        row = {column: answers.get(qid) for column, qid in column_qids.items()}
+        row["Response_ID"] = response.get("id")
+        row["Date_Modified"] = response.get("date_modified")
+        rows.append(row)
+
+    df = pd.DataFrame(rows, columns=[*question_map, "Response_ID", "Date_Modified"])
+    for column in NUMERIC_COLUMNS:
+        if column in df.columns:
+            df[column] = pd.to_numeric(df[column], errors="coerce")
+    df["Source_File"] = f"surveymonkey:{survey_id}"
+    return df
+
+
+def iter_survey_frames(
+    fetcher: SurveyMonkeyFetcher,
+    survey_id: str,
+    question_map: Optional[Dict[str, str]] = None,
+) -> Iterator[pd.DataFrame]:
+    """
+    Stream one survey as flattened DataFrames, one per API page.
+
+    A page counts as delivered (and is checkpointed) once the next one is
+    requested, so store each frame before iterating on.
+    """
+    details = fetcher.survey_details(survey_id)
+    for responses in fetcher.iter_response_pages(survey_id):
+        yield flatten_responses(responses, details, survey_id, question_map)
+
+
+def sync_surveymonkey(
+    token: str,
+    survey_ids: List[str],
+    base_url: str = SURVEYMONKEY_URL,
+    checkpoint_path: Optional[str] = SM_CHECKPOINT_PATH,
+    question_map: Optional[Dict[str, str]] = None,
+    **fetcher_options,
+) -> pd.DataFrame:
+    """
+    Fetch new or modified responses for ``survey_ids`` into one DataFrame.
+
+    The pages are collected in memory, so the checkpoints are staged and
+    only saved once every survey has been fetched: a failed run returns
+    nothing and the next call fetches the same responses again. Use
+    ``iter_survey_frames`` to store pages as they arrive and resume from
+    the last stored page instead.
+    """
+    checkpoints = CheckpointStore(checkpoint_path)
+    staged = checkpoints.staged(survey_ids)
+    # Request counts are saved as they happen, failed run or not
+    fetcher_options.setdefault("limiter", RateLimiter(usage=checkpoints))
+    fetcher = SurveyMonkeyFetcher(token, base_url, checkpoints=staged, **fetcher_options)
+    frames = [
+        frame
+        for survey_id in survey_ids
+        for frame in iter_survey_frames(fetcher, survey_id, question_map)
+    ]
+    checkpoints.commit(staged)
+    if not frames:
+        return flatten_responses([], {}, "", question_map)
+    return pd.concat(frames, ignore_index=True)
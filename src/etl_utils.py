@@ -0,0 +1,460 @@
+"""
+ETL helpers for uploaded partner files (CSV / Excel, plus Parquet / Arrow IPC
+files exported by the app itself).
+
+Uploads are read in chunks (CSV via ``pd.read_csv(chunksize=...)``, XLSX via
+openpyxl read-only mode, Parquet/Arrow by record batch) so peak memory is
+bounded by the chunk size rather than by the size of the upload. Parsed
+uploads can be kept in a content-hash keyed Parquet cache so reruns and
+re-uploads skip parsing.
+
+Used by:
+ - Logframe Mapping page
+ - Org Dashboard page
+"""
+
+import hashlib
+import io
+import json
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import BinaryIO, Dict, Iterable, Iterator, List, Optional
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+
+DEFAULT_CHUNK_ROWS = 50_000
+# File types accepted by the upload widgets (Parquet/Arrow as exported by the app).
+UPLOAD_TYPES = ["xlsx", "xls", "csv", "parquet", "arrow", "feather"]
+SOURCE_FILE_COL = "__Source_File"
+
+PARSE_CACHE_DIR = "data/cache/uploads"
+PARSE_CACHE_MAX_BYTES = 512 * 1024 * 1024
+# Bump when reader behaviour changes so old sidecars are not reused.
+PARSE_CACHE_FORMAT = 1
+
+
+def _file_name(source) -> str:
+    return getattr(source, "name", None) or str(source)
+
+
+def _rewind(source) -> None:
+    # Streamlit UploadedFile objects keep their position between reruns.
+    if hasattr(source, "seek"):
+        source.seek(0)
+
+
+def _read_bytes(source) -> bytes:
+    if hasattr(source, "getvalue"):
+        return source.getvalue()
+    if hasattr(source, "read"):
+        _rewind(source)
+        data = source.read()
+        _rewind(source)
+        return data
+    with open(source, "rb") as fh:
+        return fh.read()
+
+
+class ParseCache:
+    """
+    On-disk cache of parsed uploads, stored as Parquet sidecar files.
+
+    Entries are keyed by the SHA-256 of the upload bytes plus the reader
+    options, so a rerun or re-upload of the same file is read back from
+    Parquet instead of being parsed again. The directory is kept under
+    ``max_bytes`` by evicting the least recently used files (by mtime).
+    """
+
+    def __init__(self, directory: str = PARSE_CACHE_DIR, max_bytes: int = PARSE_CACHE_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(data: bytes, **reader_options) -> str:
+        digest = hashlib.sha256(data)
+        options = dict(reader_options, format=PARSE_CACHE_FORMAT)
+        digest.update(json.dumps(options, sort_keys=True, default=str).encode("utf-8"))
+        return digest.hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.parquet")
+
+    def iter_chunks(self, key: str, chunk_rows: int = DEFAULT_CHUNK_ROWS) -> Optional[Iterator[pd.DataFrame]]:
+        """Chunks of a cached upload, or None (a miss) if it is not cached."""
+        path = self._path(key)
+        try:
+            parquet_file = pq.ParquetFile(path)
+            os.utime(path)
+        except (FileNotFoundError, pa.ArrowInvalid):
+            with self._lock:
+                self.misses += 1
+            return None
+        with self._lock:
+            self.hits += 1
+        return (batch.to_pandas() for batch in parquet_file.iter_batches(batch_size=chunk_rows))
+
+    def write_through(self, key: str, chunks: Iterable[pd.DataFrame]) -> Iterator[pd.DataFrame]:
+        """
+        Yield ``chunks`` unchanged while appending them to a new cache entry.
+
+        The entry is only committed once every chunk has been consumed; if a
+        chunk cannot be converted to the schema of the first one (mixed-type
+        columns), caching is abandoned and the chunks are still yielded.
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        os.close(fd)
+        writer = None
+        caching = True
+        completed = False
+        try:
+            for chunk in chunks:
+                if caching:
+                    try:
+                        table = pa.Table.from_pandas(chunk, preserve_index=False)
+                        if writer is None:
+                            writer = pq.ParquetWriter(tmp_path, table.schema)
+                        elif not table.schema.equals(writer.schema):
+                            table = table.cast(writer.schema)
+                        writer.write_table(table)
+                    except (pa.ArrowException, ValueError, TypeError):
+                        caching = False
+                yield chunk
+            completed = True
+        finally:
+            if writer is not None:
+                writer.close()
+            if completed and caching and writer is not None:
+                os.replace(tmp_path, self._path(key))
+                self._evict()
+            elif os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def _evict(self) -> None:
+        with self._lock:
+            entries = []
+            for name in os.listdir(self.directory):
+                if name.endswith(".parquet"):
+                    stat = os.stat(os.path.join(self.directory, name))
+                    entries.append((stat.st_mtime, stat.st_size, name))
+            total = sum(size for _, size, _ in entries)
+            for _, size, name in sorted(entries):
+                if total <= self.max_bytes:
+                    break
+                os.remove(os.path.join(self.directory, name))
+                total -= size
+
+    def add_stats(self, hits: int, misses: int) -> None:
+        """Count lookups made through another instance (e.g. in a worker process)."""
+        with self._lock:
+            self.hits += hits
+            self.misses += misses
+
+    def stats(self) -> Dict[str, float]:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+        }
+
+
+def iter_csv_chunks(
+    source,
+    chunk_rows: int = DEFAULT_CHUNK_ROWS,
+    usecols: Optional[List[str]] = None,
+) -> Iterator[pd.DataFrame]:
+    """Yield a CSV file (path or file-like) as DataFrames of at most ``chunk_rows`` rows."""
+    _rewind(source)
+    reader = pd.read_csv(
+        source,
+        chunksize=chunk_rows,
+        usecols=(lambda col: col in usecols) if usecols else None,
+    )
+    with reader:
+        for chunk in reader:
+            yield chunk
+
+
+def iter_excel_chunks(
+    source,
+    chunk_rows: int = DEFAULT_CHUNK_ROWS,
+    usecols: Optional[List[str]] = None,
+    sheet_name: Optional[str] = None,
+) -> Iterator[pd.DataFrame]:
+    """
+    Yield one worksheet of an XLSX file (first sheet by default) in chunks.
+
+    Uses openpyxl read-only mode, which streams rows from the zipped XML
+    instead of loading the whole workbook into memory.
+    """
+    from openpyxl import load_workbook
+
+    _rewind(source)
+    workbook = load_workbook(source, read_only=True, data_only=True)
+    try:
+        sheet = workbook[sheet_name] if sheet_name else workbook.worksheets[0]
+        rows = sheet.iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            return
+        columns = [str(col) if col is not None else f"Unnamed: {i}" for i, col in enumerate(header)]
+        keep = [i for i, col in enumerate(columns) if not usecols or col in usecols]
+        columns = [columns[i] for i in keep]
+
+        buffer = []
+        for row in rows:
+            if not any(value is not None for value in row):
+                continue
+            buffer.append([row[i] if i < len(row) else None for i in keep])
+            if len(buffer) >= chunk_rows:
+                yield pd.DataFrame(buffer, columns=columns)
+                buffer = []
+        if buffer:
+            yield pd.DataFrame(buffer, columns=columns)
+    finally:
+        workbook.close()
+
+
+def iter_parquet_chunks(
+    source,
+    chunk_rows: int = DEFAULT_CHUNK_ROWS,
+    usecols: Optional[List[str]] = None,
+) -> Iterator[pd.DataFrame]:
+    """Yield a Parquet file in record batches of at most ``chunk_rows`` rows."""
+    _rewind(source)
+    parquet_file = pq.ParquetFile(source)
+    columns = [col for col in parquet_file.schema_arrow.names if col in usecols] if usecols else None
+    for batch in parquet_file.iter_batches(batch_size=chunk_rows, columns=columns):
+        yield batch.to_pandas()
+
+
+def iter_arrow_chunks(
+    source,
+    chunk_rows: int = DEFAULT_CHUNK_ROWS,
+    usecols: Optional[List[str]] = None,
+) -> Iterator[pd.DataFrame]:
+    """Yield an Arrow IPC (Feather v2) file or stream in chunks of at most ``chunk_rows`` rows."""
+    _rewind(source)
+    try:
+        reader = pa.ipc.open_file(source)
+        batches = (reader.get_batch(i) for i in range(reader.num_record_batches))
+    except pa.ArrowInvalid:
+        _rewind(source)
+        batches = iter(pa.ipc.open_stream(source))
+    for batch in batches:
+        if usecols:
+            batch = batch.select([col for col in batch.schema.names if col in usecols])
+        for start in range(0, batch.num_rows, chunk_rows):
+            yield batch.slice(start, chunk_rows).to_pandas()
+
+
+def iter_upload_chunks(
+    source,
+    chunk_rows: int = DEFAULT_CHUNK_ROWS,
+    usecols: Optional[List[str]] = None,
+    cache: Optional[ParseCache] = None,
+) -> Iterator[pd.DataFrame]:
+    """
+    Yield an uploaded CSV/Excel/Parquet/Arrow file in chunks, picking the
+    reader from the file extension. Legacy ``.xls`` files cannot be streamed
+    by openpyxl and are read in one go.
+
+    With a ``cache``, a CSV/Excel upload whose bytes and reader options were
+    parsed before is read back from its Parquet sidecar.
+    """
+    name = _file_name(source).lower()
+    if name.endswith(".parquet"):
+        yield from iter_parquet_chunks(source, chunk_rows, usecols)
+        return
+    if name.endswith((".arrow", ".feather")):
+        yield from iter_arrow_chunks(source, chunk_rows, usecols)
+        return
+
+    if cache is not None:
+        key = cache.make_key(
+            _read_bytes(source),
+            extension=os.path.splitext(name)[1],
+            usecols=sorted(usecols) if usecols else None,
+        )
+        cached = cache.iter_chunks(key, chunk_rows)
+        if cached is not None:
+            yield from cached
+        else:
+            yield from cache.write_through(key, iter_upload_chunks(source, chunk_rows, usecols))
+        return
+
+    if name.endswith(".csv"):
+        yield from iter_csv_chunks(source, chunk_rows, usecols)
+    elif name.endswith(".xls"):
+        _rewind(source)
+        df = pd.read_excel(source)
+        if usecols:
+            df = df[[col for col in df.columns if col in usecols]]
+        for start in range(0, len(df), chunk_rows):
+            yield df.iloc[start : start + chunk_rows]
+    else:
+        yield from iter_excel_chunks(source, chunk_rows, usecols)
+
+
+def normalize_chunk(
+    chunk: pd.DataFrame,
+    source_name: str,
+    project_col: Optional[str] = None,
+) -> pd.DataFrame:
+    """
+    Tidy one chunk of an upload: strip header whitespace, record the source
+    file and fall back to the file name when there is no project column.
+    """
+    chunk = chunk.rename(columns=lambda col: str(col).strip())
+    chunk[SOURCE_FILE_COL] = source_name
+    if project_col and project_col not in chunk.columns:
+        chunk[project_col] = source_name
+    return chunk
+
+
+def iter_logframe_chunks(
+    files: Iterable[BinaryIO],
+    project_col: Optional[str] = None,
+    chunk_rows: int = DEFAULT_CHUNK_ROWS,
+    cache: Optional[ParseCache] = None,
+) -> Iterator[pd.DataFrame]:
+    """Normalised chunks of every uploaded file, file by file."""
+    for source in files:
+        name = _file_name(source)
+        for chunk in iter_upload_chunks(source, chunk_rows, cache=cache):
+            yield normalize_chunk(chunk, name, project_col)
+
+
+def read_upload(
+    source,
+    usecols: Optional[List[str]] = None,
+    chunk_rows: int = DEFAULT_CHUNK_ROWS,
+    cache: Optional[ParseCache] = None,
+) -> pd.DataFrame:
+    """
+    Read a whole upload through the chunked readers, keeping only ``usecols``
+    (when given) so unused columns never accumulate in memory.
+    """
+    chunks = list(iter_upload_chunks(source, chunk_rows, usecols, cache=cache))
+    if not chunks:
+        return pd.DataFrame(columns=usecols or [])
+    return pd.concat(chunks, ignore_index=True)
+
+
+# ----------------------------------------------------------------------
+# Parallel parsing of many uploads
+# ----------------------------------------------------------------------
+
+
+@dataclass
+class ParseResult:
+    """Outcome of parsing one uploaded file."""
+
+    name: str
+    frame: Optional[pd.DataFrame]
+    seconds: float
+    error: Optional[str] = None
+    # Parse-cache lookups of the worker's own ``ParseCache``
+    cache_hits: int = 0
+    cache_misses: int = 0
+
+    @property
+    def rows(self) -> int:
+        return 0 if self.frame is None else len(self.frame)
+
+
+def _parse_upload(
+    name: str,
+    data: bytes,
+    project_col: Optional[str],
+    usecols: Optional[List[str]],
+    cache_dir: Optional[str],
+    cache_max_bytes: int,
+) -> ParseResult:
+    # Runs in a worker thread or process; never raises so one bad file
+    # cannot take down the others.
+    start = time.perf_counter()
+    cache = ParseCache(cache_dir, cache_max_bytes) if cache_dir else None
+    frame, error = None, None
+    try:
+        source = io.BytesIO(data)
+        source.name = name
+        chunks = [
+            normalize_chunk(chunk, name, project_col)
+            for chunk in iter_upload_chunks(source, usecols=usecols, cache=cache)
+        ]
+        frame = pd.concat(chunks, ignore_index=True) if chunks else pd.DataFrame()
+    except Exception as exc:  # noqa: BLE001 - reported per file
+        error = f"{type(exc).__name__}: {exc}"
+    return ParseResult(
+        name,
+        frame,
+        time.perf_counter() - start,
+        error,
+        cache_hits=cache.hits if cache else 0,
+        cache_misses=cache.misses if cache else 0,
+    )
+
+
+def parse_uploads_parallel(
+    files: Iterable[BinaryIO],
+    project_col: Optional[str] = None,
+    usecols: Optional[List[str]] = None,
+    max_workers: Optional[int] = None,
+    use_processes: bool = False,
+    cache: Optional[ParseCache] = None,
+) -> List[ParseResult]:
+    """
+    Parse many uploads concurrently, one task per file.
+
+    Threads suit CSV (pandas releases the GIL while tokenising); Excel parsing
+    through openpyxl is pure Python, so ``use_processes=True`` runs it in a
+    process pool instead. Files are handed to workers as bytes, results come
+    back in input order with per-file timing, and failures are reported in
+    ``ParseResult.error`` instead of being raised. Workers open their own
+    ``ParseCache`` on ``cache.directory``; their hits and misses are added
+    to ``cache``'s stats.
+    """
+    tasks = [(_file_name(source), _read_bytes(source)) for source in files]
+    if not tasks:
+        return []
+
+    cache_dir = cache.directory if cache is not None else None
+    cache_max_bytes = cache.max_bytes if cache is not None else PARSE_CACHE_MAX_BYTES
+    executor_cls = ProcessPoolExecutor if use_processes else ThreadPoolExecutor
+    workers = min(max_workers or os.cpu_count() or 1, len(tasks))
+    with executor_cls(max_workers=workers) as executor:
+        futures = [
+            executor.submit(_parse_upload, name, data, project_col, usecols, cache_dir, cache_max_bytes)
+            for name, data in tasks
+        ]
+        results = [future.result() for future in futures]
+    if cache is not None:
+        cache.add_stats(
+            sum(result.cache_hits for result in results),
+            sum(result.cache_misses for result in results),
+        )
+    return results
+
+
+def parse_report(results: List[ParseResult]) -> pd.DataFrame:
+    """One row per file: rows parsed, seconds taken and error (if any)."""
+    return pd.DataFrame(
+        {
+            "File": [result.name for result in results],
+            "Rows": [result.rows for result in results],
+            "Seconds": [round(result.seconds, 3) for result in results],
+            "Error": [result.error for result in results],
+        }
+    )
@@ -0,0 +1,131 @@
+"""
+Export of mapping results and aggregate tables (CSV / Parquet / Arrow IPC).
+
+Frames are written slice by slice, so no full CSV string or Arrow table of
+the whole frame is ever built. ``write_export`` streams into any binary file
+(constant memory for scripts); ``export_file`` writes a spooled temporary
+file that stays in memory for small exports and spills to disk for large
+ones, and is handed as is to the Streamlit download buttons on click.
+
+Parquet and Arrow exports keep categorical columns dictionary-encoded and
+can be uploaded back into the app (see ``src.etl_utils.iter_upload_chunks``).
+"""
+
+import io
+import tempfile
+from typing import BinaryIO, Callable, Dict, Tuple
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from src.instrumentation import INSTRUMENTS
+
+
+EXPORT_CHUNK_ROWS = 100_000
+# Spooled exports stay in memory up to this size, then move to a temp file.
+SPOOL_MAX_BYTES = 32 * 1024 * 1024
+
+# Format name -> (file extension, MIME type)
+EXPORT_FORMATS: Dict[str, Tuple[str, str]] = {
+    "CSV": ("csv", "text/csv"),
+    "Parquet": ("parquet", "application/vnd.apache.parquet"),
+    "Arrow IPC": ("arrow", "application/vnd.apache.arrow.file"),
+}
+
+
+def _slices(df: pd.DataFrame, chunk_rows: int):
+    for start in range(0, len(df), chunk_rows):
+        yield df.iloc[start : start + chunk_rows]
+
+
+def _write_csv(df: pd.DataFrame, target: BinaryIO, chunk_rows: int) -> None:
+    target.write(df.head(0).to_csv(index=False).encode("utf-8"))
+    for chunk in _slices(df, chunk_rows):
+        target.write(chunk.to_csv(index=False, header=False).encode("utf-8"))
+
+
+def _write_parquet(df: pd.DataFrame, target: BinaryIO, chunk_rows: int) -> None:
+    schema = pa.Schema.from_pandas(df, preserve_index=False)
+    with pq.ParquetWriter(target, schema, compression="zstd") as writer:
+        for chunk in _slices(df, chunk_rows):
+            writer.write_table(pa.Table.from_pandas(chunk, schema=schema, preserve_index=False))
+
+
+def _write_arrow(df: pd.DataFrame, target: BinaryIO, chunk_rows: int) -> None:
+    schema = pa.Schema.from_pandas(df, preserve_index=False)
+    with pa.ipc.new_file(target, schema) as writer:
+        for chunk in _slices(df, chunk_rows):
+            writer.write_table(pa.Table.from_pandas(chunk, schema=schema, preserve_index=False))
+
+
+_WRITERS: Dict[str, Callable[[pd.DataFrame, BinaryIO, int], None]] = {
+    "CSV": _write_csv,
+    "Parquet": _write_parquet,
+    "Arrow IPC": _write_arrow,
+}
+
+
+def write_export(
+    df: pd.DataFrame,
+    fmt: str,
+    target: BinaryIO,
+    chunk_rows: int = EXPORT_CHUNK_ROWS,
+) -> None:
+    """Write ``df`` to the binary file ``target`` in ``fmt`` (a key of ``EXPORT_FORMATS``)."""
+    if fmt not in _WRITERS:
+        raise ValueError(f"Unknown export format {fmt!r}; expected one of {sorted(_WRITERS)}")
+    _WRITERS[fmt](df, target, chunk_rows)
+
+
+class _SpoolReader(io.RawIOBase):
+    """Read-only view of a spooled export as ``io.RawIOBase``, a file type ``st.download_button`` accepts."""
+
+    def __init__(self, spool: "tempfile.SpooledTemporaryFile"):
+        super().__init__()
+        self._spool = spool
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        return self._spool.seek(offset, whence)
+
+    def tell(self) -> int:
+        return self._spool.tell()
+
+    def read(self, size: int = -1) -> bytes:
+        return self._spool.read(size)
+
+    def readinto(self, buffer) -> int:
+        data = self._spool.read(len(buffer))
+        buffer[: len(data)] = data
+        return len(data)
+
+    def close(self) -> None:
+        self._spool.close()
+        super().close()
+
+
+@INSTRUMENTS.timed("export.build")
+def export_file(df: pd.DataFrame, fmt: str, chunk_rows: int = EXPORT_CHUNK_ROWS) -> io.RawIOBase:
+    """
+    ``df`` exported as ``fmt`` into a spooled temp file, rewound and never
+    read into one ``bytes`` object here. Closing it (or garbage collection)
+    removes the temp file.
+    """
+    spool = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_BYTES)
+    try:
+        write_export(df, fmt, spool, chunk_rows)
+    except BaseException:
+        spool.close()
+        raise
+    spool.seek(0)
+    return _SpoolReader(spool)
+
+
+def export_file_name(stem: str, fmt: str) -> str:
+    return f"{stem}.{EXPORT_FORMATS[fmt][0]}"
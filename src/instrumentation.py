@@ -0,0 +1,279 @@
+"""
+Lightweight timing and memory instrumentation of the app's hot paths.
+
+Stages are wrapped in ``INSTRUMENTS.span("area.step")`` blocks (or whole
+functions in ``INSTRUMENTS.timed``) and events are counted with
+``INSTRUMENTS.count("name")``. Each span records its wall time per stage,
+for the whole process and for the Streamlit session bound to the current
+thread (see ``bind_session``). The Admin page shows the collected stats next
+to the hit rates of the caches registered with ``register_cache``.
+
+Instrumentation is on by default and can be switched off with
+``EDUCATIONPEOPLE_INSTRUMENTATION=0`` or from the Admin page. When it is
+off, ``span`` returns a shared no-op context manager and ``count`` returns
+immediately, so the wrapped code pays one attribute lookup per call.
+
+Memory tracking (``tracemalloc`` peaks per span) is off by default: it slows
+allocation-heavy code down noticeably, and the peaks are process-wide, so
+sessions running at the same time inflate each other's numbers.
+"""
+
+import functools
+import os
+import threading
+import time
+import tracemalloc
+from collections import OrderedDict, deque
+from contextlib import nullcontext
+from contextvars import ContextVar
+from typing import Callable, Dict, Iterable, Iterator, List, Optional
+
+import numpy as np
+import pandas as pd
+
+
+# Latest durations kept per stage for the p50/p95 columns.
+RECENT_SAMPLES = 256
+# Sessions kept for the per-session view (least recently active dropped first).
+MAX_SESSIONS = 100
+
+_NULL_SPAN = nullcontext()
+_SESSION: ContextVar[Optional[str]] = ContextVar("instrumentation_session", default=None)
+_MEMORY = threading.local()
+
+
+def bind_session(session_id: Optional[str]) -> None:
+    """Attribute the spans and counters of the current thread to ``session_id``."""
+    _SESSION.set(session_id)
+
+
+def _memory_stack() -> List[List[int]]:
+    if not hasattr(_MEMORY, "stack"):
+        _MEMORY.stack = []
+    return _MEMORY.stack
+
+
+def _memory_enter() -> List[int]:
+    """
+    Start a peak measurement: ``[start bytes, peak seen so far]``. The
+    tracemalloc peak is reset for every span, so the enclosing span's peak so
+    far is saved on its frame first.
+    """
+    if not tracemalloc.is_tracing():
+        tracemalloc.start()
+    current, peak = tracemalloc.get_traced_memory()
+    stack = _memory_stack()
+    if stack:
+        stack[-1][1] = max(stack[-1][1], peak)
+    tracemalloc.reset_peak()
+    frame = [current, current]
+    stack.append(frame)
+    return frame
+
+
+def _memory_exit(frame: List[int]) -> int:
+    """Bytes allocated above the span's starting point at its peak."""
+    stack = _memory_stack()
+    if stack and stack[-1] is frame:
+        stack.pop()
+    _, peak = tracemalloc.get_traced_memory()
+    return max(0, max(frame[1], peak) - frame[0])
+
+
+class StageStats:
+    """Call count, total/max time, recent durations and memory peak of one stage."""
+
+    __slots__ = ("calls", "total", "max", "recent", "peak_bytes")
+
+    def __init__(self):
+        self.calls = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.recent = deque(maxlen=RECENT_SAMPLES)
+        self.peak_bytes: Optional[int] = None
+
+    def add(self, seconds: float, peak_bytes: Optional[int]) -> None:
+        self.calls += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+        self.recent.append(seconds)
+        if peak_bytes is not None:
+            self.peak_bytes = max(self.peak_bytes or 0, peak_bytes)
+
+    def summary(self) -> Dict[str, object]:
+        p50, p95 = np.percentile(self.recent, [50, 95]) if self.recent else (0.0, 0.0)
+        return {
+            "calls": self.calls,
+            "total_s": round(self.total, 3),
+            "mean_ms": round(self.total / self.calls * 1000, 2) if self.calls else 0.0,
+            "p50_ms": round(p50 * 1000, 2),
+            "p95_ms": round(p95 * 1000, 2),
+            "max_ms": round(self.max * 1000, 2),
+            "peak_mb": None if self.peak_bytes is None else round(self.peak_bytes / 1e6, 2),
+        }
+
+
+class _Span:
+    __slots__ = ("_owner", "_name", "_start", "_memory")
+
+    def __init__(self, owner: "Instrumentation", name: str):
+        self._owner = owner
+        self._name = name
+        self._memory = None
+
+    def __enter__(self):
+        if self._owner.track_memory:
+            self._memory = _memory_enter()
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        elapsed = time.perf_counter() - self._start
+        peak = _memory_exit(self._memory) if self._memory is not None else None
+        self._owner._record(self._name, elapsed, peak)
+        return False
+
+
+class Instrumentation:
+    """
+    Thread-safe per-stage timings and counters, process-wide and per session.
+
+    Streamlit sessions run as threads of one server process, so a single
+    instance (``INSTRUMENTS``) collects the stats of every session.
+    """
+
+    def __init__(self, enabled: bool = True, track_memory: bool = False):
+        self.enabled = enabled
+        self.track_memory = track_memory
+        self._stages: Dict[str, StageStats] = {}
+        self._counters: Dict[str, int] = {}
+        self._sessions: "OrderedDict[str, Dict[str, Dict]]" = OrderedDict()
+        self._caches: Dict[str, Callable[[], Dict]] = {}
+        self._lock = threading.Lock()
+
+    def set_track_memory(self, track_memory: bool) -> None:
+        """Switch per-span memory peaks on or off (stops tracemalloc when off)."""
+        self.track_memory = track_memory
+        if not track_memory and tracemalloc.is_tracing():
+            tracemalloc.stop()
+
+    def span(self, name: str):
+        """Context manager timing the enclosed block as stage ``name``."""
+        if not self.enabled:
+            return _NULL_SPAN
+        return _Span(self, name)
+
+    def timed(self, name: str) -> Callable[[Callable], Callable]:
+        """Decorator timing every call of the function as stage ``name``."""
+
+        def decorator(func: Callable) -> Callable:
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                with self.span(name):
+                    return func(*args, **kwargs)
+
+            return wrapper
+
+        return decorator
+
+    def timed_iter(self, name: str, iterable: Iterable) -> Iterator:
+        """
+        Yield from ``iterable``, timing only the time spent producing each
+        item (e.g. reading the next chunk of an upload) as stage ``name``.
+        """
+        if not self.enabled:
+            yield from iterable
+            return
+        iterator = iter(iterable)
+        while True:
+            with self.span(name):
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    return
+            yield item
+
+    def count(self, name: str, n: int = 1) -> None:
+        """Add ``n`` to counter ``name``."""
+        if not self.enabled:
+            return
+        session = _SESSION.get()
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + n
+            if session is not None:
+                counters = self._session(session)["counters"]
+                counters[name] = counters.get(name, 0) + n
+
+    def _session(self, session: str) -> Dict[str, Dict]:
+        """Stats of ``session``, marked most recently active. Caller holds the lock."""
+        entry = self._sessions.get(session)
+        if entry is None:
+            entry = self._sessions[session] = {"stages": {}, "counters": {}}
+            while len(self._sessions) > MAX_SESSIONS:
+                self._sessions.popitem(last=False)
+        self._sessions.move_to_end(session)
+        return entry
+
+    def _record(self, name: str, seconds: float, peak_bytes: Optional[int]) -> None:
+        session = _SESSION.get()
+        with self._lock:
+            self._stages.setdefault(name, StageStats()).add(seconds, peak_bytes)
+            if session is not None:
+                self._session(session)["stages"].setdefault(name, StageStats()).add(seconds, peak_bytes)
+
+    def register_cache(self, name: str, stats: Callable[[], Dict]) -> None:
+        """Show the hit/miss ``stats()`` of a cache under ``name``."""
+        with self._lock:
+            self._caches[name] = stats
+
+    def sessions(self) -> List[str]:
+        """Session IDs with recorded stats, most recently active first."""
+        with self._lock:
+            return list(reversed(self._sessions))
+
+    def stage_table(self, session: Optional[str] = None) -> pd.DataFrame:
+        """One row per stage (process-wide, or for ``session``), slowest in total first."""
+        with self._lock:
+            if session is None:
+                stages = self._stages
+            else:
+                stages = self._sessions.get(session, {}).get("stages", {})
+            rows = [{"stage": name, **stats.summary()} for name, stats in stages.items()]
+        columns = ["stage", "calls", "total_s", "mean_ms", "p50_ms", "p95_ms", "max_ms", "peak_mb"]
+        return pd.DataFrame(rows, columns=columns).sort_values("total_s", ascending=False, ignore_index=True)
+
+    def counter_table(self, session: Optional[str] = None) -> pd.DataFrame:
+        with self._lock:
+            if session is None:
+                counters = dict(self._counters)
+            else:
+                counters = dict(self._sessions.get(session, {}).get("counters", {}))
+        return pd.DataFrame(sorted(counters.items()), columns=["counter", "value"])
+
+    def cache_table(self) -> pd.DataFrame:
+        """Hits, misses and hit rate of every registered cache."""
+        with self._lock:
+            caches = dict(self._caches)
+        rows = []
+        for name, stats in caches.items():
+            values = stats()
+            rows.append(
+                {
+                    "cache": name,
+                    "hits": values.get("hits", 0),
+                    "misses": values.get("misses", 0),
+                    "hit_rate": values.get("hit_rate", 0.0),
+                }
+            )
+        return pd.DataFrame(rows, columns=["cache", "hits", "misses", "hit_rate"])
+
+    def reset(self) -> None:
+        """Clear all timings and counters (registered caches are kept)."""
+        with self._lock:
+            self._stages.clear()
+            self._counters.clear()
+            self._sessions.clear()
+
+
+# One collector per server process; disabled with EDUCATIONPEOPLE_INSTRUMENTATION=0.
+INSTRUMENTS = Instrumentation(enabled=os.environ.get("EDUCATIONPEOPLE_INSTRUMENTATION", "1") != "0")
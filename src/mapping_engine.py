@@ -1,29 +1,277 @@
 """
 AI-style indicator mapping engine.
 
-For now uses text similarity (SequenceMatcher).
+For now uses text similarity (SequenceMatcher) for single indicators and
+char n-gram TF-IDF cosine similarity for batches.
 Later you can plug in OpenAI / other LLMs here.
 """
 
+import hashlib
+import heapq
+import json
+import math
+import os
+import re
+import threading
+from collections import Counter, OrderedDict
+from dataclasses import dataclass
+from concurrent.futures import ProcessPoolExecutor
 from difflib import SequenceMatcher
-from typing import List, Dict, Tuple, Optional
+from typing import Callable, List, Dict, Tuple, Optional, Iterable, Union
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+from src.instrumentation import INSTRUMENTS
+from src.text_clusters import cluster_near_duplicates
+
+
+KEY_WORDS = ["student", "school", "teacher", "book", "classroom", "household", "learner"]
+KEY_WORD_BONUS = 0.05
+
+# Tokens shared by almost every indicator name carry no signal for pruning.
+INDEX_STOP_WORDS = frozenset(
+    ["number", "of", "the", "a", "an", "and", "or", "in", "on", "to", "for", "with", "by", "at", "from"]
+)
+DEFAULT_TOP_K_CANDIDATES = 20
+
+NGRAM_SIZE = 3
+# Default mapping thresholds per scorer. TF-IDF cosine scores run lower than
+# difflib ratios for the same pair of texts (correct demo matches score
+# 0.41-0.65 with TF-IDF and 0.64-0.82 with difflib), so the scales differ.
+DEFAULT_TFIDF_THRESHOLD = 0.35
+DEFAULT_DIFFLIB_THRESHOLD = 0.45
+BATCH_CHUNK_ROWS = 4096
+PARALLEL_CHUNK_SIZE = 256
+
+# Catalog features are rebuilt only when the catalog content changes.
+_CATALOG_FEATURES: Dict[str, Dict] = {}
 
 
 def _similarity(a: str, b: str) -> float:
     return SequenceMatcher(None, a.lower(), b.lower()).ratio()
 
 
+def normalize_indicator_text(text) -> str:
+    """Lower-case an indicator text and collapse runs of whitespace."""
+    if text is None or (isinstance(text, float) and math.isnan(text)):
+        return ""
+    return " ".join(str(text).lower().split())
+
+
+def catalog_fingerprint(org_catalog: List[Dict]) -> str:
+    """Stable short hash of the catalog IDs and names (the "catalog version")."""
+    payload = json.dumps(
+        [[ind.get("org_indicator_id"), ind.get("name", "")] for ind in org_catalog],
+        ensure_ascii=False,
+    )
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()[:16]
+
+
+class MappingCache:
+    """
+    Bounded LRU cache of mapping results.
+
+    Keys are ``(normalised text, catalog version, threshold)`` and values are
+    ``(org_indicator_id, score)``, so each unique indicator string is scored
+    once per catalog version. If ``path`` is given, entries are loaded from
+    and saved to a JSON file so repeated uploads across sessions skip scoring.
+    """
+
+    def __init__(self, maxsize: int = 100_000, path: Optional[str] = None):
+        self.maxsize = maxsize
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[Tuple[str, str, float], Tuple[Optional[str], float]]" = OrderedDict()
+        self._dirty = False
+        self._lock = threading.Lock()
+        if path and os.path.exists(path):
+            self.load()
+
+    @staticmethod
+    def make_key(text: str, catalog_version: str, threshold: float) -> Tuple[str, str, float]:
+        return normalize_indicator_text(text), catalog_version, round(float(threshold), 6)
+
+    def get(self, key: Tuple[str, str, float]) -> Optional[Tuple[Optional[str], float]]:
+        with self._lock:
+            value = self._entries.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key: Tuple[str, str, float], value: Tuple[Optional[str], float]) -> None:
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+            self._dirty = True
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = 0
+            self._dirty = True
+
+    def stats(self) -> Dict[str, float]:
+        """Hit/miss counters for sizing and sanity checks."""
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "size": len(self._entries),
+            "maxsize": self.maxsize,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+        }
+
+    def load(self) -> None:
+        with open(self.path, "r", encoding="utf-8") as fh:
+            rows = json.load(fh)
+        with self._lock:
+            for text, version, threshold, org_id, score in rows[-self.maxsize :]:
+                self._entries[(text, version, threshold)] = (org_id, score)
+            self._dirty = False
+
+    def save(self) -> None:
+        """Write entries to ``path`` (atomically) if anything changed."""
+        if not self.path or not self._dirty:
+            return
+        with self._lock:
+            rows = [[*key, *value] for key, value in self._entries.items()]
+            self._dirty = False
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as fh:
+            json.dump(rows, fh, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
+
+
+def _tokenize(text_lower: str) -> List[str]:
+    return [tok for tok in re.findall(r"[a-z0-9]+", text_lower) if tok not in INDEX_STOP_WORDS]
+
+
+def _keywords_in(text_lower: str) -> frozenset:
+    return frozenset(kw for kw in KEY_WORDS if kw in text_lower)
+
+
+class CatalogIndex:
+    """
+    Precomputed lookup structures over an indicator catalog.
+
+    Holds the lower-cased and normalised names, per-entry token and keyword
+    sets, and inverted postings (token -> entry positions, keyword -> entry
+    positions) used to prune the candidates scored by ``map_indicator_to_org``.
+    """
+
+    def __init__(self, org_catalog: List[Dict]):
+        self.entries = list(org_catalog)
+        self.version = catalog_fingerprint(self.entries)
+        self.lowered_names = [ind.get("name", "").lower() for ind in self.entries]
+        self.normalized_names = [normalize_indicator_text(name) for name in self.lowered_names]
+        self.token_sets = [frozenset(_tokenize(name)) for name in self.lowered_names]
+        self.entry_keywords = [_keywords_in(name) for name in self.lowered_names]
+
+        self.by_name: Dict[str, int] = {}
+        for pos, name in enumerate(self.normalized_names):
+            self.by_name.setdefault(name, pos)
+
+        self.postings: Dict[str, List[int]] = {}
+        for pos, tokens in enumerate(self.token_sets):
+            for tok in tokens:
+                self.postings.setdefault(tok, []).append(pos)
+
+        self.keyword_postings: Dict[str, List[int]] = {}
+        for pos, keywords in enumerate(self.entry_keywords):
+            for kw in keywords:
+                self.keyword_postings.setdefault(kw, []).append(pos)
+
+        n_entries = max(len(self.entries), 1)
+        self.token_weights = {
+            tok: math.log(1 + n_entries / len(positions)) for tok, positions in self.postings.items()
+        }
+        self.keyword_weights = {
+            kw: math.log(1 + n_entries / len(positions))
+            for kw, positions in self.keyword_postings.items()
+        }
+
+    def candidates(self, text_lower: str, top_k: int = DEFAULT_TOP_K_CANDIDATES) -> List[int]:
+        """
+        Positions of the ``top_k`` entries sharing the most (IDF-weighted)
+        tokens or keywords with the text, in catalog order.
+
+        An entry whose normalised name equals the text is always included.
+        Returns an empty list when no entry shares anything with the text.
+        """
+        weights: Dict[int, float] = {}
+        for tok in set(_tokenize(text_lower)):
+            for pos in self.postings.get(tok, ()):
+                weights[pos] = weights.get(pos, 0.0) + self.token_weights[tok]
+        for kw in _keywords_in(text_lower):
+            for pos in self.keyword_postings.get(kw, ()):
+                weights[pos] = weights.get(pos, 0.0) + self.keyword_weights[kw]
+
+        best = heapq.nlargest(top_k, weights, key=lambda pos: (weights[pos], -pos))
+        exact = self.by_name.get(normalize_indicator_text(text_lower))
+        if exact is not None and exact not in best:
+            best.append(exact)
+        return sorted(best)
+
+
+_CATALOG_INDEXES: Dict[str, CatalogIndex] = {}
+
+
+def get_catalog_index(org_catalog: List[Dict]) -> CatalogIndex:
+    """Return the (cached) CatalogIndex for this catalog version."""
+    version = catalog_fingerprint(org_catalog)
+    index = _CATALOG_INDEXES.get(version)
+    if index is None:
+        index = _CATALOG_INDEXES[version] = CatalogIndex(org_catalog)
+    return index
+
+
+def _difflib_version(use_index: bool, top_k: int) -> str:
+    """Cache version tag of the difflib scorer: pruned results can differ from a full scan."""
+    return f"difflib+index{top_k}" if use_index else "difflib"
+
+
 def map_indicator_to_org(
     indicator_text: str,
     org_catalog: List[Dict],
-    threshold: float = 0.45,
+    threshold: float = DEFAULT_DIFFLIB_THRESHOLD,
+    cache: Optional[MappingCache] = None,
+    index: Optional[CatalogIndex] = None,
+    top_k: int = DEFAULT_TOP_K_CANDIDATES,
 ) -> Tuple[Optional[str], float]:
     """
     Map a single project indicator to the closest organizational indicator.
 
     Returns (org_indicator_id, similarity_score).
     If no match above threshold, returns (None, best_score).
+
+    With a ``cache``, the normalised text is scored once per catalog version
+    and threshold; later calls are served from the cache.
+
+    With an ``index`` (see ``get_catalog_index``; it must be built from
+    ``org_catalog``), only the ``top_k`` entries sharing tokens or keywords with
+    the text are scored, falling back to a full scan when none do.
     """
+    if cache is not None:
+        key = cache.make_key(
+            indicator_text,
+            f"{_difflib_version(index is not None, top_k)}:{catalog_fingerprint(org_catalog)}",
+            threshold,
+        )
+        result = cache.get(key)
+        if result is None:
+            result = map_indicator_to_org(key[0], org_catalog, threshold, index=index, top_k=top_k)
+            cache.put(key, result)
+        return result
+
     indicator_text = (indicator_text or "").strip()
     if not indicator_text:
         return None, 0.0
@@ -31,15 +279,27 @@ def map_indicator_to_org(
     best_match = None
     best_score = 0.0
 
-    key_words = ["student", "school", "teacher", "book", "classroom", "household", "learner"]
+    text_lower = indicator_text.lower()
+    text_keywords = _keywords_in(text_lower)
 
-    for org_ind in org_catalog:
-        name = org_ind.get("name", "")
-        score = _similarity(indicator_text, name)
+    if index is not None:
+        positions = index.candidates(text_lower, top_k) or range(len(index.entries))
+        scored = (
+            (index.entries[pos], index.lowered_names[pos], index.entry_keywords[pos])
+            for pos in positions
+        )
+    else:
+        scored = (
+            (org_ind, name_lower, _keywords_in(name_lower))
+            for org_ind in org_catalog
+            for name_lower in [org_ind.get("name", "").lower()]
+        )
 
-        for kw in key_words:
-            if kw in indicator_text.lower() and kw in name.lower():
-                score += 0.05
+    for org_ind, name_lower, name_keywords in scored:
+        score = SequenceMatcher(None, text_lower, name_lower).ratio()
+
+        for _ in range(len(text_keywords & name_keywords)):
+            score += KEY_WORD_BONUS
 
         if score > best_score:
             best_score = score
@@ -49,3 +309,470 @@ def map_indicator_to_org(
         return best_match["org_indicator_id"], round(best_score, 3)
 
     return None, round(best_score, 3)
+
+
+# ----------------------------------------------------------------------
+# Vectorized batch mapping
+# ----------------------------------------------------------------------
+
+
+def _char_ngrams(text: str) -> List[str]:
+    padded = f" {text} "
+    return [padded[i : i + NGRAM_SIZE] for i in range(len(padded) - NGRAM_SIZE + 1)]
+
+
+def _keyword_matrix(texts: List[str]) -> np.ndarray:
+    """0/1 matrix (len(texts) x len(KEY_WORDS)) of keyword presence."""
+    return np.array(
+        [[kw in text for kw in KEY_WORDS] for text in texts],
+        dtype=np.float32,
+    ).reshape(len(texts), len(KEY_WORDS))
+
+
+def _catalog_features(org_catalog: List[Dict]) -> Dict:
+    """
+    Precompute the TF-IDF matrix of the catalog names.
+
+    The vocabulary and IDF weights come from the catalog only, so project
+    texts are projected onto the same space without refitting.
+    """
+    version = catalog_fingerprint(org_catalog)
+    features = _CATALOG_FEATURES.get(version)
+    if features is not None:
+        return features
+
+    names = [normalize_indicator_text(ind.get("name", "")) for ind in org_catalog]
+    grams = [Counter(_char_ngrams(name)) for name in names]
+
+    vocab: Dict[str, int] = {}
+    doc_freq: Counter = Counter()
+    for counts in grams:
+        doc_freq.update(counts.keys())
+        for gram in counts:
+            vocab.setdefault(gram, len(vocab))
+
+    n_docs = len(names)
+    idf = np.ones(len(vocab), dtype=np.float32)
+    for gram, col in vocab.items():
+        idf[col] = math.log((1 + n_docs) / (1 + doc_freq[gram])) + 1.0
+
+    features = {
+        "version": version,
+        "ids": np.array([ind.get("org_indicator_id") for ind in org_catalog], dtype=object),
+        "vocab": vocab,
+        "idf": idf,
+        # IDF assigned to n-grams that never occur in the catalog
+        "unseen_idf": math.log(1 + n_docs) + 1.0,
+        "matrix": _tfidf_matrix(grams, vocab, idf, 0.0).T.tocsr(),
+        "keywords": _keyword_matrix(names).T,
+    }
+    _CATALOG_FEATURES[version] = features
+    return features
+
+
+def _tfidf_matrix(
+    grams: List[Counter],
+    vocab: Dict[str, int],
+    idf: np.ndarray,
+    unseen_idf: float,
+) -> sparse.csr_matrix:
+    """L2-normalised TF-IDF rows; unseen n-grams only contribute to the norm."""
+    rows, cols, vals = [], [], []
+    norms = np.zeros(len(grams), dtype=np.float32)
+    for row, counts in enumerate(grams):
+        sq = 0.0
+        for gram, tf in counts.items():
+            col = vocab.get(gram)
+            if col is None:
+                sq += (tf * unseen_idf) ** 2
+                continue
+            weight = tf * idf[col]
+            rows.append(row)
+            cols.append(col)
+            vals.append(weight)
+            sq += weight * weight
+        norms[row] = math.sqrt(sq)
+
+    matrix = sparse.csr_matrix(
+        (np.asarray(vals, dtype=np.float32), (rows, cols)),
+        shape=(len(grams), len(vocab)),
+    )
+    inv = np.divide(1.0, norms, out=np.zeros_like(norms), where=norms > 0)
+    return sparse.diags(inv) @ matrix
+
+
+def _score_matrix(texts: List[str], features: Dict) -> np.ndarray:
+    """Dense (len(texts) x catalog size) similarity scores incl. keyword bonus."""
+    grams = [Counter(_char_ngrams(text)) for text in texts]
+    vectors = _tfidf_matrix(grams, features["vocab"], features["idf"], features["unseen_idf"])
+    scores = np.asarray((vectors @ features["matrix"]).todense(), dtype=np.float32)
+    scores += KEY_WORD_BONUS * (_keyword_matrix(texts) @ features["keywords"])
+    return scores
+
+
+def _best_matches_tfidf(texts: List[str], org_catalog: List[Dict]) -> List[Tuple[Optional[str], float]]:
+    """Best ``(org_indicator_id, score)`` per normalised text, chunk by chunk."""
+    features = _catalog_features(org_catalog)
+    results: List[Tuple[Optional[str], float]] = []
+    for start in range(0, len(texts), BATCH_CHUNK_ROWS):
+        chunk = texts[start : start + BATCH_CHUNK_ROWS]
+        block = _score_matrix(chunk, features)
+        best_pos = block.argmax(axis=1)
+        best_score = block.max(axis=1).astype(np.float64)
+        for text, pos, score in zip(chunk, best_pos, best_score):
+            if not text or score <= 0:
+                results.append((None, 0.0))
+            else:
+                results.append((features["ids"][pos], round(float(score), 3)))
+    return results
+
+
+def _score_unique_texts(
+    texts: Union[pd.Series, Iterable[str]],
+    org_catalog: List[Dict],
+    cache: Optional[MappingCache],
+    scorer: str,
+    score_fn: Callable[[List[str]], List[Tuple[Optional[str], float]]],
+    near_duplicates: Optional[float] = None,
+    scorer_version: Optional[str] = None,
+) -> pd.DataFrame:
+    """
+    Deduplicate ``texts``, score the unique (uncached) ones with ``score_fn``
+    and expand the raw best matches back to one row per input text.
+
+    With ``near_duplicates`` (a Jaccard threshold, see
+    ``src.text_clusters``), the uncached texts are clustered first and only
+    one representative per cluster is scored; every member gets its match
+    and score.
+
+    Cached entries are stored under threshold 0, i.e. as raw best matches,
+    and under ``scorer_version`` (default: ``scorer``) plus the catalog
+    fingerprint.
+    """
+    index = texts.index if isinstance(texts, pd.Series) else None
+    normalized = pd.Series([normalize_indicator_text(t) for t in texts], index=index, dtype=object)
+
+    if normalized.empty or not org_catalog:
+        return pd.DataFrame(
+            {
+                "Best_Org_Indicator_ID": pd.Series(None, index=normalized.index, dtype=object),
+                "Similarity_Score": pd.Series(0.0, index=normalized.index, dtype=float),
+            }
+        )
+
+    codes, uniques = pd.factorize(normalized)
+    uniques = list(uniques)
+    unique_results: List[Optional[Tuple[Optional[str], float]]] = [None] * len(uniques)
+
+    keys = []
+    if cache is not None:
+        # Matches copied from a representative are cached apart from scored ones
+        clustered = "" if near_duplicates is None else f"~{near_duplicates:g}"
+        version = f"{scorer_version or scorer}{clustered}:{catalog_fingerprint(org_catalog)}"
+        keys = [cache.make_key(text, version, 0.0) for text in uniques]
+        unique_results = [cache.get(key) for key in keys]
+
+    todo = [i for i, result in enumerate(unique_results) if result is None]
+    representative = np.arange(len(todo))
+    if near_duplicates is not None:
+        rows_per_text = np.bincount(codes, minlength=len(uniques))[todo]
+        representative = cluster_near_duplicates([uniques[i] for i in todo], rows_per_text, near_duplicates)
+    to_score = np.flatnonzero(representative == np.arange(len(todo)))
+
+    INSTRUMENTS.count("mapping.texts", len(normalized))
+    INSTRUMENTS.count("mapping.unique_texts", len(uniques))
+    INSTRUMENTS.count("mapping.scored_texts", len(to_score))
+    with INSTRUMENTS.span(f"mapping.{scorer}.score"):
+        scored = score_fn([uniques[todo[k]] for k in to_score])
+    scored_by_position = dict(zip(to_score.tolist(), scored))
+    for k, i in enumerate(todo):
+        result = scored_by_position[representative[k]]
+        unique_results[i] = result
+        if cache is not None:
+            cache.put(keys[i], result)
+
+    unique_ids = np.array([result[0] for result in unique_results], dtype=object)
+    unique_scores = np.array([result[1] for result in unique_results], dtype=float)
+    return pd.DataFrame(
+        {
+            "Best_Org_Indicator_ID": unique_ids[codes],
+            "Similarity_Score": unique_scores[codes],
+        },
+        index=normalized.index,
+    )
+
+
+def apply_threshold(best_matches: pd.DataFrame, threshold: float) -> pd.DataFrame:
+    """
+    Turn raw best matches into thresholded mappings.
+
+    ``best_matches`` is the output of ``score_indicators_batch`` /
+    ``score_indicators_parallel``. The threshold is a vectorized mask over the
+    scores, so changing it never rescores anything.
+    """
+    scores = best_matches["Similarity_Score"].to_numpy()
+    if scores.dtype.kind != "f":
+        scores = scores.astype(float)
+    ids = best_matches["Best_Org_Indicator_ID"].to_numpy(dtype=object)
+    return pd.DataFrame(
+        {
+            # Compared at the scores' own precision (float32 in compact frames)
+            "Mapped_Org_Indicator_ID": np.where(scores >= scores.dtype.type(threshold), ids, None),
+            "Similarity_Score": scores,
+        },
+        index=best_matches.index,
+    )
+
+
+def score_indicators_batch(
+    texts: Union[pd.Series, Iterable[str]],
+    org_catalog: List[Dict],
+    cache: Optional[MappingCache] = None,
+    near_duplicates: Optional[float] = None,
+) -> pd.DataFrame:
+    """
+    Best catalog match for many project indicators, without a threshold.
+
+    Unique normalised texts are scored against the catalog with one sparse
+    matrix multiply per chunk of ``BATCH_CHUNK_ROWS`` texts. With a ``cache``,
+    only texts not seen before for this catalog version are scored (raw
+    results are cached under threshold 0). With ``near_duplicates``, only
+    one text per cluster of near-duplicate texts is scored (see
+    ``_score_unique_texts``).
+
+    Returns a DataFrame aligned with ``texts`` (same index for a Series) with
+    columns ``Best_Org_Indicator_ID`` and ``Similarity_Score``.
+    """
+    with INSTRUMENTS.span("mapping.tfidf"):
+        return _score_unique_texts(
+            texts,
+            org_catalog,
+            cache,
+            "tfidf",
+            lambda unique_texts: _best_matches_tfidf(unique_texts, org_catalog),
+            near_duplicates,
+        )
+
+
+def map_indicators_batch(
+    texts: Union[pd.Series, Iterable[str]],
+    org_catalog: List[Dict],
+    threshold: float = DEFAULT_TFIDF_THRESHOLD,
+    cache: Optional[MappingCache] = None,
+    near_duplicates: Optional[float] = None,
+) -> pd.DataFrame:
+    """
+    Map many project indicators at once (``score_indicators_batch`` followed
+    by ``apply_threshold``).
+
+    The default ``threshold`` is ``DEFAULT_TFIDF_THRESHOLD`` (0.35, also the
+    mapping page's default for this engine): TF-IDF cosine scores are on a
+    lower scale than the difflib ratios behind ``map_indicator_to_org``.
+
+    Returns a DataFrame aligned with ``texts`` (same index for a Series) with
+    columns ``Mapped_Org_Indicator_ID`` and ``Similarity_Score``.
+    """
+    best_matches = score_indicators_batch(texts, org_catalog, cache=cache, near_duplicates=near_duplicates)
+    return apply_threshold(best_matches, threshold)
+
+
+# ----------------------------------------------------------------------
+# Top-K candidate matches
+# ----------------------------------------------------------------------
+
+
+@dataclass
+class TopKMatches:
+    """
+    Top-K catalog matches per project indicator in compact NumPy arrays.
+
+    ``indices`` (int32) and ``scores`` (float32) have shape ``(N, K)`` and are
+    ordered best first; ``indices`` points into ``catalog_ids`` and is -1 where
+    a row has fewer than K non-zero matches. ``row_index`` holds the labels of
+    the input rows.
+    """
+
+    catalog_ids: np.ndarray
+    indices: np.ndarray
+    scores: np.ndarray
+    row_index: pd.Index
+
+    @property
+    def k(self) -> int:
+        return self.indices.shape[1]
+
+    def to_frame(self) -> pd.DataFrame:
+        """Long format (one row per candidate) for review and export."""
+        rows, ranks = np.nonzero(self.indices >= 0)
+        return pd.DataFrame(
+            {
+                "Row": self.row_index[rows],
+                "Rank": (ranks + 1).astype(np.int32),
+                "Org_Indicator_ID": self.catalog_ids[self.indices[rows, ranks]],
+                "Similarity_Score": np.round(self.scores[rows, ranks].astype(np.float64), 3),
+            }
+        )
+
+
+@INSTRUMENTS.timed("mapping.top_k")
+def top_k_matches(
+    texts: Union[pd.Series, Iterable[str]],
+    org_catalog: List[Dict],
+    k: int = 3,
+) -> TopKMatches:
+    """
+    Top-``k`` catalog matches per project indicator (TF-IDF scorer).
+
+    Unique normalised texts are scored chunk by chunk and the best ``k``
+    columns of each score block are selected with ``np.argpartition``; only
+    those ``k`` values are then sorted.
+    """
+    index = texts.index if isinstance(texts, pd.Series) else None
+    normalized = pd.Series([normalize_indicator_text(t) for t in texts], index=index, dtype=object)
+    features = _catalog_features(org_catalog)
+    k = max(1, min(k, len(org_catalog)))
+
+    codes, uniques = pd.factorize(normalized)
+    uniques = list(uniques)
+    unique_indices = np.full((len(uniques), k), -1, dtype=np.int32)
+    unique_scores = np.zeros((len(uniques), k), dtype=np.float32)
+
+    for start in range(0, len(uniques), BATCH_CHUNK_ROWS):
+        chunk = uniques[start : start + BATCH_CHUNK_ROWS]
+        block = _score_matrix(chunk, features)
+        if k < block.shape[1]:
+            top = np.argpartition(-block, k - 1, axis=1)[:, :k]
+        else:
+            top = np.tile(np.arange(block.shape[1]), (len(chunk), 1))
+        top_scores = np.take_along_axis(block, top, axis=1)
+        order = np.argsort(-top_scores, axis=1, kind="stable")
+        top = np.take_along_axis(top, order, axis=1)
+        top_scores = np.take_along_axis(top_scores, order, axis=1)
+
+        empty = np.array([not text for text in chunk])[:, None]
+        valid = (top_scores > 0) & ~empty
+        stop = start + len(chunk)
+        unique_indices[start:stop] = np.where(valid, top, -1)
+        unique_scores[start:stop] = np.where(valid, top_scores, 0.0)
+
+    return TopKMatches(
+        catalog_ids=features["ids"],
+        indices=unique_indices[codes],
+        scores=unique_scores[codes],
+        row_index=normalized.index,
+    )
+
+
+# ----------------------------------------------------------------------
+# Process-pool mapping (difflib scorer)
+# ----------------------------------------------------------------------
+
+# Set once per worker process by _init_mapping_worker.
+_WORKER_CATALOG: List[Dict] = []
+_WORKER_INDEX: Optional[CatalogIndex] = None
+
+
+def _init_mapping_worker(org_catalog: List[Dict], use_index: bool) -> None:
+    global _WORKER_CATALOG, _WORKER_INDEX
+    _WORKER_CATALOG = org_catalog
+    _WORKER_INDEX = CatalogIndex(org_catalog) if use_index else None
+
+
+def _map_chunk_in_worker(texts: List[str], top_k: int) -> List[Tuple[Optional[str], float]]:
+    return [
+        map_indicator_to_org(text, _WORKER_CATALOG, 0.0, index=_WORKER_INDEX, top_k=top_k)
+        for text in texts
+    ]
+
+
+def score_indicators_parallel(
+    texts: Union[pd.Series, Iterable[str]],
+    org_catalog: List[Dict],
+    max_workers: Optional[int] = None,
+    chunksize: int = PARALLEL_CHUNK_SIZE,
+    use_index: bool = False,
+    top_k: int = DEFAULT_TOP_K_CANDIDATES,
+    cache: Optional[MappingCache] = None,
+    near_duplicates: Optional[float] = None,
+) -> pd.DataFrame:
+    """
+    Best catalog match for many project indicators with the difflib scorer,
+    on several cores and without a threshold.
+
+    Unique normalised texts are split into chunks of ``chunksize`` and mapped
+    by a ``ProcessPoolExecutor`` with ``max_workers`` processes (default: one
+    per CPU). The catalog (and its ``CatalogIndex``, if ``use_index``) is sent
+    to each worker once by the pool initializer. Chunks are merged in input
+    order, so the result does not depend on the number of workers;
+    ``max_workers=1`` maps in-process. With ``near_duplicates``,
+    ``map_indicator_to_org`` only runs for one text per cluster of
+    near-duplicate texts (see ``_score_unique_texts``).
+
+    Returns the same aligned DataFrame as ``score_indicators_batch``.
+    """
+
+    def score_fn(unique_texts: List[str]) -> List[Tuple[Optional[str], float]]:
+        chunks = [
+            unique_texts[start : start + chunksize]
+            for start in range(0, len(unique_texts), chunksize)
+        ]
+        workers = min(max_workers or os.cpu_count() or 1, len(chunks))
+        if workers <= 1:
+            index = get_catalog_index(org_catalog) if use_index else None
+            return [
+                map_indicator_to_org(text, org_catalog, 0.0, index=index, top_k=top_k)
+                for text in unique_texts
+            ]
+
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            initializer=_init_mapping_worker,
+            initargs=(org_catalog, use_index),
+        ) as executor:
+            chunk_results = list(
+                executor.map(
+                    _map_chunk_in_worker,
+                    chunks,
+                    [top_k] * len(chunks),
+                )
+            )
+        return [result for chunk in chunk_results for result in chunk]
+
+    with INSTRUMENTS.span("mapping.difflib"):
+        return _score_unique_texts(
+            texts,
+            org_catalog,
+            cache,
+            "difflib",
+            score_fn,
+            near_duplicates,
+            scorer_version=_difflib_version(use_index, top_k),
+        )
+
+
+def map_indicators_parallel(
+    texts: Union[pd.Series, Iterable[str]],
+    org_catalog: List[Dict],
+    threshold: float = DEFAULT_DIFFLIB_THRESHOLD,
+    max_workers: Optional[int] = None,
+    chunksize: int = PARALLEL_CHUNK_SIZE,
+    use_index: bool = False,
+    top_k: int = DEFAULT_TOP_K_CANDIDATES,
+    cache: Optional[MappingCache] = None,
+    near_duplicates: Optional[float] = None,
+) -> pd.DataFrame:
+    """
+    Map many project indicators with the difflib scorer on several cores
+    (``score_indicators_parallel`` followed by ``apply_threshold``).
+    """
+    best_matches = score_indicators_parallel(
+        texts,
+        org_catalog,
+        max_workers=max_workers,
+        chunksize=chunksize,
+        use_index=use_index,
+        top_k=top_k,
+        cache=cache,
+        near_duplicates=near_duplicates,
+    )
+    return apply_threshold(best_matches, threshold)
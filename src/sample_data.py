@@ -7,7 +7,14 @@ Used by:
  - Org Dashboard page
 """
 
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterator, List, Optional
+
+import numpy as np
 import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
 
 
 COUNTRIES = [
@@ -229,8 +236,6 @@ def demo_mapping() -> pd.DataFrame:
 
 def save_demo_files(path="data/sample_logframes"):
     """Creates CSV files in the repo (optional helper)."""
-    import os
-
     os.makedirs(path, exist_ok=True)
 
     demo_logframe().to_csv(f"{path}/demo_logframe.csv", index=False)
@@ -240,7 +245,7 @@ def save_demo_files(path="data/sample_logframes"):
         "logframe_file": f"{path}/demo_logframe.csv",
         "mapping_file": f"{path}/demo_mapping.csv",
     }
-import numpy as np
+
 
 # -------------------------------------------------------------------
 # Random synthetic project data generator for large test datasets
@@ -274,38 +279,192 @@ ORG_INDICATOR_IDS = [
     "EDP_OUT2_HH",    # households
 ]
 
+REGIONS = {
+    "Kenya": ["Nairobi County", "Mombasa", "Kisumu"],
+    "Tanzania": ["Dar es Salaam", "Mwanza"],
+    "Rwanda": ["Kigali City", "Eastern Province"],
+    "Mozambique": ["Nampula", "Zambezia"],
+    "Liberia": ["Montserrado", "Grand Bassa"],
+    "Libya": ["Tripoli District", "Benghazi District"],
+    "Angola": ["Luanda Province", "Huambo"],
+    "Honduras": ["Cortés", "Francisco Morazán"],
+    "El Salvador": ["San Salvador", "Santa Ana"],
+    "Sri Lanka": ["Western Province", "Central Province"],
+    "Vietnam": ["Ho Chi Minh City", "Hanoi"],
+}
+
+PROJECTS = [
+    "Project A – Remedial Learning",
+    "Project B – Infrastructure Support",
+    "Project C – Teacher Training",
+    "Project D – Reading Promotion",
+    "Project E – Community Engagement",
+    "Project F – Parenting & Governance",
+]
+
+# Realistic indicator texts per org indicator ID
+INDICATOR_NAMES = {
+    "EDP_OUT1_STUD": [
+        "Number of students reached through project activities",
+        "Number of learners attending remedial or support classes",
+    ],
+    "EDP_OUT1_SCH": [
+        "Number of schools supported with EducationPeople services",
+        "Number of schools with improved learning environments",
+    ],
+    "EDP_OUT1_TCH": [
+        "Number of teachers trained in active pedagogy",
+        "Number of teachers reached with CPD sessions",
+    ],
+    "EDP_OUT1_BKS": [
+        "Number of reading books distributed to students",
+        "Number of learning materials distributed to schools",
+    ],
+    "EDP_OUT2_HH": [
+        "Number of households engaged in education support",
+        "Number of caregivers participating in parenting sessions",
+    ],
+}
+
+# Base value range [low, high) per org indicator ID: bigger for
+# students/books, smaller for schools/teachers/households
+VALUE_RANGES = {
+    "EDP_OUT1_STUD": (50, 800),
+    "EDP_OUT1_SCH": (1, 20),
+    "EDP_OUT1_TCH": (5, 200),
+    "EDP_OUT1_BKS": (200, 10000),
+    "EDP_OUT2_HH": (20, 1000),
+}
+
+N_DISTRICTS = 5
+N_SCHOOLS_PER_REGION = 9
+RANDOM_CHUNK_ROWS = 250_000
+RANDOM_FILE_FORMATS = ("csv", "parquet")
+
+# Lookup tables for the vectorized generator: every categorical column is
+# drawn as integer codes into one of these arrays.
+_REGION_NAMES = np.array([region for country in COUNTRIES for region in REGIONS[country]], dtype=object)
+_REGION_COUNTS = np.array([len(REGIONS[country]) for country in COUNTRIES])
+_REGION_OFFSETS = np.concatenate([[0], np.cumsum(_REGION_COUNTS)[:-1]])
+_DISTRICT_NAMES = np.array([f"District {i}" for i in range(1, N_DISTRICTS + 1)], dtype=object)
+_SCHOOL_NAMES = np.array(
+    [f"{region} Community School {i}" for region in _REGION_NAMES for i in range(1, N_SCHOOLS_PER_REGION + 1)],
+    dtype=object,
+)
+_INDICATOR_TEXTS = np.array([name for org_id in ORG_INDICATOR_IDS for name in INDICATOR_NAMES[org_id]], dtype=object)
+_INDICATOR_COUNTS = np.array([len(INDICATOR_NAMES[org_id]) for org_id in ORG_INDICATOR_IDS])
+_INDICATOR_OFFSETS = np.concatenate([[0], np.cumsum(_INDICATOR_COUNTS)[:-1]])
+_VALUE_LOW = np.array([VALUE_RANGES[org_id][0] for org_id in ORG_INDICATOR_IDS])
+_VALUE_HIGH = np.array([VALUE_RANGES[org_id][1] for org_id in ORG_INDICATOR_IDS])
+
+
+_CATALOG_SUBJECTS = [
+    "students", "girls", "boys", "learners with disabilities", "teachers", "head teachers",
+    "schools", "classrooms", "caregivers", "households", "school committees", "communities",
+]
+_CATALOG_ACTIONS = [
+    "reached with", "trained in", "supported with", "benefiting from", "participating in",
+    "equipped with", "assessed for", "enrolled in",
+]
+_CATALOG_OBJECTS = [
+    "remedial learning", "reading materials", "active pedagogy", "inclusive education",
+    "school feeding", "psychosocial support", "STEM kits", "parenting sessions",
+    "school governance training", "WASH facilities", "digital learning", "numeracy camps",
+]
 
-def _indicator_name_for_org_id(org_id: str) -> str:
-    """Helper to generate a realistic indicator name text."""
-    mapping = {
-        "EDP_OUT1_STUD": [
-            "Number of students reached through project activities",
-            "Number of learners attending remedial or support classes",
-        ],
-        "EDP_OUT1_SCH": [
-            "Number of schools supported with EducationPeople services",
-            "Number of schools with improved learning environments",
-        ],
-        "EDP_OUT1_TCH": [
-            "Number of teachers trained in active pedagogy",
-            "Number of teachers reached with CPD sessions",
-        ],
-        "EDP_OUT1_BKS": [
-            "Number of reading books distributed to students",
-            "Number of learning materials distributed to schools",
-        ],
-        "EDP_OUT2_HH": [
-            "Number of households engaged in education support",
-            "Number of caregivers participating in parenting sessions",
-        ],
-    }
-    choices = mapping.get(org_id, ["Project indicator related to education outcomes"])
-    return np.random.choice(choices)
+
+def generate_random_catalog(num_indicators: int = 100, seed: int = 42) -> List[Dict]:
+    """
+    Synthetic indicator catalog of ``num_indicators`` entries for load
+    testing: the real EducationPeople catalog first (so generated datasets
+    still map), then distinct generated indicators.
+    """
+    from src.indicator_catalog import EDUCATIONPEOPLE_INDICATORS
+
+    catalog = [dict(ind) for ind in EDUCATIONPEOPLE_INDICATORS[:num_indicators]]
+    rng = np.random.default_rng(seed)
+    combos = [
+        (subject, action, obj)
+        for subject in _CATALOG_SUBJECTS
+        for action in _CATALOG_ACTIONS
+        for obj in _CATALOG_OBJECTS
+    ]
+    order = rng.permutation(len(combos))
+    for i in range(num_indicators - len(catalog)):
+        subject, action, obj = combos[order[i % len(combos)]]
+        suffix = f" (set {i // len(combos) + 1})" if i >= len(combos) else ""
+        catalog.append(
+            {
+                "org_indicator_id": f"SYN_{i + 1:05d}",
+                "name": f"Number of {subject} {action} {obj}{suffix}",
+                "description": f"Synthetic indicator: {subject} {action} {obj}",
+                "level": "Output" if i % 3 else "Outcome",
+                "unit": subject.capitalize(),
+                "disaggregation": "Sex, location",
+            }
+        )
+    return catalog
+
+
+def _categorical(codes: np.ndarray, names) -> pd.Categorical:
+    return pd.Categorical.from_codes(codes, categories=pd.Index(list(names), dtype=object))
+
+
+def _random_projects_chunk(rng: np.random.Generator, n: int) -> pd.DataFrame:
+    """``n`` random rows, every column drawn for the whole chunk at once."""
+    country = rng.integers(0, len(COUNTRIES), n)
+    region = _REGION_OFFSETS[country] + (rng.random(n) * _REGION_COUNTS[country]).astype(np.int64)
+    district = rng.integers(0, N_DISTRICTS, n)
+    school = region * N_SCHOOLS_PER_REGION + rng.integers(0, N_SCHOOLS_PER_REGION, n)
+    project = rng.integers(0, len(PROJECTS), n)
+    program_type = rng.integers(0, len(PROGRAM_TYPES), n)
+    focus_area = rng.integers(0, len(FOCUS_AREAS), n)
+    org = rng.integers(0, len(ORG_INDICATOR_IDS), n)
+    indicator = _INDICATOR_OFFSETS[org] + (rng.random(n) * _INDICATOR_COUNTS[org]).astype(np.int64)
+
+    # Add some noise and gender split
+    base = rng.integers(_VALUE_LOW[org], _VALUE_HIGH[org])
+    reported_value = np.maximum((base + rng.normal(0.0, base * 0.1)).astype(np.int64), 0)
+    female_value = (reported_value * rng.uniform(0.45, 0.6, n)).astype(np.int64)
+    male_value = reported_value - female_value
+
+    return pd.DataFrame(
+        {
+            "Project": _categorical(project, PROJECTS),
+            "Country": _categorical(country, COUNTRIES),
+            "Region": _categorical(region, _REGION_NAMES),
+            "District": _categorical(district, _DISTRICT_NAMES),
+            "School_Name": _categorical(school, _SCHOOL_NAMES),
+            "Program_Type": _categorical(program_type, PROGRAM_TYPES),
+            "Focus_Area": _categorical(focus_area, FOCUS_AREAS),
+            "Project_Indicator_Name": _categorical(indicator, _INDICATOR_TEXTS),
+            "Mapped_Org_Indicator_ID": _categorical(org, ORG_INDICATOR_IDS),
+            "Reported_Value": reported_value,
+            "Female_Value": female_value,
+            "Male_Value": male_value,
+        }
+    )
+
+
+def iter_random_projects_chunks(
+    num_rows: int,
+    seed: int = 42,
+    chunk_rows: int = RANDOM_CHUNK_ROWS,
+) -> Iterator[pd.DataFrame]:
+    """
+    Stream ``num_rows`` random rows as DataFrames of at most ``chunk_rows``
+    rows, all drawn from one ``default_rng(seed)``. The same ``seed`` and
+    ``chunk_rows`` always give the same data.
+    """
+    rng = np.random.default_rng(seed)
+    for start in range(0, num_rows, chunk_rows):
+        yield _random_projects_chunk(rng, min(chunk_rows, num_rows - start))
 
 
 def generate_random_projects_data(
     num_rows: int = 1000,
     seed: int = 42,
+    chunk_rows: int = RANDOM_CHUNK_ROWS,
 ) -> pd.DataFrame:
     """
     Generate a large random dataset of project indicator rows across:
@@ -313,85 +472,50 @@ def generate_random_projects_data(
     - Different projects / programs / focus areas
     - Different org indicator IDs
 
-    Each row ~ one indicator value for a country / project / school.
+    Each row ~ one indicator value for a country / project / school. Name
+    columns are categoricals; values are int64.
     """
-    rng = np.random.default_rng(seed)
+    chunks = list(iter_random_projects_chunks(num_rows, seed, chunk_rows))
+    if not chunks:
+        return _random_projects_chunk(np.random.default_rng(seed), 0)
+    return pd.concat(chunks, ignore_index=True)
 
-    countries = COUNTRIES  # from above in this file
-
-    regions = {
-        "Kenya": ["Nairobi County", "Mombasa", "Kisumu"],
-        "Tanzania": ["Dar es Salaam", "Mwanza"],
-        "Rwanda": ["Kigali City", "Eastern Province"],
-        "Mozambique": ["Nampula", "Zambezia"],
-        "Liberia": ["Montserrado", "Grand Bassa"],
-        "Libya": ["Tripoli District", "Benghazi District"],
-        "Angola": ["Luanda Province", "Huambo"],
-        "Honduras": ["Cortés", "Francisco Morazán"],
-        "El Salvador": ["San Salvador", "Santa Ana"],
-        "Sri Lanka": ["Western Province", "Central Province"],
-        "Vietnam": ["Ho Chi Minh City", "Hanoi"],
-    }
 
-    projects = [
-        "Project A – Remedial Learning",
-        "Project B – Infrastructure Support",
-        "Project C – Teacher Training",
-        "Project D – Reading Promotion",
-        "Project E – Community Engagement",
-        "Project F – Parenting & Governance",
-    ]
+def _check_file_format(file_format: str) -> None:
+    if file_format not in RANDOM_FILE_FORMATS:
+        raise ValueError(f"Unsupported file format {file_format!r}; expected one of {list(RANDOM_FILE_FORMATS)}")
 
-    rows = []
-    for i in range(num_rows):
-        country = rng.choice(countries)
-        region = rng.choice(regions[country])
-        district = f"District {rng.integers(1, 6)}"
-        school = f"{region} Community School {rng.integers(1, 10)}"
-        project = rng.choice(projects)
-        program_type = rng.choice(PROGRAM_TYPES)
-        focus_area = rng.choice(FOCUS_AREAS)
-        org_id = rng.choice(ORG_INDICATOR_IDS)
-
-        # Generate indicator text related to that org ID
-        indicator_text = _indicator_name_for_org_id(org_id)
-
-        # Values: bigger for students/books, smaller for schools/teachers/households
-        base = {
-            "EDP_OUT1_STUD": rng.integers(50, 800),
-            "EDP_OUT1_SCH": rng.integers(1, 20),
-            "EDP_OUT1_TCH": rng.integers(5, 200),
-            "EDP_OUT1_BKS": rng.integers(200, 10000),
-            "EDP_OUT2_HH": rng.integers(20, 1000),
-        }[org_id]
-
-        # Add some noise and gender split
-        reported_value = int(base + rng.normal(0, base * 0.1))
-        reported_value = max(reported_value, 0)
-
-        female_share = rng.uniform(0.45, 0.6)
-        female_value = int(reported_value * female_share)
-        male_value = reported_value - female_value
-
-        rows.append(
-            {
-                "Project": project,
-                "Country": country,
-                "Region": region,
-                "District": district,
-                "School_Name": school,
-                "Program_Type": program_type,
-                "Focus_Area": focus_area,
-                "Project_Indicator_Name": indicator_text,
-                "Mapped_Org_Indicator_ID": org_id,
-                "Reported_Value": reported_value,
-                "Female_Value": female_value,
-                "Male_Value": male_value,
-            }
-        )
 
-    df = pd.DataFrame(rows)
-    return df
+def write_random_projects_file(
+    file_path: str,
+    num_rows: int,
+    seed: int = 42,
+    chunk_rows: int = RANDOM_CHUNK_ROWS,
+) -> str:
+    """
+    Stream random rows to a ``.csv`` or ``.parquet`` file chunk by chunk, so
+    memory stays bounded by ``chunk_rows`` however large the file is. Other
+    extensions raise ``ValueError``.
+    """
+    file_format = os.path.splitext(file_path)[1].lstrip(".").lower()
+    _check_file_format(file_format)
+    chunks = iter_random_projects_chunks(num_rows, seed, chunk_rows)
+    if file_format == "parquet":
+        writer = None
+        try:
+            for chunk in chunks:
+                table = pa.Table.from_pandas(chunk, preserve_index=False)
+                if writer is None:
+                    writer = pq.ParquetWriter(file_path, table.schema, compression="zstd")
+                writer.write_table(table)
+        finally:
+            if writer is not None:
+                writer.close()
+    else:
+        with open(file_path, "w", encoding="utf-8", newline="") as fh:
+            for i, chunk in enumerate(chunks):
+                chunk.to_csv(fh, index=False, header=i == 0)
+    return file_path
 
 
 def save_random_project_files(
@@ -399,25 +523,28 @@ def save_random_project_files(
     n_files: int = 3,
     rows_per_file: int = 400,
     seed: int = 123,
+    file_format: str = "csv",
+    max_workers: Optional[int] = None,
 ):
     """
     Generate multiple random input files that you can upload to the app.
     Each file has rows_per_file >= 300 (default 400).
-    """
-    import os
 
+    Files are written in parallel worker processes (one file per task);
+    ``file_format`` is ``"csv"`` or ``"parquet"`` (anything else raises
+    ``ValueError`` before any file is written).
+    """
+    _check_file_format(file_format)
     os.makedirs(path, exist_ok=True)
 
-    rng = np.random.default_rng(seed)
-    file_paths = []
-
-    for i in range(n_files):
-        df = generate_random_projects_data(
-            num_rows=rows_per_file,
-            seed=int(seed + i * 10),
-        )
-        csv_path = os.path.join(path, f"random_project_data_{i+1}.csv")
-        df.to_csv(csv_path, index=False)
-        file_paths.append(csv_path)
-
-    return file_paths
+    file_paths = [
+        os.path.join(path, f"random_project_data_{i+1}.{file_format}") for i in range(n_files)
+    ]
+    seeds = [int(seed + i * 10) for i in range(n_files)]
+    rows = [rows_per_file] * n_files
+
+    workers = min(max_workers or os.cpu_count() or 1, max(n_files, 1))
+    if workers <= 1:
+        return list(map(write_random_projects_file, file_paths, rows, seeds))
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(write_random_projects_file, file_paths, rows, seeds))
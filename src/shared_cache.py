@@ -0,0 +1,182 @@
+"""
+Process-wide cache shared by every Streamlit session on the server.
+
+Demo datasets, parsed uploads, the catalog frame, aggregation cubes and
+dashboard roll-ups are stored once per server process under explicit keys,
+e.g. ``("aggregates", dataset key, catalog version, filter key)``, instead of
+being rebuilt for every session and rerun. Entries expire after a TTL and
+the cache is bounded both by entry count and by (estimated) bytes, evicting
+the least recently used entries first. Hit/miss counters are kept per
+namespace (the first element of the key) for sizing.
+
+Cached values are shared between sessions, so callers must treat them as
+read-only.
+"""
+
+import sys
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Hashable, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from src.data_models import frame_memory
+
+
+DEFAULT_TTL_SECONDS = 30 * 60
+DEFAULT_MAX_ENTRIES = 512
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+
+_MISSING = object()
+
+
+def filter_key(filters: Optional[Dict[str, List]]) -> Tuple:
+    """Order-independent key of a filter selection (column -> selected values)."""
+    return tuple(
+        (column, tuple(sorted(str(value) for value in values)))
+        for column, values in sorted((filters or {}).items())
+        if values
+    )
+
+
+def estimate_bytes(value) -> int:
+    """Rough in-memory size of a cached value."""
+    if isinstance(value, pd.DataFrame):
+        return frame_memory(value)
+    if isinstance(value, (pd.Series, pd.Index)):
+        return int(value.memory_usage(deep=True))
+    if isinstance(value, np.ndarray):
+        return int(value.nbytes)
+    if isinstance(value, dict):
+        return sum(estimate_bytes(v) for v in value.values())
+    if isinstance(value, (list, tuple)):
+        return sum(estimate_bytes(v) for v in value)
+    if hasattr(value, "__dict__"):
+        return estimate_bytes(vars(value))
+    return sys.getsizeof(value)
+
+
+class SharedCache:
+    """
+    Thread-safe LRU cache with per-entry TTL and entry/byte limits.
+
+    ``get_or_compute`` computes a missing entry once even when several
+    sessions ask for it at the same time; the others wait for the result.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+        ttl: float = DEFAULT_TTL_SECONDS,
+    ):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._entries: "OrderedDict[Tuple, Tuple[object, float, int]]" = OrderedDict()
+        self._bytes = 0
+        self._counters: Dict[str, Dict[str, int]] = {}
+        self._inflight: Dict[Tuple, threading.Lock] = {}
+        self._lock = threading.Lock()
+
+    def _count(self, key: Tuple, event: str) -> None:
+        namespace = str(key[0]) if key else ""
+        counters = self._counters.setdefault(
+            namespace, {"hits": 0, "misses": 0, "expired": 0, "evictions": 0}
+        )
+        counters[event] += 1
+
+    def _lookup(self, key: Tuple):
+        """Entry value or ``_MISSING``; drops the entry if it has expired. Caller holds the lock."""
+        entry = self._entries.get(key)
+        if entry is None:
+            return _MISSING
+        value, expires_at, nbytes = entry
+        if expires_at < time.monotonic():
+            del self._entries[key]
+            self._bytes -= nbytes
+            self._count(key, "expired")
+            return _MISSING
+        self._entries.move_to_end(key)
+        return value
+
+    def get(self, key: Tuple[Hashable, ...], default=None):
+        with self._lock:
+            value = self._lookup(key)
+            self._count(key, "misses" if value is _MISSING else "hits")
+        return default if value is _MISSING else value
+
+    def put(self, key: Tuple[Hashable, ...], value, ttl: Optional[float] = None) -> None:
+        nbytes = estimate_bytes(value)
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._bytes -= previous[2]
+            if nbytes > self.max_bytes:
+                return
+            self._entries[key] = (value, expires_at, nbytes)
+            self._bytes += nbytes
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                old_key, (_, _, old_bytes) = self._entries.popitem(last=False)
+                self._bytes -= old_bytes
+                self._count(old_key, "evictions")
+
+    def get_or_compute(
+        self,
+        key: Tuple[Hashable, ...],
+        compute: Callable[[], object],
+        ttl: Optional[float] = None,
+    ):
+        """Cached value of ``key``, calling ``compute()`` (once) on a miss."""
+        with self._lock:
+            value = self._lookup(key)
+            self._count(key, "misses" if value is _MISSING else "hits")
+            if value is not _MISSING:
+                return value
+            key_lock = self._inflight.setdefault(key, threading.Lock())
+
+        try:
+            with key_lock:
+                with self._lock:
+                    value = self._lookup(key)
+                if value is _MISSING:
+                    value = compute()
+                    self.put(key, value, ttl)
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+        return value
+
+    def invalidate(self, namespace: Optional[str] = None) -> None:
+        """Drop all entries, or only those whose key starts with ``namespace``."""
+        with self._lock:
+            for key in [k for k in self._entries if namespace is None or k[0] == namespace]:
+                self._bytes -= self._entries.pop(key)[2]
+
+    def stats(self) -> Dict[str, object]:
+        """Totals and per-namespace hit/miss/expiry/eviction counters."""
+        with self._lock:
+            namespaces = {name: dict(counters) for name, counters in self._counters.items()}
+            entries, nbytes = len(self._entries), self._bytes
+        for counters in namespaces.values():
+            lookups = counters["hits"] + counters["misses"]
+            counters["hit_rate"] = round(counters["hits"] / lookups, 3) if lookups else 0.0
+        hits = sum(c["hits"] for c in namespaces.values())
+        misses = sum(c["misses"] for c in namespaces.values())
+        return {
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": round(hits / (hits + misses), 3) if hits + misses else 0.0,
+            "entries": entries,
+            "max_entries": self.max_entries,
+            "bytes": nbytes,
+            "max_bytes": self.max_bytes,
+            "namespaces": namespaces,
+        }
+
+
+# One cache per server process; Streamlit sessions run as threads in it.
+SHARED_CACHE = SharedCache()
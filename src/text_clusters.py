@@ -0,0 +1,191 @@
+"""
+Near-duplicate clustering of indicator texts (MinHash + LSH).
+
+Uploads spell the same indicator many ways ("Number of teachers trained in
+active pedagogy", "No. of teachers trained on inclusive pedagogy (Q3)"). The
+mapper already scores each distinct normalised text once; clustering the
+near-duplicates first lets it score one representative per cluster and give
+every member the representative's match.
+
+Each text is reduced to its set of character 3-grams (the shingles the
+TF-IDF scorer uses too) and a MinHash signature of ``NUM_PERM`` values; the
+share of equal signature values estimates the Jaccard similarity of two
+shingle sets. Locality-sensitive hashing (LSH) cuts the signatures into
+``bands``: only texts with an identical band become candidate pairs, so
+texts are never compared all against all. A candidate joins the cluster of
+a more frequent text when their exact Jaccard similarity reaches the
+threshold. Members are always compared with the representative itself, so
+chains of small edits do not pull unrelated texts into one cluster.
+
+Texts that differ in one significant word can still map to different
+catalog indicators, so the threshold errs on the high side and clustering is
+opt-in (``near_duplicates`` of the batch scorers in ``src.mapping_engine``).
+"""
+
+from typing import Dict, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from src.instrumentation import INSTRUMENTS
+
+
+SHINGLE_SIZE = 3
+NUM_PERM = 64
+LSH_BANDS = 16
+# Texts at least this similar (Jaccard of their 3-gram sets) are near-duplicates.
+NEAR_DUPLICATE_THRESHOLD = 0.6
+# Candidates whose MinHash estimate is this far below the threshold are not checked exactly.
+ESTIMATE_SLACK = 0.15
+SIGNATURE_CHUNK_ROWS = 4096
+ESTIMATE_CHUNK_PAIRS = 65536
+
+# Universal hashing (a * x + b) mod p with a Mersenne prime; products fit in int64.
+_PRIME = (1 << 31) - 1
+
+
+def _shingle_ids(texts: Sequence[str]) -> Tuple[np.ndarray, np.ndarray, int]:
+    """
+    3-gram ids of all texts (concatenated, repeats included), each text's
+    offsets into them and the vocabulary size. The 3-grams are read off one
+    UTF-32 code point array of all texts, without a Python loop per 3-gram.
+    """
+    padded = [f" {text} " for text in texts]
+    lengths = np.fromiter((len(text) for text in padded), dtype=np.int64, count=len(padded))
+    points = np.frombuffer("".join(padded).encode("utf-32-le"), dtype=np.uint32).astype(np.int64)
+    n_grams = np.maximum(lengths - SHINGLE_SIZE + 1, 0)
+    offsets = np.zeros(len(texts) + 1, dtype=np.int64)
+    np.cumsum(n_grams, out=offsets[1:])
+
+    # Start of every 3-gram that lies inside one text
+    text_starts = np.cumsum(lengths) - lengths
+    starts = np.repeat(text_starts - offsets[:-1], n_grams) + np.arange(offsets[-1])
+    codes = np.zeros(len(starts), dtype=np.int64)
+    for k in range(SHINGLE_SIZE):
+        codes = (codes << 21) | points[starts + k]  # code points fit in 21 bits
+    ids, vocabulary = pd.factorize(codes)
+    return ids.astype(np.int64), offsets, len(vocabulary)
+
+
+def minhash_signatures(
+    ids: np.ndarray,
+    offsets: np.ndarray,
+    vocabulary_size: int,
+    num_perm: int = NUM_PERM,
+    seed: int = 0,
+) -> np.ndarray:
+    """
+    ``(n_texts, num_perm)`` uint32 MinHash signatures of the shingle sets in
+    ``ids``/``offsets`` (see ``_shingle_ids``). Each shingle is hashed once
+    per permutation; the minimum per text is taken with
+    ``np.minimum.reduceat`` over chunks of ``SIGNATURE_CHUNK_ROWS`` texts.
+    Texts without shingles get the maximum value everywhere.
+    """
+    rng = np.random.default_rng(seed)
+    a = rng.integers(1, _PRIME, num_perm, dtype=np.int64)
+    b = rng.integers(0, _PRIME, num_perm, dtype=np.int64)
+    # (num_perm, vocabulary) so each permutation's minimum runs over contiguous memory
+    shingles = np.arange(1, vocabulary_size + 1, dtype=np.int64)
+    hashes = ((a[:, None] * shingles + b[:, None]) % _PRIME).astype(np.uint32)
+
+    n = len(offsets) - 1
+    signatures = np.full((num_perm, n), np.iinfo(np.uint32).max, dtype=np.uint32)
+    for start in range(0, n, SIGNATURE_CHUNK_ROWS):
+        stop = min(start + SIGNATURE_CHUNK_ROWS, n)
+        starts = offsets[start:stop]
+        non_empty = np.flatnonzero(offsets[start + 1 : stop + 1] > starts)
+        if not len(non_empty):
+            continue
+        # np.take keeps the result C-contiguous (hashes[:, ids] would not be)
+        values = np.take(hashes, ids[offsets[start] : offsets[stop]], axis=1)
+        # Empty texts have zero-length segments, so leaving them out keeps the others intact
+        signatures[:, start + non_empty] = np.minimum.reduceat(values, starts[non_empty] - offsets[start], axis=1)
+    return np.ascontiguousarray(signatures.T)
+
+
+def lsh_candidates(signatures: np.ndarray, bands: int = LSH_BANDS) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Candidate pairs ``(i, j)`` with ``i < j``: texts that share all values of
+    at least one band. In each bucket, every text is paired with the
+    bucket's first text only, so the number of pairs stays below
+    ``n_texts * bands``.
+    """
+    n, num_perm = signatures.shape
+    bands = min(bands, num_perm)
+    rows = num_perm // bands
+    # One 64-bit key per band (wrapping multiply-add); a collision only adds a candidate
+    multipliers = np.random.default_rng(0).integers(1, 1 << 63, rows, dtype=np.uint64) | np.uint64(1)
+    banded = signatures[:, : rows * bands].reshape(n, bands, rows).astype(np.uint64)
+    keys = (banded * multipliers).sum(axis=2)
+    positions = np.arange(n)
+    firsts, others = [], []
+    for band in range(bands):
+        bucket = pd.factorize(keys[:, band])[0]
+        leader = np.unique(bucket, return_index=True)[1][bucket]
+        paired = leader != positions
+        firsts.append(leader[paired])
+        others.append(positions[paired])
+    pairs = np.unique(np.concatenate(firsts).astype(np.int64) * n + np.concatenate(others))
+    return pairs // n, pairs % n
+
+
+def cluster_near_duplicates(
+    texts: Sequence[str],
+    counts: Optional[np.ndarray] = None,
+    threshold: float = NEAR_DUPLICATE_THRESHOLD,
+    num_perm: int = NUM_PERM,
+    bands: int = LSH_BANDS,
+    seed: int = 0,
+) -> np.ndarray:
+    """
+    Representative position per text: ``result[k] == k`` for the
+    representatives, otherwise the position of the text whose cluster ``k``
+    joined. ``counts`` (rows per text) decides who represents a cluster:
+    more frequent texts first, then input order. Empty texts are never
+    clustered.
+    """
+    n = len(texts)
+    representative = np.arange(n)
+    if n < 2:
+        return representative
+
+    with INSTRUMENTS.span("near_duplicates.cluster"):
+        order = np.arange(n) if counts is None else np.argsort(-np.asarray(counts), kind="stable")
+        ordered = [texts[k] for k in order]
+        ids, offsets, vocabulary_size = _shingle_ids(ordered)
+        signatures = minhash_signatures(ids, offsets, vocabulary_size, num_perm, seed)
+        first, other = lsh_candidates(signatures, bands)
+
+        # Cheap MinHash estimate first; exact Jaccard only for the survivors
+        estimate = np.concatenate(
+            [
+                (signatures[first[s : s + ESTIMATE_CHUNK_PAIRS]] == signatures[other[s : s + ESTIMATE_CHUNK_PAIRS]])
+                .mean(axis=1)
+                for s in range(0, len(first), ESTIMATE_CHUNK_PAIRS)
+            ]
+            or [np.empty(0)]
+        )
+        keep = estimate >= threshold - ESTIMATE_SLACK
+        first, other = first[keep], other[keep]
+        INSTRUMENTS.count("near_duplicates.candidates", len(first))
+
+        shingles: Dict[int, frozenset] = {}
+
+        def shingle_set(i: int) -> frozenset:
+            if i not in shingles:
+                shingles[i] = frozenset(ids[offsets[i] : offsets[i + 1]].tolist())
+            return shingles[i]
+
+        # Pairs come sorted by their first text, so a representative takes all its members
+        # before any of them could become a representative itself
+        ordered_rep = list(range(n))
+        for i, j in zip(first.tolist(), other.tolist()):
+            if ordered_rep[i] != i or ordered_rep[j] != j:
+                continue
+            a, b = shingle_set(i), shingle_set(j)
+            if a and b and len(a & b) >= threshold * len(a | b):
+                ordered_rep[j] = i
+
+        representative[order] = order[np.array(ordered_rep)]
+        INSTRUMENTS.count("near_duplicates.members", int(np.count_nonzero(representative != np.arange(n))))
+    return representative
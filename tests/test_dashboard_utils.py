@@ -0,0 +1,47 @@
+from streamlit.testing.v1 import AppTest
+
+
+def _dashboard_app(reported: bool) -> None:
+    import pandas as pd
+
+    from src.dashboard_utils import run_dashboard_with_gender
+    from src.indicator_catalog import EDUCATIONPEOPLE_INDICATORS
+
+    # Two projects reporting students for the same school
+    df = pd.DataFrame(
+        {
+            "Project": ["Project A", "Project B", "Project A"],
+            "Country": ["Kenya", "Kenya", "Kenya"],
+            "Region": ["Nairobi", "Nairobi", "Nairobi"],
+            "District": ["Westlands", "Westlands", "Westlands"],
+            "School_Name": ["Hope Primary", "Hope Primary", "Unity Primary"],
+            "Project_Indicator_Name": ["Students reached"] * 3,
+            "Mapped_Org_Indicator_ID": ["EDP_OUT1_STUD"] * 3,
+        }
+    )
+    if reported:
+        df["Reported_Value"] = [100, 80, 50]
+    run_dashboard_with_gender(df, EDUCATIONPEOPLE_INDICATORS, deduplicate=True)
+
+
+def _run(reported: bool) -> AppTest:
+    app = AppTest.from_function(_dashboard_app, kwargs={"reported": reported})
+    app.run(timeout=30)
+    assert not app.exception
+    return app
+
+
+def _students(app: AppTest):
+    return next(metric for metric in app.metric if metric.label.endswith("Students reached"))
+
+
+def test_deduplicate_without_reported_values():
+    # The simulated values are de-duplicated instead of raising KeyError
+    students = _students(_run(reported=False))
+    assert students.delta and students.delta.endswith("duplicates")
+
+
+def test_deduplicate_removes_double_counted_rows():
+    students = _students(_run(reported=True))
+    assert students.value == f"{150:,}"
+    assert students.delta == "-80 duplicates"